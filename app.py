@@ -1,70 +1,51 @@
-from flask import Flask, request, jsonify, render_template, session, make_response,send_file
+from flask import Flask, request, jsonify, render_template, session, make_response,send_file, g, Response, stream_with_context
 from flask_cors import CORS
-import joblib
-import pandas as pd
-import sqlite3
+import numpy as np
+import base64
+import hashlib
 import json
+import math
+import db_functions
+import diagnosis_events
+import metrics
+import profiling
+import session_store
 import os
-from reportlab.lib.pagesizes import A4
-import traceback
-from datetime import datetime
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-import io
+import queue
+import threading
+import time
+import warnings
 from io import BytesIO
-from reportlab.lib import colors
+import traceback
+from datetime import datetime, timezone
+from werkzeug.http import http_date, parse_date, parse_etags, quote_etag
+from inference_engine import CompiledForest
+from batching import MicroBatcher, BatcherFullError, BatcherTimeoutError
+from write_behind import WriteBehindWriter
+from report_cache import ReportCache
+from prediction_cache import PredictionCache
+import model_registry
+from model_registry import LoadedModel, RegistryWatcher
+from report_jobs import ReportJobQueue, JobQueueFullError
+
+# joblib/sklearn, reportlab and pandas are deliberately not imported here:
+# the model is loaded in warmup() and reportlab on the first report render,
+# so importing this module stays cheap (see startup_audit.py).
 
 app = Flask(__name__, static_folder='static', template_folder='templates')
 CORS(app)
-app.secret_key = os.urandom(24)  # Required for session storage
-
-# Database configuration
-DATABASE = 'patient_metadata.db'
-
-def get_db():
-    """Create and return a database connection."""
-    db = sqlite3.connect(DATABASE)
-    db.row_factory = sqlite3.Row
-    return db
-
-def init_db():
-    """Initialize the database with required tables."""
-    with app.app_context():
-        db = get_db()
-        cursor = db.cursor()
-        cursor.execute(''' 
-            CREATE TABLE IF NOT EXISTS patients (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT,
-                age INTEGER,
-                gender TEXT,
-                family_history TEXT,
-                symptoms TEXT,
-                previous_cancer TEXT,
-                clinical_data TEXT,
-                prediction_result TEXT,
-                confidence TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        db.commit()
-        db.close()
+# Sessions live server-side (see session_store.py) and the cookie holds only
+# their id, so sessions don't depend on this key; set SECRET_KEY for anything
+# else that signs data.
+app.secret_key = os.environ.get('SECRET_KEY') or os.urandom(24)
+app.session_interface = session_store.ServerSideSessionInterface(session_store.create_store())
 
-init_db()  # Ensure DB is initialized on startup
+# Database configuration (connections are pooled in db_functions)
+DATABASE = db_functions.DB_PATH
 
 def fetch_patient_data(patient_id):
     try:
-        db = get_db()
-        cursor = db.cursor()
-        cursor.execute('SELECT * FROM patients WHERE id = ?', (patient_id,))
-        patient_data = cursor.fetchone()
-        db.close()
+        patient_data = db_functions.get_patient_row(patient_id)
 
         if patient_data:
             # Return the patient data as a dictionary
@@ -75,7 +56,7 @@ def fetch_patient_data(patient_id):
                 'gender': patient_data['gender'],
                 'family_history': patient_data['family_history'],
                 'previous_cancer': patient_data['previous_cancer'],
-                'clinical_data': json.loads(patient_data['clinical_data']),
+                'clinical_data': db_functions.clinical_data_from_row(patient_data),
                 'prediction_result': patient_data['prediction_result'],
                 'confidence': patient_data['confidence'],
                 'timestamp': patient_data['timestamp']
@@ -86,14 +67,502 @@ def fetch_patient_data(patient_id):
         print(f"Error fetching patient data: {e}")
         return None
 
-# Load the ML model
-try:
-    model = joblib.load('breast_cancer_model.pkl')
-    REQUIRED_FEATURES = model.feature_names_in_.tolist()
-    print(f"✅ Model loaded successfully. Required features: {REQUIRED_FEATURES}")
-except Exception as e:
-    print(f"❌ Error loading model: {str(e)}")
-    raise
+# Load the ML model. The active version in the model registry (see
+# model_registry.py) wins; without one, MODEL_PATH is loaded. With
+# MODEL_MMAP_PATH set, workers map the exported forest (python
+# inference_engine.py export) read-only and share its pages instead of each
+# unpickling a private copy.
+MODEL_REGISTRY_DIR = model_registry.REGISTRY_DIR
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 5))  # seconds; 0 disables hot reload
+MODEL_PATH = os.environ.get('MODEL_PATH', 'breast_cancer_model.pkl')
+MODEL_MMAP_PATH = os.environ.get('MODEL_MMAP_PATH')
+
+# Optional array-backed engine (see inference_engine.py); enable with USE_COMPILED_MODEL=1
+USE_COMPILED_MODEL = os.environ.get('USE_COMPILED_MODEL', '0') == '1'
+
+# Optional micro-batching of concurrent /predict calls (see batching.py); enable with USE_MICRO_BATCHING=1
+USE_MICRO_BATCHING = os.environ.get('USE_MICRO_BATCHING', '0') == '1'
+
+# Optional write-behind persistence (see write_behind.py); enable with WRITE_BEHIND=1
+WRITE_BEHIND = os.environ.get('WRITE_BEHIND', '0') == '1'
+
+# Memoised /predict model outputs (see prediction_cache.py); PREDICTION_CACHE_SIZE=0 disables it
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 10000))
+PREDICTION_CACHE_PRECISION = int(os.environ.get('PREDICTION_CACHE_PRECISION', 6))
+
+# Set up by warmup(); None until then. current_model is replaced as a whole on
+# hot reload, so a request reads it once and uses that version throughout.
+current_model = None
+model_watcher = None
+REQUIRED_FEATURES = None
+MODEL_CLASSES = None
+batcher = None
+writer = None
+report_cache = None
+report_jobs = None
+profile_store = None
+prediction_cache = None
+
+# Open /api/diagnosis-events streams of this process (see diagnosis_events.py)
+diagnosis_hub = diagnosis_events.DiagnosisHub()
+
+def load_model():
+    """Load the active registry version, or MODEL_PATH / MODEL_MMAP_PATH, and make it current."""
+    try:
+        version = model_registry.current_version(MODEL_REGISTRY_DIR)
+        if version:
+            loaded = model_registry.load_version(version, MODEL_REGISTRY_DIR, USE_COMPILED_MODEL)
+        else:
+            path = MODEL_MMAP_PATH or MODEL_PATH
+            if MODEL_MMAP_PATH:
+                model = CompiledForest.load_mmap(MODEL_MMAP_PATH)
+            else:
+                import joblib  # pulls in sklearn, so only paid when a pickle is actually loaded
+                model = joblib.load(MODEL_PATH)
+            # Unregistered models are identified by content, so stored predictions stay traceable
+            loaded = LoadedModel(model, f"local-{model_registry.sha256_file(path)[:12]}", USE_COMPILED_MODEL)
+        activate_model(loaded)
+        print(f"✅ Model {loaded.version} loaded successfully. Required features: {REQUIRED_FEATURES}")
+    except Exception as e:
+        print(f"❌ Error loading model: {str(e)}")
+        raise
+
+def activate_model(loaded):
+    """Swap in a loaded model version; requests already holding the previous one finish on it."""
+    global current_model, REQUIRED_FEATURES, MODEL_CLASSES
+    # Validation, the patients columns and the compiled engine all assume FEATURE_COLUMNS' layout
+    model_registry.check_features(loaded.model, f"Model {loaded.version}")
+    if current_model is not None and loaded.classes != MODEL_CLASSES:
+        raise ValueError(f"Model {loaded.version} changes the classes; restart the workers to serve it")
+    REQUIRED_FEATURES = loaded.required_features
+    MODEL_CLASSES = loaded.classes
+    current_model = loaded
+    # Bound after the swap, so no request can score with the old model under the new generation
+    if prediction_cache is not None:
+        prediction_cache.bind(loaded.version)
+
+def score_matrix(matrix, loaded=None):
+    """Return predict_proba for a matrix whose columns follow REQUIRED_FEATURES."""
+    loaded = loaded or current_model
+    start = time.perf_counter()
+    probabilities = loaded.predict_proba(matrix)
+    metrics.observe_model(loaded.version, len(matrix), time.perf_counter() - start)
+    return probabilities
+
+def score_rows(matrix):
+    """Micro-batcher scoring function: (probabilities, model version) per row."""
+    loaded = current_model
+    return [(probabilities, loaded) for probabilities in score_matrix(matrix, loaded)]
+
+def attribute_matrix(matrix, loaded=None):
+    """
+    (base_value, contributions) for the malignant probability of a matrix in
+    REQUIRED_FEATURES order: contributions has one row per matrix row, and
+    base_value plus a row's contributions adds up to its malignant probability.
+    """
+    bias, contributions = (loaded or current_model).explainer.contributions(matrix)
+    target = MODEL_CLASSES.index('M')
+    return float(bias[target]), contributions[:, :, target]
+
+def format_contributions(row, base_value, row_contributions):
+    """The feature_contributions dict for one input row, largest effect first."""
+    order = np.argsort(-np.abs(row_contributions), kind='stable')
+    return {
+        'target': 'M',
+        'base_value': round(base_value, 6),
+        'features': [
+            {'feature': REQUIRED_FEATURES[i], 'value': float(row[i]), 'contribution': round(float(row_contributions[i]), 6)}
+            for i in order
+        ]
+    }
+
+def explain_matrix(matrix, loaded=None):
+    """Per-row feature_contributions dicts for a matrix in REQUIRED_FEATURES order."""
+    base_value, contributions = attribute_matrix(matrix, loaded)
+    return [format_contributions(row, base_value, row_contributions) for row, row_contributions in zip(matrix, contributions)]
+
+def with_contributions(payload):
+    """A report payload with feature_contributions filled in when its clinical data is complete."""
+    clinical_data = payload.get('clinical_data') or {}
+    if 'feature_contributions' in payload or not all(f in clinical_data for f in REQUIRED_FEATURES):
+        return payload
+    try:
+        row = np.array([[float(clinical_data[f]) for f in REQUIRED_FEATURES]], dtype=np.float64)
+    except (ValueError, TypeError):
+        return payload
+    return {**payload, 'feature_contributions': explain_matrix(row)[0]}
+
+# Batch scoring passes plain matrices in REQUIRED_FEATURES order, so sklearn's
+# feature-name check has nothing to compare against.
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 1000))
+
+def validate_clinical_data(data):
+    """Extract REQUIRED_FEATURES from a case, returning (clinical_data, missing, invalid)."""
+    clinical_data = {}
+    missing_fields = []
+    invalid_fields = []
+
+    for feature in REQUIRED_FEATURES:
+        if feature not in data:
+            missing_fields.append(feature)
+            continue
+        try:
+            value = float(data[feature])
+        except (ValueError, TypeError):
+            invalid_fields.append(feature)
+            continue
+        # float() accepts "nan" and "inf"; the compiled forest would score them without complaint
+        if not math.isfinite(value):
+            invalid_fields.append(feature)
+            continue
+        clinical_data[feature] = value
+
+    return clinical_data, missing_fields, invalid_fields
+
+def extract_patient_metadata(data):
+    """Pull the optional patient metadata fields out of a case."""
+    return {
+        'name': data.get('patient_name', 'Anonymous'),
+        'age': int(data.get('age', 0)) if data.get('age') else None,
+        'gender': data.get('gender'),
+        'family_history': data.get('family_history'),
+        'symptoms': data.get('symptoms'),
+        'previous_cancer': data.get('previous_cancer')
+    }
+
+def format_prediction(probabilities):
+    """Turn one row of predict_proba output into the diagnosis fields returned to clients."""
+    label = MODEL_CLASSES[int(probabilities.argmax())]
+    is_malignant = label == 'M'
+    confidence = max(probabilities) * 100
+    return {
+        'diagnosis': 'Malignant (M)' if is_malignant else 'Benign (B)',
+        'message': "⚠️ High risk: Consult a doctor immediately!" if is_malignant else "✅ Low risk: Follow up with medical professionals.",
+        'confidence': f"{confidence:.2f}%",
+        'malignant_prob': f"{probabilities[MODEL_CLASSES.index('M')]*100:.2f}%",
+        'benign_prob': f"{probabilities[MODEL_CLASSES.index('B')]*100:.2f}%"
+    }
+
+def patient_row(patient_metadata, clinical_data, result, timestamp, model_version):
+    """Build the db_functions.INSERT_PATIENT_SQL parameters for one scored case."""
+    return (
+        patient_metadata['name'],
+        patient_metadata['age'],
+        patient_metadata['gender'],
+        patient_metadata['family_history'],
+        patient_metadata['symptoms'],
+        patient_metadata['previous_cancer'],
+        *(clinical_data[feature] for feature in db_functions.FEATURE_COLUMNS),
+        result['diagnosis'],
+        result['confidence'],
+        timestamp,
+        model_version
+    )
+
+_warm = False
+_warmup_lock = threading.Lock()
+
+def warmup():
+    """
+    Initialise the database, load the model and start the optional background
+    helpers. Runs once per process: from create_app(), or on the first request
+    when the module-level app is served directly.
+    """
+    global batcher, writer, report_cache, report_jobs, profile_store, prediction_cache, model_watcher, _warm
+    with _warmup_lock:
+        if _warm:
+            return
+        start = time.perf_counter()
+
+        db_functions.init_db()  # Ensure DB is initialized on startup
+
+        prediction_cache = PredictionCache(
+            max_entries=PREDICTION_CACHE_SIZE,
+            precision=PREDICTION_CACHE_PRECISION
+        ) if PREDICTION_CACHE_SIZE > 0 else None
+        load_model()
+
+        # Hot reload: newly activated registry versions are loaded in the background
+        model_watcher = RegistryWatcher(
+            activate_model,
+            registry_dir=MODEL_REGISTRY_DIR,
+            interval_seconds=MODEL_WATCH_INTERVAL,
+            loaded_version=current_model.version,
+            use_compiled=USE_COMPILED_MODEL
+        ).start() if MODEL_WATCH_INTERVAL > 0 else None
+
+        batcher = MicroBatcher(
+            score_rows,
+            max_batch_size=int(os.environ.get('MICRO_BATCH_MAX_SIZE', 32)),
+            window_ms=float(os.environ.get('MICRO_BATCH_WINDOW_MS', 2)),
+            max_queue_size=int(os.environ.get('MICRO_BATCH_QUEUE_SIZE', 1024)),
+            timeout_ms=float(os.environ.get('MICRO_BATCH_TIMEOUT_MS', 1000))
+        ) if USE_MICRO_BATCHING else None
+
+        writer = WriteBehindWriter(
+            max_queue_size=int(os.environ.get('WRITE_BEHIND_QUEUE_SIZE', 1000)),
+            flush_interval_ms=float(os.environ.get('WRITE_BEHIND_FLUSH_MS', 50)),
+            durability=os.environ.get('WRITE_BEHIND_DURABILITY', 'normal'),
+            dead_letter_path=os.environ.get('WRITE_BEHIND_DEAD_LETTER')
+        ) if WRITE_BEHIND else None
+
+        # Rendered reports are cached on disk (see report_cache.py)
+        report_cache = ReportCache(
+            os.environ.get('REPORT_CACHE_DIR', 'report_cache'),
+            max_bytes=int(os.environ.get('REPORT_CACHE_MAX_BYTES', 256 * 1024 * 1024)),
+            max_age_seconds=int(os.environ.get('REPORT_CACHE_MAX_AGE', 24 * 3600))
+        )
+
+        # Background report rendering (see report_jobs.py)
+        report_jobs = ReportJobQueue(
+            max_workers=int(os.environ.get('REPORT_WORKERS', 2)),
+            max_pending=int(os.environ.get('REPORT_QUEUE_SIZE', 100)),
+            job_ttl_seconds=int(os.environ.get('REPORT_JOB_TTL', 3600)),
+            cache=report_cache
+        )
+
+        # Opt-in request profiles (see profiling.py)
+        profile_store = profiling.ProfileStore(
+            os.environ.get('PROFILE_DIR', 'profiles'),
+            max_profiles=int(os.environ.get('PROFILE_MAX_COUNT', 50))
+        ) if profiling.PROFILING_ENABLED else None
+
+        _warm = True
+        print(f"✅ Warmup finished in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+def create_app():
+    """App factory: warm the process up front so no request pays for it."""
+    warmup()
+    return app
+
+# ===== Request Metrics (see metrics.py) =====
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        # The URL rule, not the path, so /get_previous_metrics?patient_id=... stays one series
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe_request(route, request.method, response.status_code, time.perf_counter() - start)
+    return response
+
+# ===== On-Demand Profiling (see profiling.py) =====
+# Hooks are only registered when profiling is configured, so it costs nothing otherwise
+if profiling.PROFILING_ENABLED:
+    @app.before_request
+    def start_profiler():
+        if request.path.startswith('/api/profiles'):
+            return  # browsing profiles carries the token too; don't let it evict real ones
+        if profiling.should_profile(request.headers.get(profiling.HEADER)):
+            g.profiler = profiling.start()
+            g.profile_start = time.perf_counter()
+
+    @app.after_request
+    def record_profile_status(response):
+        g.profile_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def save_profile(exc):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return
+        profiling.stop(profiler)
+        try:
+            profile_store.save(profiler, {
+                'route': request.url_rule.rule if request.url_rule else 'unmatched',
+                'method': request.method,
+                'path': request.full_path,
+                'status': g.get('profile_status', 500),
+                'duration_ms': (time.perf_counter() - g.profile_start) * 1000,
+                'content_length': request.content_length,
+                'error': str(exc) if exc else None,
+            })
+        except Exception as e:
+            print(f"⚠️ Could not save request profile: {e}")
+
+@app.before_request
+def ensure_warm():
+    """Lazily warm up when the module-level app is served without create_app()."""
+    if not _warm:
+        warmup()
+
+def validation_error(missing_fields, invalid_fields):
+    """The 400 body for a case with missing or non-numeric features, or None when it is valid."""
+    if missing_fields:
+        return {'error': 'Missing required fields', 'fields': missing_fields}
+    if invalid_fields:
+        return {'error': 'Invalid values', 'fields': invalid_fields, 'message': 'All fields must be finite numbers'}
+    return None
+
+def score_case(input_row):
+    """
+    Return (probabilities, feature contributions, model version) for one input row,
+    from the prediction cache when possible. Raises BatcherFullError or
+    BatcherTimeoutError when micro-batching is on and the batcher is saturated.
+    """
+    cached = None
+    if prediction_cache is not None:
+        with metrics.span('predict.cache_lookup'):
+            cache_key = prediction_cache.key_for(input_row[0])
+            cached, cache_generation = prediction_cache.get(cache_key)
+    if cached is not None:
+        # Same measurements as an earlier request: skip the forest (the visit is still stored)
+        probabilities, base_value, row_contributions, model_version = cached
+    else:
+        with metrics.span('predict.model'):
+            if batcher is not None:
+                probabilities, loaded = batcher.submit(input_row[0])
+            else:
+                loaded = current_model
+                probabilities = score_matrix(input_row, loaded)[0]
+        with metrics.span('predict.explain'):
+            base_value, contributions = attribute_matrix(input_row, loaded)
+            row_contributions = contributions[0].copy()
+        model_version = loaded.version
+        if prediction_cache is not None:
+            prediction_cache.put(cache_key, (probabilities, base_value, row_contributions, model_version),
+                                 cache_generation, model_version)
+
+    # Only model outputs are cached; the response itself is always built from this request's input
+    return probabilities, format_contributions(input_row[0], base_value, row_contributions), model_version
+
+def last_diagnosis_record(patient_id, patient_metadata, clinical_data, result, timestamp):
+    """The session['last_diagnosis'] entry the chatbot reads after a prediction."""
+    return {
+        'id': patient_id,
+        **patient_metadata,
+        'clinical_data': clinical_data,
+        'diagnosis': result['diagnosis'],
+        'confidence': result['confidence'],
+        'malignant_prob': result['malignant_prob'],
+        'benign_prob': result['benign_prob'],
+        'message': result['message'],
+        'timestamp': timestamp.isoformat(' ')  # as sqlite3 stores it, so both sources validate alike
+    }
+
+def prediction_response(result, contributions, model_version):
+    """The /predict response body."""
+    return {
+        'diagnosis': result['diagnosis'],
+        'message': result['message'],
+        'confidence': result['confidence'],
+        'malignant_prob': result['malignant_prob'],
+        'benign_prob': result['benign_prob'],
+        'feature_contributions': contributions,
+        'model_version': model_version,
+        'status': 'success'
+    }
+
+def latest_patient_data(patient):
+    """The /api/refresh-patient-data body for a patients row."""
+    return {
+        'id': patient['id'],
+        'name': patient['name'],
+        'age': patient['age'],
+        'gender': patient['gender'],
+        'family_history': patient['family_history'],
+        'previous_cancer': patient['previous_cancer'],
+        # Ensure prediction_result is not empty or None
+        'diagnosis': patient['prediction_result'] or 'Unknown',
+        'clinical_data': db_functions.clinical_data_from_row(patient),
+        'confidence': patient['confidence'],
+        'timestamp': patient['timestamp']
+    }
+
+def public_record(record):
+    """A session diagnosis in the form clients without one see (latest_patient_data's fields)."""
+    return {key: record.get(key) for key in (
+        'id', 'name', 'age', 'gender', 'family_history', 'previous_cancer',
+        'diagnosis', 'clinical_data', 'confidence', 'timestamp'
+    )}
+
+def current_diagnosis(session_data):
+    """(record, source) that /api/refresh-patient-data serves for a session: its own diagnosis, else the latest patient."""
+    if 'last_diagnosis' in session_data:
+        return session_data['last_diagnosis'], 'session'
+    patient = db_functions.get_latest_patient_row()
+    return (latest_patient_data(patient), 'latest') if patient else (None, None)
+
+def session_diagnosis(sid):
+    """current_diagnosis() for a session id, read straight from the store (for streams outliving their request)."""
+    record, source = current_diagnosis((app.session_interface.load(sid) or {}) if sid else {})
+    return record, source == 'session'
+
+# ===== Conditional GET =====
+# A patient record never changes once stored, so its id and timestamp identify
+# a response body; unchanged data is answered with an empty 304.
+def record_validators(record, source):
+    """(ETag, Last-Modified) for a record served from `source`; Last-Modified is None for unparseable timestamps."""
+    timestamp = record.get('timestamp')
+    digest = hashlib.sha1(f"{record.get('id')}|{timestamp}".encode()).hexdigest()[:16]
+    try:
+        # Naive local time, as stored; HTTP dates have whole seconds
+        last_modified = datetime.fromisoformat(str(timestamp)).astimezone(timezone.utc).replace(microsecond=0)
+    except ValueError:
+        last_modified = None
+    return f"{source}-{record.get('id')}-{digest}", last_modified
+
+def is_not_modified(if_none_match, if_modified_since, etag, last_modified):
+    """True when the client's copy, per its If-None-Match / If-Modified-Since headers, is still current."""
+    if if_none_match:
+        # When both are sent the ETag decides: two records can share a second
+        return parse_etags(if_none_match).contains_weak(etag)
+    since = parse_date(if_modified_since)
+    return since is not None and last_modified is not None and last_modified <= since
+
+def validator_headers(etag, last_modified):
+    headers = {'ETag': quote_etag(etag), 'Cache-Control': 'no-cache'}  # cache, but revalidate every time
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    return headers
+
+def conditional_json(payload, etag, last_modified):
+    """jsonify(payload), or an empty 304 if the request already holds this version."""
+    if is_not_modified(request.headers.get('If-None-Match'), request.headers.get('If-Modified-Since'),
+                       etag, last_modified):
+        response = Response(status=304)
+    else:
+        response = jsonify(payload)
+    response.headers.update(validator_headers(etag, last_modified))
+    return response
+
+def store_patient_rows(rows):
+    """Persist patient rows and return their ids, via the write-behind queue when enabled."""
+    if writer is not None:
+        try:
+            return writer.submit(rows)
+        except queue.Full:
+            print("⚠️ Write-behind queue full, inserting synchronously")
+    return db_functions.insert_patients(rows)
+
+def normalize_batch(data):
+    """
+    Accept either a JSON array of cases, {"cases": [...]}, or columnar arrays
+    ({"feature": [v1, v2, ...], ...}) and return a list of per-case dicts.
+    """
+    if isinstance(data, dict) and 'cases' in data:
+        data = data['cases']
+
+    if isinstance(data, list):
+        return data
+
+    if isinstance(data, dict):
+        columns = {key: value for key, value in data.items() if isinstance(value, list)}
+        if not columns:
+            raise ValueError('Expected a list of cases or columnar arrays')
+        lengths = {len(value) for value in columns.values()}
+        if len(lengths) != 1:
+            raise ValueError('All columns must have the same length')
+        n_rows = lengths.pop()
+        return [{key: value[i] for key, value in columns.items()} for i in range(n_rows)]
+
+    raise ValueError('Expected a list of cases or columnar arrays')
 
 @app.route('/')
 def home():
@@ -106,11 +575,7 @@ def chatbot():
     patient_data = session.get('last_diagnosis')
 
     if not patient_data:
-        db = get_db()
-        cursor = db.cursor()
-        cursor.execute('SELECT * FROM patients ORDER BY timestamp DESC LIMIT 1')
-        patient = cursor.fetchone()
-        db.close()
+        patient = db_functions.get_latest_patient_row()
 
         if patient:
             patient_data = {
@@ -120,7 +585,7 @@ def chatbot():
                 'family_history': patient['family_history'],
                 'previous_cancer': patient['previous_cancer'],
                 'diagnosis': patient['prediction_result'],
-                'clinical_data': json.loads(patient['clinical_data']),
+                'clinical_data': db_functions.clinical_data_from_row(patient),
                 'confidence': patient['confidence']
             }
 
@@ -128,47 +593,20 @@ def chatbot():
 
 @app.route('/api/refresh-patient-data', methods=['GET'])
 def refresh_patient_data():
-    """Fetch the latest patient data."""
+    """Fetch the latest patient data; 304 when the client's copy is still current."""
     try:
-        # Check session first
-        if 'last_diagnosis' in session:
-            print('Returning data from session:', session['last_diagnosis'])  # Log session data
-            return jsonify(session['last_diagnosis'])
-
-        # Fallback to database
-        db = get_db()
-        cursor = db.cursor()
-        cursor.execute('SELECT * FROM patients ORDER BY timestamp DESC LIMIT 1')
-        patient = cursor.fetchone()
-        db.close()
-
-        if not patient:
+        # The session's own diagnosis first, then the latest row in the database
+        patient_data, source = current_diagnosis(session)
+
+        if not patient_data:
             print('No patient data found in database')
             return jsonify({'error': 'No patient data found'}), 404
 
-        print('Fetched patient data:', patient)  # Log the patient data fetched from DB
-
-        # Ensure prediction_result is not empty or None
-        diagnosis = patient.get('prediction_result', 'Unknown')
-        if not diagnosis:
-            diagnosis = 'Unknown'
-
-        patient_data = {
-            'id': patient['id'],
-            'name': patient['name'],
-            'age': patient['age'],
-            'gender': patient['gender'],
-            'family_history': patient['family_history'],
-            'previous_cancer': patient['previous_cancer'],
-            'diagnosis': diagnosis,
-            'clinical_data': json.loads(patient['clinical_data']),
-            'confidence': patient['confidence'],
-            'timestamp': patient['timestamp']
-        }
-
-        print('Returning patient data:', patient_data)  # Log the full response being returned
-
-        return jsonify(patient_data)
+        response = conditional_json(patient_data, *record_validators(patient_data, source))
+        response.vary.add('Cookie')  # the session decides which record is served
+        if response.status_code == 200:
+            print(f'Returning patient data from {source}:', patient_data)  # Log the full response being returned
+        return response
 
     except Exception as e:
         print('Error fetching patient data:', e)
@@ -176,476 +614,70 @@ def refresh_patient_data():
             'error': 'Failed to fetch patient data',
             'details': str(e)
         }), 500
-    
+
+@app.route('/api/diagnosis-events', methods=['GET'])
+def diagnosis_event_stream():
+    """Server-Sent Events: push each new diagnosis to this chatbot page as soon as it is stored."""
+    # A new client gets its session id (and cookie) here, so its first diagnosis is recognised as its own
+    sid = app.session_interface.ensure_sid(session)
+    bound = 'last_diagnosis' in session
+    current, _ = current_diagnosis(session)
+    # A reconnecting EventSource reports the last id it got; a new one already has the current record
+    last_event_id = diagnosis_events.parse_last_event_id(request.headers.get('Last-Event-ID'))
+    stream = diagnosis_events.StreamState(sid, bound, public_record, last_event_id)
+
+    def generate():
+        # Subscribed here rather than in the view, so a response that is never iterated leaves nothing behind
+        subscription = diagnosis_hub.subscribe(diagnosis_events.Subscription())
+        try:
+            yield diagnosis_events.preamble()
+            if last_event_id is None:
+                stream.last_id = current and current['id']
+            else:
+                message = stream.on_current(current, bound)
+                if message:
+                    yield message
+
+            while True:
+                event = subscription.get(diagnosis_events.SSE_HEARTBEAT)
+                if event is None:
+                    yield stream.on_current(*session_diagnosis(sid)) or diagnosis_events.KEEPALIVE
+                    continue
+                message = stream.on_published(event)
+                if message:
+                    yield message
+        finally:
+            diagnosis_hub.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # nginx would otherwise hold events back
+    })
+
 @app.route("/generate-report", methods=['POST'])
 def generate_report():
     try:
         data = request.get_json()
-        
-        # Create PDF buffer
-        pdf_buffer = BytesIO()
-        doc = SimpleDocTemplate(pdf_buffer, pagesize=A4, leftMargin=50, rightMargin=50, topMargin=50, bottomMargin=50)
-        
-        # Register fonts - using a more professional font for reports
-        # Ensure these font files are in your project directory or specify the full path
-        pdfmetrics.registerFont(TTFont('Calibri', 'Calibri.ttf'))
-        pdfmetrics.registerFont(TTFont('Calibri-Bold', 'calibrib.ttf'))
-        # Optional: Add italic if you have the font file
-        try:
-            pdfmetrics.registerFont(TTFont('Calibri-Italic', 'calibrii.ttf'))
-        except:
-            pass  # Fall back to Calibri if Italic is not available
-        
-        # Prepare data from the request
         patient_name = data.get('name', 'Patient')
-        age = data.get('age', 'N/A')
-        gender = data.get('gender', 'N/A')
-        diagnosis = data.get('prediction', 'Unknown')
-        clinical_data = data.get('clinical_data', {})
         report_date = datetime.now().strftime("%Y-%m-%d")
-        
-        # Choose a single pastel color theme for the whole report
-        # Using a soft blue-green pastel (#83C5BE) as the primary color
-        primary_color = colors.HexColor('#83C5BE')
-        secondary_color = colors.HexColor('#EDF6F9')  # Very light blue-gray for backgrounds
-        accent_color = colors.HexColor('#006D77')  # Darker version for headers
-        highlight_color = colors.HexColor('#FFDDD2')  # Light peach for highlights
-        
-        # Calculate risk score using provided formula
-        concave_points_worst = clinical_data.get('concave_points_worst', 0)
-        concavity_mean = clinical_data.get('concavity_mean', 0)
-        radius_worst = clinical_data.get('radius_worst', 0)
-        
-        risk_score = ((concave_points_worst + concavity_mean + radius_worst) / 3) * 100
-        
-        # Get top 3 most significant features
-        top_features = get_top_features(clinical_data, 3)
-        
-        # Create PDF content
-        styles = getSampleStyleSheet()
-        
-        # Create custom styles with improved formatting and consistent color scheme
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Title'],
-            fontName='Calibri-Bold',
-            fontSize=18,  # Reduced size to save space
-            alignment=TA_CENTER,
-            spaceAfter=16,
-            textColor=accent_color
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontName='Calibri-Bold',
-            fontSize=12,  # Reduced size to save space
-            spaceBefore=14,
-            spaceAfter=8,
-            textColor=accent_color
-        )
-        
-        subheading_style = ParagraphStyle(
-            'CustomSubheading',
-            parent=styles['Heading3'],
-            fontName='Calibri-Bold',
-            fontSize=11,
-            spaceBefore=8,
-            spaceAfter=6,
-            textColor=accent_color
-        )
-        
-        normal_style = ParagraphStyle(
-            'CustomNormal',
-            parent=styles['Normal'],
-            fontName='Calibri',
-            fontSize=10,  # Reduced size to save space
-            spaceBefore=4,
-            spaceAfter=4,
-            leading=12  # Reduced line spacing to save space
-        )
-        
-        normal_style_black = ParagraphStyle(
-            'CustomNormalBlack',
-            parent=styles['Normal'],
-            fontName='Calibri',
-            fontSize=10,
-            spaceBefore=4,
-            spaceAfter=4,
-            textColor=colors.black,
-            leading=12
-        )
-        
-        bullet_style = ParagraphStyle(
-            'CustomBullet',
-            parent=styles['Normal'],
-            fontName='Calibri',
-            fontSize=10,
-            spaceBefore=2,
-            spaceAfter=2,
-            leftIndent=20,
-            bulletIndent=10,
-            leading=12
-        )
-        
-        footer_style = ParagraphStyle(
-            'Footer',
-            parent=styles['Normal'],
-            fontName='Calibri',
-            fontSize=8,
-            textColor=colors.darkgray,
-            alignment=TA_CENTER
-        )
-        
-        elements = []
-        
-        # 1. Title and Patient Information
-        elements.append(Paragraph("BREAST CANCER DIAGNOSTIC REPORT", title_style))
-        
-        # Add a horizontal line after title (using a Table with a colored background)
-        hr_line = Table([[""]],
-                     colWidths=[doc.width],
-                     rowHeights=[2])
-        hr_line.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), primary_color),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
-        elements.append(hr_line)
-        elements.append(Spacer(1, 12))
-        
-        elements.append(Paragraph("1. PATIENT INFORMATION", heading_style))
-        
-        # Create a boxed patient information layout with improved styling - labels and values bold
-        patient_data = [
-            [Paragraph("<b>Name:</b> <b>" + patient_name + "</b>", normal_style), 
-             Paragraph("<b>Age:</b> <b>" + str(age) + "</b>", normal_style), 
-             Paragraph("<b>Gender:</b> <b>" + gender + "</b>", normal_style)],
-            [Paragraph("<b>Diagnosis:</b> <b>" + diagnosis + "</b>", normal_style), 
-             Paragraph("<b>Date:</b> <b>" + report_date + "</b>", normal_style), ""]
-        ]
-        
-        # Modified layout - improved spacing
-        patient_table = Table(patient_data, colWidths=[180, 160, 140])
-        patient_table.setStyle(TableStyle([
-            ('FONTNAME', (0,0), (-1,-1), 'Calibri'),
-            ('FONTSIZE', (0,0), (-1,-1), 10),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.lightgrey),
-            ('BOX', (0,0), (-1,-1), 1, primary_color),
-            ('BACKGROUND', (0,0), (-1,-1), secondary_color),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 8),
-            ('TOPPADDING', (0,0), (-1,-1), 8),
-            ('LEFTPADDING', (0,0), (-1,-1), 15),
-            ('RIGHTPADDING', (0,0), (-1,-1), 15),
-            ('SPAN', (1, 1), (2, 1)),  # Span the Date cell to fix layout
-        ]))
-        elements.append(patient_table)
-        elements.append(Spacer(1, 12))
-        
-        # 2. Clinical Input Data with prediction-focused explanations - feature names bold
-        elements.append(Paragraph("2. CLINICAL INPUT DATA", heading_style))
-        
-        clinical_items = [["Feature", "Value", "Prediction Impact"]]
-        
-        feature_explanations = {
-            "radius_mean": "Larger values suggest potential malignancy",
-            "texture_mean": "Higher values indicate irregular cell structure",
-            "perimeter_mean": "Larger perimeter correlates with abnormal growth",
-            "area_mean": "Increased area is a key malignancy indicator",
-            "smoothness_mean": "Higher values suggest cell membrane abnormality",
-            "compactness_mean": "Greater compactness indicates malignant tendency",
-            "concavity_mean": "Strong predictor of cell boundary irregularity",
-            "concave_points_mean": "Critical indicator of invasive potential",
-            "symmetry_mean": "Asymmetry suggests abnormal cell development",
-            "fractal_dimension_mean": "Higher complexity often indicates malignancy",
-            "radius_worst": "Strong predictor - larger worst case indicates risk",
-            "texture_worst": "High texture variance strongly predicts malignancy",
-            "perimeter_worst": "Large worst perimeter strongly indicates cancer",
-            "area_worst": "One of the strongest predictors of malignancy",
-            "smoothness_worst": "Extreme values suggest abnormal cell surface",
-            "compactness_worst": "High compactness extremes predict malignancy",
-            "concavity_worst": "Key predictor of invasive characteristics",
-            "concave_points_worst": "Critical predictor of boundary irregularity",
-            "symmetry_worst": "Extreme asymmetry suggests aggressive growth",
-            "fractal_dimension_worst": "Complex boundaries suggest malignancy"
-        }
-        
-        for key, value in clinical_data.items():
-            explanation = feature_explanations.get(key, "Contributes to overall prediction model")
-            # Make feature names bold and ensure they stay bold in table
-            clinical_items.append([Paragraph(f"<b>{key}</b>", normal_style), str(round(value, 4)), explanation])
-        
-        clinical_table = Table(clinical_items, colWidths=[150, 100, 220])
-        clinical_table.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (-1,0), primary_color),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.lightgrey),
-            ('FONTNAME', (0,0), (-1,-1), 'Calibri'),
-            ('FONTNAME', (0,0), (-1,0), 'Calibri-Bold'),
-            ('FONTSIZE', (0,0), (-1,-1), 9),  # Smaller font to fit in 2 pages
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 5),  # Reduced padding
-            ('TOPPADDING', (0,0), (-1,-1), 5),
-            ('LEFTPADDING', (0,0), (-1,-1), 10),
-            ('RIGHTPADDING', (0,0), (-1,-1), 10),
-            ('ROWBACKGROUNDS', (0,1), (-1,-1), [secondary_color, colors.white]),
-        ]))
-        elements.append(clinical_table)
-        elements.append(Spacer(1, 10))
-        
-        # 3. Clinical Snapshot - with bold clinical values
-        elements.append(Paragraph("3. YOUR CLINICAL SNAPSHOT", heading_style))
-        
-        # Display top 3 significant features
-        elements.append(Paragraph("Top 3 Significant Features:", subheading_style))
-        
-        # Create top features section with bold feature names AND values
-        for feature, value in top_features:
-            formatted_value = round(value, 3)
-            if "concave_points" in feature and value > 0.1:
-                elements.append(Paragraph(f"<b>{feature}</b> of <b>{formatted_value}</b> - Elevated concave points suggest abnormal curvature in cell structure", normal_style))
-            elif "radius" in feature and value > 15:
-                elements.append(Paragraph(f"<b>{feature}</b> of <b>{formatted_value}</b> - Increased radius indicates larger than normal cell size", normal_style))
-            elif "area" in feature and value > 800:
-                elements.append(Paragraph(f"<b>{feature}</b> of <b>{formatted_value}</b> - Enlarged area measurement suggests abnormal cell growth", normal_style))
-            elif "perimeter" in feature and value > 100:
-                elements.append(Paragraph(f"<b>{feature}</b> of <b>{formatted_value}</b> - Extended perimeter indicates larger boundary of the cells", normal_style))
-            elif "texture" in feature and value > 20:
-                elements.append(Paragraph(f"<b>{feature}</b> of <b>{formatted_value}</b> - Higher texture variation shows cellular structural irregularity", normal_style))
-            else:
-                elements.append(Paragraph(f"<b>{feature}</b> of <b>{formatted_value}</b> - Notable indicator for diagnostic assessment", normal_style))
-        
-        elements.append(Spacer(1, 10))
-        
-        # 4. Risk Score and Category
-        elements.append(Paragraph("4. RISK SCORE AND CATEGORY", heading_style))
-        
-        # Determine risk category based on score
-        risk_score_formatted = round(risk_score, 1)
-        
-        if risk_score < 500:
-            risk_level = "Normal"
-            risk_color = primary_color  # Use primary color for normal
-            if diagnosis.lower() == 'benign':
-                risk_note = "Your risk profile is within normal range. Continue routine screenings."
-            else:
-                risk_note = "Despite low risk score, follow recommended treatment due to diagnosis."
-        else:
-            risk_level = "Elevated"
-            risk_color = colors.HexColor('#E76F51')  # Salmon color for elevated risk
-            if diagnosis.lower() == 'malignant':
-                risk_note = "Your elevated risk score requires immediate medical attention."
-            else:
-                risk_note = "Further testing recommended due to elevated risk indicators."
-        
-        # Create a highlighted risk information box
-        risk_data = [
-            [Paragraph("<b>RISK ASSESSMENT</b>", normal_style)],
-            [Paragraph(f"<b>Score:</b> {risk_score_formatted}%", normal_style)],
-            [Paragraph(f"<b>Status:</b> {risk_level}", normal_style)],
-            [Paragraph(f"<b>Assessment:</b> {risk_note}", normal_style)]
-        ]
-        
-        risk_box = Table(risk_data, colWidths=[470])
-        
-        risk_box.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (0,0), risk_color),
-            ('BACKGROUND', (0,1), (0,-1), secondary_color),
-            ('TEXTCOLOR', (0,0), (0,0), colors.white),
-            ('FONTNAME', (0,0), (0,0), 'Calibri-Bold'),
-            ('ALIGNMENT', (0,0), (0,0), 'CENTER'),
-            ('BOX', (0,0), (-1,-1), 1, risk_color),
-            ('FONTSIZE', (0,0), (0,0), 11),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 6),
-            ('TOPPADDING', (0,0), (-1,-1), 6),
-            ('LEFTPADDING', (0,0), (-1,-1), 15),
-            ('RIGHTPADDING', (0,0), (-1,-1), 15),
-        ]))
-        elements.append(risk_box)
-        elements.append(Spacer(1, 6))
-        
-        elements.append(Paragraph("Estimated from clinical features like concavity, perimeter, etc.", normal_style))
-        elements.append(Paragraph("A score > 500% indicates high risk. Normal range: <500%", normal_style))
-        elements.append(Spacer(1, 10))
-        
-        # 5. Age & Gender-Based Guidance - More personalized, with patient name in sentence instead of bullet
-        elements.append(Paragraph("5. AGE & GENDER-BASED GUIDANCE", heading_style))
-        
-        # Personalized age and gender guidance
-        if gender.lower() == 'female':
-            if int(age) < 40:
-                elements.append(Paragraph(f"At {age} years old as a woman, your risk of breast cancer is lower than older age groups, but vigilance is still important:", normal_style))
-                # Add patient name recommendation as normal text instead of bullet point
-                elements.append(Paragraph(f"<b>{patient_name}</b>, we recommend clinical breast examinations every 1-3 years at your age of {age}.", normal_style))
-                guidance_points = [
-                    "Learn and practice monthly breast self-examinations - early detection is key",
-                    "Discuss your family history with your doctor to identify any hereditary risk factors"
-                ]
-            elif int(age) < 50:
-                elements.append(Paragraph(f"At {age} years old as a woman, you're entering a period where regular screening becomes increasingly important:", normal_style))
-                # Add patient name recommendation as normal text instead of bullet point
-                elements.append(Paragraph(f"<b>{patient_name}</b>, we strongly recommend annual mammograms starting at your current age of {age}.", normal_style))
-                guidance_points = [
-                    "Continue monthly breast self-examinations to monitor any changes",
-                    "Consider digital mammography which may be more effective for your age group"
-                ]
-            else:
-                elements.append(Paragraph(f"At {age} years old as a woman, your age group has an increased risk that requires diligent monitoring:", normal_style))
-                # Add patient name recommendation as normal text instead of bullet point
-                elements.append(Paragraph(f"<b>{patient_name}</b>, at {age}, annual mammograms are essential - schedule your next one promptly.", normal_style))
-                guidance_points = [
-                    "Consider additional screening methods like breast MRI if you have other risk factors",
-                    "Maintain regular clinical examinations every 6-12 months"
-                ]
-        elif gender.lower() == 'male':
-            elements.append(Paragraph(f"As a {age}-year-old man, breast cancer is rare but still possible:", normal_style))
-            # Add patient name recommendation as normal text instead of bullet point
-            elements.append(Paragraph(f"<b>{patient_name}</b>, even as a male at {age}, be aware of any unusual changes to chest tissue.", normal_style))
-            guidance_points = [
-                "Discuss any family history of breast cancer (especially in male relatives) with your doctor",
-                "Regular physical examinations are recommended to monitor overall health"
-            ]
-        else:
-            elements.append(Paragraph(f"Based on your age of {age}, we recommend:", normal_style))
-            # Add patient name recommendation as normal text instead of bullet point
-            elements.append(Paragraph(f"<b>{patient_name}</b>, regular breast health monitoring is appropriate for your age of {age}.", normal_style))
-            guidance_points = [
-                "Discuss personalized screening recommendations with your healthcare provider",
-                "Be aware of any changes in breast tissue and report them promptly"
-            ]
-        
-        for point in guidance_points:
-            elements.append(Paragraph(f"• {point}", bullet_style))
-        
-        elements.append(Spacer(1, 10))
-        
-        # 6. Lifestyle & Nutrition Recommendations - DIFFERENT BASED ON DIAGNOSIS
-        elements.append(Paragraph("6. LIFESTYLE & NUTRITION RECOMMENDATIONS", heading_style))
-        
-        lifestyle_points = []
-        
-        if diagnosis.lower() == 'malignant':
-            lifestyle_points.extend([
-                "Prioritize a plant-based diet rich in cruciferous vegetables, berries, and leafy greens",
-                "Include sources of omega-3 fatty acids such as flaxseeds, walnuts, and fatty fish",
-                "Strictly limit alcohol consumption and avoid tobacco products entirely",
-                "Maintain moderate physical activity (with physician approval) - aim for gentle exercise like walking",
-                "Consider joining a cancer nutrition program for personalized dietary guidance",
-                "Stay well-hydrated with filtered water and herbal teas without added sugars",
-                "Minimize exposure to environmental toxins and chemicals in personal care products"
-            ])
-        else:  # Benign
-            lifestyle_points.extend([
-                "Maintain a balanced Mediterranean-style diet rich in fruits, vegetables, and whole grains",
-                "Limit alcohol consumption to reduce breast cancer risk (no more than one drink per day)",
-                "Maintain healthy weight through balanced nutrition and regular exercise",
-                "Incorporate regular physical activity for at least 150 minutes per week",
-                "Ensure adequate vitamin D through sun exposure or supplements (with physician guidance)",
-                "Practice stress reduction techniques like meditation, yoga, or mindfulness",
-                "Get sufficient sleep (7-8 hours nightly) to support immune function"
-            ])
-        
-        for point in lifestyle_points:
-            elements.append(Paragraph(f"• {point}", bullet_style))
-        
-        elements.append(Spacer(1, 10))
-        
-        # 7. Monitoring & Follow-Up - DIFFERENT BASED ON DIAGNOSIS
-        elements.append(Paragraph("7. MONITORING & FOLLOW-UP", heading_style))
-        
-        followup_points = []
-        
-        if diagnosis.lower() == 'malignant':
-            followup_points.extend([
-                "Schedule appointment with oncologist within one week for treatment planning",
-                "Prepare for additional diagnostic imaging (MRI, PET scan) as recommended",
-                "Discuss surgical options and timing with breast cancer surgeon",
-                "Consider genetic testing for treatment planning if not already completed",
-                "Schedule consultation with radiation and medical oncology teams",
-                "Keep detailed journal of symptoms, side effects, and questions for medical team",
-                "Look into clinical trial opportunities that may be appropriate for your specific diagnosis",
-                "Meet with patient navigator to coordinate appointments and support services"
-            ])
-        else:  # Benign
-            followup_points.extend([
-                "Follow up with your physician in 6 months for clinical breast examination",
-                "Schedule next mammogram according to age-appropriate guidelines (typically annually)",
-                "Consider supplemental screening with ultrasound if you have dense breast tissue",
-                "Report any changes in breast tissue or symptoms immediately to your doctor",
-                "Maintain records of all imaging and examination results for comparison over time",
-                "Continue or establish regular breast self-examination routine",
-                "Annual risk re-evaluation with your healthcare provider",
-                "Consider consultation with genetic counselor if you have family history of breast cancer"
-            ])
-        
-        for point in followup_points:
-            elements.append(Paragraph(f"• {point}", bullet_style))
-        
-        elements.append(Spacer(1, 10))
-        
-        # 8. Support Resources - numbered list
-        elements.append(Paragraph("8. SUPPORT RESOURCES", heading_style))
-        
-        support_resources = [
-            ("American Cancer Society:", "https://www.cancer.org", "Comprehensive cancer information and support services"),
-            ("National Cancer Institute:", "https://www.cancer.gov", "Government resource for cancer research and patient support"),
-            ("Breast Cancer Research Foundation:", "https://www.bcrf.org", "Research updates and patient resources"),
-            ("National Cancer Helpline:", "1-800-227-2345", "24/7 assistance and guidance")
-        ]
-        
-        # Using numbered list
-        for i, (name, url, description) in enumerate(support_resources, 1):
-            if "Helpline" in name:
-                elements.append(Paragraph(f"{i}. <b>{name}</b> {url} - {description}", normal_style_black))
-            else:
-                elements.append(Paragraph(f"{i}. <b>{name}</b> {url} - {description}", normal_style_black))
-        
-        elements.append(Spacer(1, 10))
-        
-        # 9. Additional Information - condensed for space
-        elements.append(Paragraph("9. ADDITIONAL INFORMATION", heading_style))
-        
-        # Create a framed advisory box
-        advisory = """This report is intended to serve as a supplemental tool for breast cancer screening and risk assessment. 
-        It is not a replacement for professional medical advice, diagnosis, or treatment. Always seek the advice of your 
-        physician with any questions regarding your medical condition or the results presented in this report."""
-        
-        advisory_paragraph = Paragraph(advisory, normal_style)
-        
-        advisory_frame = Table([[advisory_paragraph]], colWidths=[470])
-        advisory_frame.setStyle(TableStyle([
-            ('BOX', (0,0), (-1,-1), 1, primary_color),
-            ('BACKGROUND', (0,0), (-1,-1), secondary_color),
-            ('LEFTPADDING', (0,0), (-1,-1), 10),
-            ('RIGHTPADDING', (0,0), (-1,-1), 10),
-            ('TOPPADDING', (0,0), (-1,-1), 6),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 6),
-        ]))
-        
-        elements.append(advisory_frame)
-        elements.append(Spacer(1, 10))
-        
-        # Add dividing line before footer using a Table instead of HRFlowable
-        hr_footer = Table([[""]],
-                  colWidths=[doc.width],
-                  rowHeights=[1])
-        hr_footer.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), colors.lightgrey),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
-        elements.append(hr_footer)
-        elements.append(Spacer(1, 4))
-        
-        # 10. Report Footer
-        footer_text = f"Report generated for: {patient_name} | Date: {report_date} | CONFIDENTIAL MEDICAL INFORMATION"
-        elements.append(Paragraph(footer_text, footer_style))
-        
-        # Build PDF
-        doc.build(elements)
-        pdf_buffer.seek(0)
-        
+
+        # Contributions are part of the cache key, so a retrained model never serves a stale explanation
+        with metrics.span('report.explain'):
+            data = with_contributions(data)
+
+        # Identical payloads on the same day produce identical reports
+        with metrics.span('report.cache_lookup'):
+            key = report_cache.key_for(data, report_date)
+            report_file = report_cache.get(key)
+        if report_file is None:
+            from report import render_report  # reportlab is only imported once a report is rendered
+            with metrics.span('report.render'):
+                pdf = render_report(data, report_date)
+            with metrics.span('report.cache_store'):
+                report_file = report_cache.put(key, pdf)
+
         return send_file(
-            pdf_buffer,
+            report_file,
             as_attachment=True,
             download_name=f"breast_cancer_report_{patient_name}.pdf",
             mimetype='application/pdf'
@@ -656,31 +688,93 @@ def generate_report():
         return jsonify({"error": str(e)}), 500
 
 
-def get_top_features(clinical_data, num_features=3):
-    """
-    Get the top N most significant features based on relative values.
-    For simplicity, we're using 'worst' features as they typically have more significance.
-    """
-    # Define important feature patterns to prioritize
-    important_patterns = ['_worst', 'concave_points', 'area', 'radius', 'perimeter']
-    
-    # Extract and sort features
-    features = []
-    for key, value in clinical_data.items():
-        # Calculate importance score - higher for important patterns
-        importance = 0
-        for pattern in important_patterns:
-            if pattern in key:
-                importance += 1
-        
-        # Add tuple (key, value, importance)
-        features.append((key, value, importance))
-    
-    # Sort by importance (descending) and then by value (descending)
-    features.sort(key=lambda x: (x[2], x[1]), reverse=True)
-    
-    # Return top N features (without the importance score)
-    return [(f[0], f[1]) for f in features[:num_features]]
+@app.route("/generate-report/jobs", methods=['GET', 'POST'])
+def submit_report_job():
+    """Queue report rendering and return a job id immediately (GET reports queue stats)."""
+    if request.method == 'GET':
+        return jsonify(report_jobs.stats())
+
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+
+        # {"patients": [...]} renders several reports into one ZIP
+        payloads = data['patients'] if isinstance(data, dict) and 'patients' in data else [data]
+        if not payloads or not all(isinstance(payload, dict) for payload in payloads):
+            return jsonify({'error': 'patients must be a non-empty list of report payloads'}), 400
+
+        payloads = [with_contributions(payload) for payload in payloads]
+        job = report_jobs.submit(payloads, datetime.now().strftime("%Y-%m-%d"))
+        return jsonify({
+            **job.describe(),
+            'status_url': f"/generate-report/jobs/{job.id}",
+            'download_url': f"/generate-report/jobs/{job.id}/download"
+        }), 202
+
+    except JobQueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        print(f"Error queuing report job: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/generate-report/jobs/<job_id>", methods=['GET', 'DELETE'])
+def report_job_status(job_id):
+    """Poll a report job, or cancel it with DELETE."""
+    job = report_jobs.cancel(job_id) if request.method == 'DELETE' else report_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job.describe())
+
+
+@app.route("/generate-report/jobs/<job_id>/download", methods=['GET'])
+def download_report_job(job_id):
+    """Download a finished job's PDF (or ZIP for multi-patient jobs)."""
+    job = report_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    if job.status != 'done':
+        return jsonify(job.describe()), 409
+
+    content, mimetype, extension = report_jobs.result(job)
+    name = job.payloads[0].get('name', 'Patient') if len(job.payloads) == 1 else job.id
+    return send_file(
+        BytesIO(content),
+        as_attachment=True,
+        download_name=f"breast_cancer_report_{name}.{extension}",
+        mimetype=mimetype
+    )
+
+
+@app.route('/api/model', methods=['GET'])
+def model_info():
+    """Describe the model version serving predictions and the versions in the registry."""
+    loaded = current_model
+    return jsonify({
+        'version': loaded.version,
+        'required_features': loaded.required_features,
+        'classes': loaded.classes,
+        'metadata': loaded.metadata,
+        'hot_reload': model_watcher is not None,
+        'registry': [
+            {key: version[key] for key in ('version', 'published_at', 'sha256', 'n_estimators', 'active')}
+            for version in model_registry.list_versions(MODEL_REGISTRY_DIR)
+        ]
+    })
+
+@app.route('/api/prediction-cache-stats', methods=['GET'])
+def prediction_cache_stats():
+    """Report /predict cache hit ratio, evictions and size."""
+    if prediction_cache is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **prediction_cache.stats()})
+
+@app.route('/api/report-cache-stats', methods=['GET'])
+def report_cache_stats():
+    """Report PDF cache hit ratio, evictions and bytes stored."""
+    return jsonify(report_cache.stats())
+
 
 @app.route("/get_previous_metrics")
 def get_previous_metrics():
@@ -693,111 +787,284 @@ def get_previous_metrics():
     patient_data = fetch_patient_data(patient_id)
 
     if patient_data:
-        # Return the patient data as a JSON response
-        return jsonify(patient_data)
+        # Return the patient data as a JSON response, or 304 if the client already has it
+        return conditional_json(patient_data, *record_validators(patient_data, 'patient'))
     else:
         return jsonify({"error": "No data found for the given patient_id"}), 404
 
+HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', 50))
+HISTORY_MAX_PAGE_SIZE = int(os.environ.get('HISTORY_MAX_PAGE_SIZE', 500))
+
+def patient_record(row):
+    """JSON-ready dict for one patients row."""
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'age': row['age'],
+        'gender': row['gender'],
+        'family_history': row['family_history'],
+        'symptoms': row['symptoms'],
+        'previous_cancer': row['previous_cancer'],
+        'clinical_data': db_functions.clinical_data_from_row(row),
+        'prediction_result': row['prediction_result'],
+        'confidence': row['confidence'],
+        'timestamp': row['timestamp'],
+        'confirmed_diagnosis': row['confirmed_diagnosis'],
+        'model_version': row['model_version']
+    }
+
+def encode_cursor(row):
+    """Opaque cursor for the (timestamp, id) position of the last row on a page."""
+    return base64.urlsafe_b64encode(json.dumps([str(row['timestamp']), row['id']]).encode()).decode()
+
+def decode_cursor(cursor):
+    timestamp, patient_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return str(timestamp), int(patient_id)
+
+@app.route('/api/history', methods=['GET'])
+def patient_history():
+    """
+    Stored predictions, newest first, filtered by name, diagnosis (M/B,
+    Malignant/Benign or the stored label, in any case) and timestamp range
+    (since inclusive, until exclusive). Pages are keyset paginated: pass
+    next_cursor back as ?cursor=. With ?format=ndjson every matching row is
+    streamed as one JSON object per line instead.
+    """
+    filters = {
+        'name': request.args.get('name'),
+        'diagnosis': request.args.get('diagnosis') or None,
+        # Stored timestamps use a space separator; accept ISO 'T' too
+        'since': request.args.get('since', '').replace('T', ' ') or None,
+        'until': request.args.get('until', '').replace('T', ' ') or None,
+    }
+
+    if filters['diagnosis'] is not None and db_functions.diagnosis_label(filters['diagnosis']) is None:
+        return jsonify({'error': "diagnosis must be 'M', 'B', 'Malignant' or 'Benign'"}), 400
+
+    if request.args.get('format') == 'ndjson':
+        def generate():
+            for row in db_functions.iter_history(**filters):
+                yield json.dumps(patient_record(row), default=str) + '\n'
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    try:
+        limit = min(max(int(request.args.get('limit', HISTORY_PAGE_SIZE)), 1), HISTORY_MAX_PAGE_SIZE)
+        before = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid limit or cursor'}), 400
+
+    try:
+        # One extra row tells us whether there is a next page
+        rows = db_functions.get_history_page(limit + 1, before=before, **filters)
+        page = rows[:limit]
+        return jsonify({
+            'patients': [patient_record(row) for row in page],
+            'next_cursor': encode_cursor(page[-1]) if len(rows) > limit else None,
+            'limit': limit
+        })
+    except Exception as e:
+        print(f"❌ Error fetching patient history: {str(e)}")
+        return jsonify({'error': 'Failed to fetch patient history', 'details': str(e)}), 500
+
+@app.route('/api/patients/<int:patient_id>/confirm', methods=['POST'])
+def confirm_diagnosis(patient_id):
+    """Record the clinically confirmed diagnosis ('M' or 'B') used by retrain.py."""
+    data = request.get_json(silent=True) or {}
+    diagnosis = str(data.get('diagnosis', '')).strip().upper()
+
+    if diagnosis not in ('M', 'B'):
+        return jsonify({'error': "diagnosis must be 'M' or 'B'"}), 400
+
+    try:
+        if not db_functions.confirm_diagnosis(patient_id, diagnosis):
+            return jsonify({'error': 'No data found for the given patient_id'}), 404
+        return jsonify({'id': patient_id, 'confirmed_diagnosis': diagnosis, 'status': 'success'})
+    except Exception as e:
+        print(f"❌ Error confirming diagnosis: {str(e)}")
+        return jsonify({'error': 'Failed to confirm diagnosis', 'details': str(e)}), 500
+
 @app.route('/predict', methods=['POST'])
 def predict():
     """Handle prediction requests with validation."""
     try:
-        data = request.get_json(force=True)
+        with metrics.span('predict.parse'):
+            data = request.get_json(force=True)
 
         if not data:
             return jsonify({'error': 'No data provided'}), 400
 
         # ===== Validate Clinical Data =====
-        clinical_data = {}
-        missing_fields = []
-        invalid_fields = []
-
-        for feature in REQUIRED_FEATURES:
-            if feature not in data:
-                missing_fields.append(feature)
-                continue
-            try:
-                clinical_data[feature] = float(data[feature])
-            except (ValueError, TypeError):
-                invalid_fields.append(feature)
-
-        if missing_fields:
-            return jsonify({'error': 'Missing required fields', 'fields': missing_fields}), 400
+        with metrics.span('predict.validate'):
+            clinical_data, missing_fields, invalid_fields = validate_clinical_data(data)
 
-        if invalid_fields:
-            return jsonify({'error': 'Invalid values', 'fields': invalid_fields, 'message': 'All fields must be numeric'}), 400
+        error = validation_error(missing_fields, invalid_fields)
+        if error:
+            return jsonify(error), 400
 
         # ===== Extract Patient Metadata =====
-        patient_metadata = {
-            'name': data.get('patient_name', 'Anonymous'),
-            'age': int(data.get('age', 0)) if data.get('age') else None,
-            'gender': data.get('gender'),
-            'family_history': data.get('family_history'),
-            'symptoms': data.get('symptoms'),
-            'previous_cancer': data.get('previous_cancer')
-        }
+        patient_metadata = extract_patient_metadata(data)
 
         # ===== Make Prediction =====
-        input_df = pd.DataFrame([clinical_data], columns=REQUIRED_FEATURES)
-        prediction = model.predict(input_df)[0]
-        probabilities = model.predict_proba(input_df)[0]
+        input_row = np.array([[clinical_data[f] for f in REQUIRED_FEATURES]], dtype=np.float64)
+        try:
+            probabilities, contributions, model_version = score_case(input_row)
+        except BatcherFullError:
+            return jsonify({'error': 'Server busy, please retry'}), 503
+        except BatcherTimeoutError:
+            return jsonify({'error': 'Prediction timed out'}), 504
 
         # Prepare diagnosis results
-        is_malignant = prediction == 'M'
-        diagnosis = 'Malignant (M)' if is_malignant else 'Benign (B)'
-        confidence = max(probabilities) * 100
-        malignant_prob = f"{probabilities[0]*100:.2f}%"
-        benign_prob = f"{probabilities[1]*100:.2f}%"
-        message = "⚠️ High risk: Consult a doctor immediately!" if is_malignant else "✅ Low risk: Follow up with medical professionals."
+        with metrics.span('predict.format'):
+            result = format_prediction(probabilities)
 
         # ===== Store Results in Database =====
-        db = get_db()
-        cursor = db.cursor()
-        cursor.execute(''' 
-            INSERT INTO patients (
-                name, age, gender, family_history, symptoms, previous_cancer, 
-                clinical_data, prediction_result, confidence, timestamp
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            patient_metadata['name'],
-            patient_metadata['age'],
-            patient_metadata['gender'],
-            patient_metadata['family_history'],
-            patient_metadata['symptoms'],
-            patient_metadata['previous_cancer'],
-            json.dumps(clinical_data),
-            diagnosis,
-            f"{confidence:.2f}%",
-            datetime.now()
-        ))
-        db.commit()
-        patient_id = cursor.lastrowid
-        db.close()
-
-        # ===== Store in Session for Chatbot =====
-        session['last_diagnosis'] = {
-            'id': patient_id,
-            **patient_metadata,
-            'clinical_data': clinical_data,
-            'diagnosis': diagnosis,
-            'confidence': f"{confidence:.2f}%",
-            'malignant_prob': malignant_prob,
-            'benign_prob': benign_prob,
-            'message': message
-        }
+        timestamp = datetime.now()
+        with metrics.span('predict.store'):
+            patient_id = store_patient_rows([patient_row(patient_metadata, clinical_data, result, timestamp, model_version)])[0]
+
+        # ===== Store in Session for Chatbot and Push to Open Chatbot Pages =====
+        session['last_diagnosis'] = last_diagnosis_record(patient_id, patient_metadata, clinical_data, result, timestamp)
+        diagnosis_hub.publish(app.session_interface.ensure_sid(session), session['last_diagnosis'])
+
+        return jsonify(prediction_response(result, contributions, model_version))
+
+    except Exception as e:
+        print(f"❌ Prediction error: {str(e)}")
+        return jsonify({'error': 'Prediction failed', 'details': str(e)}), 500
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """Score many cases with a single model call and store them in one transaction."""
+    try:
+        data = request.get_json(force=True)
+
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+
+        try:
+            cases = normalize_batch(data)
+        except ValueError as e:
+            return jsonify({'error': 'Invalid batch', 'details': str(e)}), 400
+
+        if len(cases) > MAX_BATCH_SIZE:
+            return jsonify({'error': 'Batch too large', 'max_batch_size': MAX_BATCH_SIZE}), 413
+
+        loaded = current_model  # the whole batch is scored and recorded with one version
+
+        # ===== Validate Every Case =====
+        results = [None] * len(cases)
+        valid = []  # (index, clinical_data, patient_metadata)
+
+        for index, case in enumerate(cases):
+            if not isinstance(case, dict):
+                results[index] = {'index': index, 'status': 'error', 'error': 'Case must be an object'}
+                continue
+
+            clinical_data, missing_fields, invalid_fields = validate_clinical_data(case)
+            if missing_fields:
+                results[index] = {'index': index, 'status': 'error', 'error': 'Missing required fields', 'fields': missing_fields}
+                continue
+            if invalid_fields:
+                results[index] = {'index': index, 'status': 'error', 'error': 'Invalid values', 'fields': invalid_fields}
+                continue
+
+            try:
+                patient_metadata = extract_patient_metadata(case)
+            except (ValueError, TypeError):
+                results[index] = {'index': index, 'status': 'error', 'error': 'Invalid values', 'fields': ['age']}
+                continue
+
+            valid.append((index, clinical_data, patient_metadata))
+
+        # ===== Score Valid Cases in One Call =====
+        if valid:
+            matrix = np.array(
+                [[clinical_data[f] for f in REQUIRED_FEATURES] for _, clinical_data, _ in valid],
+                dtype=np.float64
+            )
+            with metrics.span('predict_batch.model'):
+                probabilities = score_matrix(matrix, loaded)
+            with metrics.span('predict_batch.explain'):
+                explanations = explain_matrix(matrix, loaded)
+
+            # ===== Store All Scored Cases in One Transaction =====
+            timestamp = datetime.now()
+            rows = []
+            for (index, clinical_data, patient_metadata), row_probabilities, explanation in zip(valid, probabilities, explanations):
+                result = format_prediction(row_probabilities)
+                rows.append(patient_row(patient_metadata, clinical_data, result, timestamp, loaded.version))
+                results[index] = {'index': index, 'status': 'success', **result, 'feature_contributions': explanation}
+
+            with metrics.span('predict_batch.store'):
+                patient_ids = store_patient_rows(rows)
+            for (index, _, _), patient_id in zip(valid, patient_ids):
+                results[index]['id'] = patient_id
 
         return jsonify({
-            'diagnosis': diagnosis,
-            'message': message,
-            'confidence': f"{confidence:.2f}%",
-            'malignant_prob': malignant_prob,
-            'benign_prob': benign_prob,
+            'results': results,
+            'scored': len(valid),
+            'failed': len(cases) - len(valid),
+            'model_version': loaded.version,
             'status': 'success'
         })
 
     except Exception as e:
-        print(f"❌ Prediction error: {str(e)}")
-        return jsonify({'error': 'Prediction failed', 'details': str(e)}), 500
+        print(f"❌ Batch prediction error: {str(e)}")
+        return jsonify({'error': 'Batch prediction failed', 'details': str(e)}), 500
+
+@app.route('/api/profiles', methods=['GET'])
+def list_profiles():
+    """List saved request profiles (requires the X-Profile token)."""
+    if profile_store is None:
+        return jsonify({'enabled': False}), 404
+    if not profiling.is_authorized(request.headers.get(profiling.HEADER)):
+        return jsonify({'error': 'Profiling token required'}), 403
+    return jsonify({'enabled': True, 'profiles': profile_store.list()})
+
+@app.route('/api/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    """Download a .prof file, or its top functions as text with ?format=text."""
+    if profile_store is None:
+        return jsonify({'enabled': False}), 404
+    if not profiling.is_authorized(request.headers.get(profiling.HEADER)):
+        return jsonify({'error': 'Profiling token required'}), 403
+
+    if request.args.get('format') == 'text':
+        summary = profile_store.summary(profile_id)
+        if summary is None:
+            return jsonify({'error': 'Unknown profile'}), 404
+        return Response(summary, content_type='text/plain; charset=utf-8')
+
+    path = profile_store.path_for(profile_id)
+    if path is None:
+        return jsonify({'error': 'Unknown profile'}), 404
+    return send_file(path, as_attachment=True, download_name=f"{profile_id}.prof",
+                     mimetype='application/octet-stream')
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Per-route request counts, error counts and stage latency histograms for Prometheus."""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/api/batcher-stats', methods=['GET'])
+def batcher_stats():
+    """Report micro-batching statistics (batch sizes, queue wait)."""
+    if batcher is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **batcher.stats()})
+
+@app.route('/api/diagnosis-events-stats', methods=['GET'])
+def diagnosis_events_stats():
+    """Report open diagnosis streams in this process and diagnoses published to them."""
+    return jsonify(diagnosis_hub.stats())
+
+@app.route('/api/write-behind-stats', methods=['GET'])
+def write_behind_stats():
+    """Report write-behind queue depth and flush latency."""
+    if writer is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **writer.metrics()})
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    create_app().run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,293 @@
+"""
+ASGI serving mode for the request-heavy routes.
+
+    pip install starlette uvicorn
+    uvicorn asgi_app:app --workers 4
+
+/predict, /api/refresh-patient-data, /get_previous_metrics,
+/api/diagnosis-events and /generate-report are async handlers that keep the
+event loop free:
+
+  * SQLite and report-cache file I/O run on a thread pool sized to the
+    connection pool (DB_POOL_SIZE), so a request waiting on the database
+    holds a coroutine rather than a server thread, and every I/O thread
+    always finds a free connection;
+  * model inference and feature attributions run on a small thread pool
+    (ASGI_INFERENCE_THREADS); NumPy releases the GIL for most of that work;
+  * reportlab holds the GIL throughout, so PDFs render in worker processes
+    (ASGI_REPORT_PROCESSES);
+  * an open Server-Sent Events stream is an idle coroutine rather than a
+    blocked server thread, so chatbot pages can stay connected in any number.
+
+Every other route is served by the Flask app mounted underneath, so the UI
+and the remaining APIs behave exactly as under `python app.py`, and both
+halves share the server-side sessions from session_store.py.
+
+    python -m benchmarks --asgi   # throughput against the threaded Flask server
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+from functools import partial
+from urllib.parse import quote
+
+import numpy as np
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+import app as flask_app
+import db_functions
+import diagnosis_events
+import metrics
+from batching import BatcherFullError, BatcherTimeoutError
+from report_jobs import render_in_worker
+
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', DeprecationWarning)  # still the simplest way to mount a WSGI app
+    from starlette.middleware.wsgi import WSGIMiddleware
+
+INFERENCE_THREADS = int(os.environ.get('ASGI_INFERENCE_THREADS', min(4, os.cpu_count() or 1)))
+REPORT_PROCESSES = int(os.environ.get('ASGI_REPORT_PROCESSES', 2))
+
+io_executor = ThreadPoolExecutor(max_workers=db_functions.POOL_SIZE, thread_name_prefix='asgi-io')
+inference_executor = ThreadPoolExecutor(max_workers=INFERENCE_THREADS, thread_name_prefix='asgi-inference')
+report_executor = None  # started by lifespan(), so importing this module never forks
+
+
+async def run_in(executor, fn, *args):
+    """Await fn(*args) on an executor."""
+    return await asyncio.get_running_loop().run_in_executor(executor, partial(fn, *args))
+
+
+def instrumented(handler):
+    """Record request metrics for an async route, as app.py's hooks do for the Flask routes."""
+    async def endpoint(request):
+        start = time.perf_counter()
+        response = await handler(request)
+        route = request.scope['route'].path
+        metrics.observe_request(route, request.method, response.status_code, time.perf_counter() - start)
+        return response
+    return endpoint
+
+
+# ===== Server-Side Sessions Shared With Flask =====
+async def load_session(request):
+    """Return (session id, data); the id is None when the cookie names no live session."""
+    interface = flask_app.app.session_interface
+    sid = request.cookies.get(interface.get_cookie_name(flask_app.app))
+    data = await run_in(io_executor, interface.load, sid) if sid else None
+    return (sid, data) if data is not None else (None, {})
+
+
+async def save_session(response, sid, data):
+    """Store the session, set its cookie on the response and return its id (new when sid is None)."""
+    interface = flask_app.app.session_interface
+    sid = await run_in(io_executor, interface.save, sid, data)
+    response.set_cookie(interface.get_cookie_name(flask_app.app), sid, **interface.cookie_options(flask_app.app))
+    return sid
+
+
+def attachment(filename):
+    """Content-Disposition for a download, RFC 5987-encoded when the name is not plain ASCII."""
+    quoted = quote(filename)
+    if quoted == filename:
+        return f'attachment; filename="{filename}"'
+    return f"attachment; filename*=utf-8''{quoted}"
+
+
+def conditional_json(request, payload, etag, last_modified, headers=None):
+    """JSONResponse(payload), or an empty 304 if the request already holds this version."""
+    headers = {**flask_app.validator_headers(etag, last_modified), **(headers or {})}
+    if flask_app.is_not_modified(request.headers.get('if-none-match'), request.headers.get('if-modified-since'),
+                                 etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(payload, headers=headers)
+
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+# ===== Routes =====
+async def predict(request: Request):
+    """Async /predict: inference on the inference pool, the insert on the I/O pool."""
+    try:
+        data = await read_json(request)
+        if not data:
+            return JSONResponse({'error': 'No data provided'}, status_code=400)
+
+        clinical_data, missing_fields, invalid_fields = flask_app.validate_clinical_data(data)
+        error = flask_app.validation_error(missing_fields, invalid_fields)
+        if error:
+            return JSONResponse(error, status_code=400)
+        patient_metadata = flask_app.extract_patient_metadata(data)
+
+        input_row = np.array([[clinical_data[f] for f in flask_app.REQUIRED_FEATURES]], dtype=np.float64)
+        try:
+            probabilities, contributions, model_version = await run_in(inference_executor, flask_app.score_case, input_row)
+        except BatcherFullError:
+            return JSONResponse({'error': 'Server busy, please retry'}, status_code=503)
+        except BatcherTimeoutError:
+            return JSONResponse({'error': 'Prediction timed out'}, status_code=504)
+        result = flask_app.format_prediction(probabilities)
+
+        timestamp = datetime.now()
+        row = flask_app.patient_row(patient_metadata, clinical_data, result, timestamp, model_version)
+        with metrics.span('predict.store'):
+            patient_id = (await run_in(io_executor, flask_app.store_patient_rows, [row]))[0]
+
+        response = JSONResponse(flask_app.prediction_response(result, contributions, model_version))
+        sid, session = await load_session(request)
+        record = flask_app.last_diagnosis_record(patient_id, patient_metadata, clinical_data, result, timestamp)
+        session['last_diagnosis'] = record
+        sid = await save_session(response, sid, session)
+        flask_app.diagnosis_hub.publish(sid, record)
+        return response
+
+    except Exception as e:
+        print(f"❌ Prediction error: {str(e)}")
+        return JSONResponse({'error': 'Prediction failed', 'details': str(e)}, status_code=500)
+
+
+async def refresh_patient_data(request: Request):
+    """Async /api/refresh-patient-data: the session first, then the latest row; 304 when unchanged."""
+    try:
+        _, session = await load_session(request)
+        patient_data, source = await run_in(io_executor, flask_app.current_diagnosis, session)
+        if not patient_data:
+            return JSONResponse({'error': 'No patient data found'}, status_code=404)
+        return conditional_json(request, patient_data, *flask_app.record_validators(patient_data, source),
+                                headers={'Vary': 'Cookie'})
+
+    except Exception as e:
+        print('Error fetching patient data:', e)
+        return JSONResponse({'error': 'Failed to fetch patient data', 'details': str(e)}, status_code=500)
+
+
+async def diagnosis_event_stream(request: Request):
+    """Async /api/diagnosis-events: the same stream as the Flask route, one coroutine per client."""
+    sid, session = await load_session(request)
+    bound = 'last_diagnosis' in session
+    current, _ = await run_in(io_executor, flask_app.current_diagnosis, session)
+    last_event_id = diagnosis_events.parse_last_event_id(request.headers.get('last-event-id'))
+
+    async def generate():
+        subscription = flask_app.diagnosis_hub.subscribe(diagnosis_events.AsyncSubscription())
+        try:
+            yield diagnosis_events.preamble()
+            if last_event_id is None:
+                stream.last_id = current and current['id']
+            else:
+                message = stream.on_current(current, bound)
+                if message:
+                    yield message
+
+            while True:
+                event = await subscription.get(diagnosis_events.SSE_HEARTBEAT)
+                if event is None:
+                    record, from_session = await run_in(io_executor, flask_app.session_diagnosis, stream.sid)
+                    yield stream.on_current(record, from_session) or diagnosis_events.KEEPALIVE
+                    continue
+                message = stream.on_published(event)
+                if message:
+                    yield message
+        finally:
+            flask_app.diagnosis_hub.unsubscribe(subscription)
+
+    response = StreamingResponse(generate(), media_type='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    if sid is None:
+        # A new client gets its session (and cookie) here, so its first diagnosis is recognised as its own
+        sid = await save_session(response, None, session)
+    stream = diagnosis_events.StreamState(sid, bound, flask_app.public_record, last_event_id)
+    return response
+
+
+async def get_previous_metrics(request: Request):
+    """Async /get_previous_metrics; 304 when unchanged."""
+    patient_id = request.query_params.get('patient_id')
+    if not patient_id:
+        return JSONResponse({'error': 'patient_id is required'}, status_code=400)
+
+    patient_data = await run_in(io_executor, flask_app.fetch_patient_data, patient_id)
+    if patient_data:
+        return conditional_json(request, patient_data, *flask_app.record_validators(patient_data, 'patient'))
+    return JSONResponse({'error': 'No data found for the given patient_id'}, status_code=404)
+
+
+def read_cached_report(key):
+    report = flask_app.report_cache.get(key)
+    if report is None:
+        return None
+    with report:
+        return report.read()
+
+
+def store_report(key, pdf):
+    flask_app.report_cache.put(key, pdf).close()
+
+
+async def generate_report(request: Request):
+    """Async /generate-report: cache I/O on the I/O pool, rendering in a worker process."""
+    try:
+        data = await read_json(request)
+        patient_name = data.get('name', 'Patient')
+        report_date = datetime.now().strftime("%Y-%m-%d")
+
+        data = await run_in(inference_executor, flask_app.with_contributions, data)
+        key = flask_app.report_cache.key_for(data, report_date)
+        pdf = await run_in(io_executor, read_cached_report, key)
+        if pdf is None:
+            with metrics.span('report.render'):
+                pdf = await run_in(report_executor, render_in_worker, data, report_date)
+            await run_in(io_executor, store_report, key, pdf)
+
+        return Response(pdf, media_type='application/pdf', headers={
+            'Content-Disposition': attachment(f"breast_cancer_report_{patient_name}.pdf")
+        })
+
+    except Exception as e:
+        print(f"Error generating PDF: {str(e)}")
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@asynccontextmanager
+async def lifespan(_):
+    global report_executor
+    await run_in(None, flask_app.warmup)
+    # Spawned like report_jobs' pool: forking now would copy the running loop's threads' locks
+    report_executor = ProcessPoolExecutor(max_workers=REPORT_PROCESSES, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        yield
+    finally:
+        report_executor.shutdown(cancel_futures=True)
+
+
+# Same open CORS policy as CORS(app) in app.py; the mounted Flask app adds its own headers
+CORS = [Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])]
+
+app = Starlette(
+    routes=[
+        Route('/predict', instrumented(predict), methods=['POST', 'OPTIONS'], middleware=CORS),
+        Route('/api/refresh-patient-data', instrumented(refresh_patient_data), methods=['GET'], middleware=CORS),
+        Route('/get_previous_metrics', instrumented(get_previous_metrics), methods=['GET'], middleware=CORS),
+        Route('/api/diagnosis-events', instrumented(diagnosis_event_stream), methods=['GET'], middleware=CORS),
+        Route('/generate-report', instrumented(generate_report), methods=['POST', 'OPTIONS'], middleware=CORS),
+        Mount('/', app=WSGIMiddleware(flask_app.app)),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,119 @@
+"""
+Micro-batching scheduler for single-case predictions.
+
+Concurrent callers submit one feature row each; a background thread collects
+rows that arrive within a short window (or until the batch is full), scores
+them with a single model call and hands every caller back its own row.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import numpy as np
+
+
+class BatcherFullError(Exception):
+    """Raised when the scheduler queue is full and the request is rejected."""
+
+
+class BatcherTimeoutError(Exception):
+    """Raised when a request is not scored within its timeout."""
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-row predictions into batched model calls."""
+
+    def __init__(self, score_fn, max_batch_size=32, window_ms=2.0, max_queue_size=1024, timeout_ms=1000.0):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.window = window_ms / 1000.0
+        self.timeout = timeout_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'rejected': 0,
+            'timed_out': 0,
+            'batches': 0,
+            'rows_scored': 0,
+            'max_batch_size_seen': 0,
+            'queue_wait_total_ms': 0.0,
+            'queue_wait_max_ms': 0.0,
+        }
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, row, timeout=None):
+        """Score one feature row, blocking until its batch has run."""
+        future = Future()
+        try:
+            self._queue.put_nowait((np.asarray(row, dtype=np.float64), time.perf_counter(), future))
+        except queue.Full:
+            self._bump('rejected')
+            raise BatcherFullError('Prediction queue is full')
+        self._bump('requests')
+
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except FutureTimeoutError:
+            # Not started yet -> the worker will skip it; already running -> result is dropped
+            future.cancel()
+            self._bump('timed_out')
+            raise BatcherTimeoutError('Prediction timed out in the batching queue')
+
+    def stats(self):
+        """Snapshot of batch-size and queue-wait statistics."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        batches = stats['batches'] or 1
+        rows = stats['rows_scored'] or 1
+        stats['avg_batch_size'] = stats['rows_scored'] / batches
+        stats['avg_queue_wait_ms'] = stats['queue_wait_total_ms'] / rows
+        stats['queue_depth'] = self._queue.qsize()
+        stats['window_ms'] = self.window * 1000
+        stats['max_batch_size'] = self.max_batch_size
+        return stats
+
+    def _bump(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _collect(self):
+        """Block for the first request, then gather more until the window closes or the batch is full."""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [item for item in self._collect() if item[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            waits = [(started - enqueued) * 1000 for _, enqueued, _ in batch]
+            try:
+                probabilities = self.score_fn(np.vstack([row for row, _, _ in batch]))
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, _, future), row_probabilities in zip(batch, probabilities):
+                future.set_result(row_probabilities)
+
+            with self._stats_lock:
+                self._stats['batches'] += 1
+                self._stats['rows_scored'] += len(batch)
+                self._stats['max_batch_size_seen'] = max(self._stats['max_batch_size_seen'], len(batch))
+                self._stats['queue_wait_total_ms'] += sum(waits)
+                self._stats['queue_wait_max_ms'] = max(self._stats['queue_wait_max_ms'], max(waits))
@@ -0,0 +1,15 @@
+"""
+Benchmarks for the prediction, persistence and report paths.
+
+Each database size runs in its own subprocess against a freshly seeded
+SQLite file, so peak RSS and caches are measured per size:
+
+    python -m benchmarks                                   # 1k / 100k / 1M rows
+    python -m benchmarks --sizes 1000 --output results.json
+    python -m benchmarks --baseline baseline.json --threshold 0.2
+
+Routes are driven in-process through Flask's test client and, for
+concurrency, by a local load generator against a threaded HTTP server.
+With --asgi the same load is also sent to asgi_app.py on uvicorn, reported
+as the 'asgi' mode next to 'concurrent' (the threaded Flask server).
+"""
@@ -0,0 +1,209 @@
+"""Command-line driver: seed, run each database size in a subprocess, compare with a baseline."""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.load import AsgiServer, LocalServer, Scenario, run_concurrent, run_in_process, summarize
+from benchmarks.seed import load_cases, seed_database
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = [1000, 100000, 1000000]
+THRESHOLD = 0.2
+
+# Metrics checked against the baseline, and whether a larger value is worse
+COMPARED_METRICS = {'p95_ms': True, 'throughput_rps': False}
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def scenarios(rows, cases, rng):
+    """The routes benchmarked at every database size."""
+    # Random existing ids, so lookups are spread over the whole table
+    ids = [rng.randint(1, rows) for _ in range(1000)]
+
+    def predict_body(i):
+        return {**cases[i % len(cases)], 'patient_name': f"Bench {i}", 'age': 50, 'gender': 'F',
+                'family_history': 'No', 'symptoms': '', 'previous_cancer': 'No'}
+
+    def report_body(i):
+        # A unique name per request, so every call renders instead of hitting the report cache
+        return {'name': f"Bench {i} {time.time_ns()}", 'age': 50, 'gender': 'F',
+                'prediction': 'Benign (B)', 'clinical_data': cases[i % len(cases)]}
+
+    return [
+        Scenario('predict', 'POST', '/predict', predict_body),
+        Scenario('refresh_patient_data', 'GET', '/api/refresh-patient-data'),
+        Scenario('previous_metrics', 'GET', lambda i: f"/get_previous_metrics?patient_id={ids[i % len(ids)]}"),
+        Scenario('generate_report', 'POST', '/generate-report', report_body),
+    ]
+
+
+def run_size(rows, requests, concurrency, asgi=False):
+    """Benchmark every scenario against the database in DATABASE_PATH (worker process)."""
+    import app
+    import db_functions
+    if asgi:
+        import asgi_app
+
+    cases = load_cases(os.path.join(REPO_ROOT, 'BCA.1.csv'))
+    rng = random.Random(0)
+    results = {'rows': rows, 'scenarios': {}}
+
+    # The routes log every request with print(); keep the benchmark output readable
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        app.create_app()
+
+        for scenario in scenarios(rows, cases, rng):
+            count = max(requests // 4, 10) if scenario.name == 'generate_report' else requests
+
+            run_in_process(app.app, scenario, 3)  # warm caches and lazy imports
+            in_process = run_in_process(app.app, scenario, count)
+            with LocalServer(app.app) as server:
+                concurrent = run_concurrent(server.url, scenario, count, concurrency)
+            results['scenarios'][scenario.name] = {
+                'in_process': in_process,
+                'concurrent': concurrent,
+                'peak_rss_mb': _peak_rss_mb(),
+            }
+            # Same load against the async handlers in asgi_app.py on uvicorn
+            if asgi:
+                with AsgiServer(asgi_app.app) as server:
+                    run_concurrent(server.url, scenario, 3, 1)
+                    results['scenarios'][scenario.name]['asgi'] = run_concurrent(server.url, scenario, count, concurrency)
+
+        # ===== SQLite Helpers Directly =====
+        row = ('Bench', 50, 'F', 'No', '', 'No', *cases[0].values(), 'Benign (B)', '99.00%', datetime.now(), 'bench')
+        latencies = []
+        wall_start = time.perf_counter()
+        for _ in range(requests):
+            start = time.perf_counter()
+            db_functions.insert_patients([row])
+            latencies.append(time.perf_counter() - start)
+        results['scenarios']['db_insert'] = {'in_process': summarize(latencies, time.perf_counter() - wall_start),
+                                             'peak_rss_mb': _peak_rss_mb()}
+
+        latencies = []
+        wall_start = time.perf_counter()
+        for _ in range(requests):
+            start = time.perf_counter()
+            db_functions.get_patient_row(rng.randint(1, rows))
+            latencies.append(time.perf_counter() - start)
+        results['scenarios']['db_lookup'] = {'in_process': summarize(latencies, time.perf_counter() - wall_start),
+                                             'peak_rss_mb': _peak_rss_mb()}
+
+    results['peak_rss_mb'] = _peak_rss_mb()
+    return results
+
+
+def benchmark_size(rows, requests, concurrency, data_dir, asgi=False):
+    """Seed a database of `rows` patients and benchmark it in a fresh interpreter."""
+    db_path = os.path.join(data_dir, f"bench_{rows}.db")
+    start = time.perf_counter()
+    seed_database(db_path, rows, load_cases(os.path.join(REPO_ROOT, 'BCA.1.csv')))
+    print(f"Seeded {rows} rows in {time.perf_counter() - start:.1f}s")
+
+    result_path = os.path.join(data_dir, f"bench_{rows}.json")
+    env = {**os.environ, 'DATABASE_PATH': db_path, 'REPORT_CACHE_DIR': os.path.join(data_dir, 'report_cache')}
+    subprocess.run(
+        [sys.executable, '-W', 'ignore', '-m', 'benchmarks', '--worker', '--rows', str(rows),
+         '--requests', str(requests), '--concurrency', str(concurrency), '--result-file', result_path]
+        + (['--asgi'] if asgi else []),
+        env=env, cwd=REPO_ROOT, check=True
+    )
+    with open(result_path) as f:
+        return json.load(f)
+
+
+def print_results(result):
+    print(f"\n{result['rows']:,} rows (peak RSS {result['peak_rss_mb']:.0f} MB)")
+    print(f"  {'scenario':<22} {'mode':<11} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'errors':>6}")
+    for name, modes in result['scenarios'].items():
+        for mode in ('in_process', 'concurrent', 'asgi'):
+            if mode in modes:
+                stats = modes[mode]
+                print(f"  {name:<22} {mode:<11} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} "
+                      f"{stats['p99_ms']:>8.2f} {stats['throughput_rps']:>8.0f} {stats['errors']:>6}")
+
+
+def compare(results, baseline, threshold):
+    """Return regressions beyond `threshold` (a fraction) relative to the baseline."""
+    regressions = []
+    for size, result in results['sizes'].items():
+        base = baseline.get('sizes', {}).get(size)
+        if base is None:
+            continue
+        for name, modes in result['scenarios'].items():
+            for mode, stats in modes.items():
+                base_stats = base['scenarios'].get(name, {}).get(mode)
+                if not isinstance(stats, dict) or not base_stats:
+                    continue
+                for metric, higher_is_worse in COMPARED_METRICS.items():
+                    new, old = stats[metric], base_stats[metric]
+                    change = (new - old) / old if old else 0.0
+                    if (change if higher_is_worse else -change) > threshold:
+                        regressions.append(f"{size} rows {name}/{mode} {metric}: {old:.2f} -> {new:.2f} ({change:+.0%})")
+        old_rss, new_rss = base['peak_rss_mb'], result['peak_rss_mb']
+        if old_rss and (new_rss - old_rss) / old_rss > threshold:
+            regressions.append(f"{size} rows peak_rss_mb: {old_rss:.0f} -> {new_rss:.0f}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark /predict, /generate-report, '
+                                                 '/api/refresh-patient-data and the SQLite helpers')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='database sizes in rows')
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario and mode')
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads for the load generator')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='fail if results regress against this results file')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='allowed regression, e.g. 0.2 = 20%%')
+    parser.add_argument('--data-dir', help='where to create benchmark databases (default: a temp dir)')
+    parser.add_argument('--asgi', action='store_true',
+                        help='also load-test asgi_app.py on uvicorn (needs starlette and uvicorn)')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--rows', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        with open(args.result_file, 'w') as f:
+            json.dump(run_size(args.rows, args.requests, args.concurrency, args.asgi), f)
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory(dir=args.data_dir) as data_dir:
+        results = {
+            'created': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'sizes': {},
+        }
+        for rows in args.sizes:
+            results['sizes'][str(rows)] = benchmark_size(rows, args.requests, args.concurrency, data_dir, args.asgi)
+            print_results(results['sizes'][str(rows)])
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.threshold:.0%} against {args.baseline}")
@@ -0,0 +1,126 @@
+"""Latency measurement: sequential in-process calls and a concurrent HTTP load generator."""
+import json
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+
+class Scenario:
+    """One route to drive: method, path and a per-request JSON body (or None)."""
+
+    def __init__(self, name, method, path, body=None):
+        self.name = name
+        self.method = method
+        self.path = path  # a string, or callable(i) -> path
+        self.body = body  # callable(i) -> JSON-serialisable payload
+
+    def request(self, i):
+        path = self.path(i) if callable(self.path) else self.path
+        return path, self.body(i) if self.body else None
+
+
+def summarize(latencies, wall_seconds, errors=0):
+    """Latency percentiles (ms) and throughput for one run."""
+    latencies = np.asarray(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'mean_ms': float(latencies.mean()),
+        'max_ms': float(latencies.max()),
+        'throughput_rps': len(latencies) / wall_seconds,
+    }
+
+
+def run_in_process(app, scenario, requests):
+    """Call a route `requests` times through the test client, one after another."""
+    # No cookie jar, so session state from /predict never short-circuits other routes
+    client = app.test_client(use_cookies=False)
+    latencies, errors = [], 0
+    wall_start = time.perf_counter()
+    for i in range(requests):
+        path, body = scenario.request(i)
+        start = time.perf_counter()
+        response = client.open(path, method=scenario.method, json=body)
+        latencies.append(time.perf_counter() - start)
+        errors += response.status_code >= 400
+    return summarize(latencies, time.perf_counter() - wall_start, errors)
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass  # one access-log line per request would dominate the output
+
+
+class LocalServer:
+    """The app on a threaded werkzeug server bound to an ephemeral localhost port."""
+
+    def __init__(self, app):
+        self._server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=_QuietHandler)
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._thread.join()
+
+
+class AsgiServer:
+    """An ASGI app on uvicorn in a background thread, bound to an ephemeral localhost port."""
+
+    def __init__(self, app):
+        import uvicorn  # optional dependency, only needed for --asgi
+        self._socket = socket.socket()
+        self._socket.bind(('127.0.0.1', 0))
+        self.url = f"http://127.0.0.1:{self._socket.getsockname()[1]}"
+        self._server = uvicorn.Server(uvicorn.Config(app, log_level='warning', access_log=False))
+        self._thread = threading.Thread(target=self._server.run, kwargs={'sockets': [self._socket]}, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        while not self._server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError('uvicorn failed to start')
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.should_exit = True
+        self._thread.join()
+        self._socket.close()
+
+
+def _http_call(url, scenario, i):
+    path, body = scenario.request(i)
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url + path, data=data, method=scenario.method,
+                                     headers={'Content-Type': 'application/json'} if data else {})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+        failed = False
+    except urllib.error.HTTPError:
+        failed = True
+    return time.perf_counter() - start, failed
+
+
+def run_concurrent(url, scenario, requests, concurrency):
+    """Send `requests` HTTP requests from `concurrency` client threads."""
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda i: _http_call(url, scenario, i), range(requests)))
+    wall = time.perf_counter() - wall_start
+    return summarize([latency for latency, _ in results], wall, sum(failed for _, failed in results))
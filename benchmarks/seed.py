@@ -0,0 +1,50 @@
+"""Seed a benchmark database with realistic patient rows."""
+import csv
+import os
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+import db_functions
+
+SEED_CHUNK = 50000
+
+
+def load_cases(path='BCA.1.csv'):
+    """Feature dicts from the training CSV, used as realistic request payloads."""
+    with open(path) as f:
+        return [
+            {feature: float(row[feature]) for feature in db_functions.FEATURE_COLUMNS}
+            for row in csv.DictReader(f)
+        ]
+
+
+def _rows(count, cases, start):
+    rng = random.Random(42)
+    for i in range(count):
+        case = cases[i % len(cases)]
+        yield (
+            f"Patient {i}", rng.randint(25, 85), 'F', rng.choice(('Yes', 'No')), '', rng.choice(('Yes', 'No')),
+            *(case[feature] for feature in db_functions.FEATURE_COLUMNS),
+            rng.choice(('Malignant (M)', 'Benign (B)')), f"{rng.uniform(50, 100):.2f}%",
+            (start + timedelta(seconds=i)).isoformat(' '), 'seed',
+        )
+
+
+def seed_database(path, rows, cases):
+    """Create a fresh database at `path` holding `rows` patients."""
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    db_functions.init_db(path)
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous=OFF")  # seeding only; the benchmark itself uses the app's settings
+    generator = _rows(rows, cases, datetime.now() - timedelta(seconds=rows))
+    while True:
+        chunk = [row for _, row in zip(range(SEED_CHUNK), generator)]
+        if not chunk:
+            break
+        with conn:
+            conn.executemany(db_functions.INSERT_PATIENT_SQL, chunk)
+    conn.close()
@@ -1,40 +1,397 @@
 import sqlite3
-import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
 
-DB_PATH = "patient_metadata.db"
+from metrics import span
 
-def insert_patient(name, age, gender, family_history, symptoms, previous_cancer, clinical_data, diagnosis, confidence):
+DB_PATH = os.environ.get('DATABASE_PATH', "patient_metadata.db")
+
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+
+# WAL lets readers proceed while a prediction insert is being written;
+# synchronous=NORMAL is durable across application crashes in WAL mode.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",  # ~16 MB page cache per connection
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Clinical features the model is trained on; each is stored as its own REAL column
+FEATURE_COLUMNS = [
+    'concave_points_mean', 'concave_points_worst', 'radius_worst',
+    'perimeter_worst', 'area_worst', 'concavity_mean',
+    'perimeter_mean', 'area_mean'
+]
+
+METADATA_COLUMNS = ['name', 'age', 'gender', 'family_history', 'symptoms', 'previous_cancer']
+
+PATIENT_COLUMNS = METADATA_COLUMNS + FEATURE_COLUMNS + ['prediction_result', 'confidence', 'timestamp', 'model_version']
+
+# {table} lets migrate_db build the new table alongside a legacy one
+CREATE_PATIENTS_SQL = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        age INTEGER,
+        gender TEXT,
+        family_history TEXT,
+        symptoms TEXT,
+        previous_cancer TEXT,
+        concave_points_mean REAL,
+        concave_points_worst REAL,
+        radius_worst REAL,
+        perimeter_worst REAL,
+        area_worst REAL,
+        concavity_mean REAL,
+        perimeter_mean REAL,
+        area_mean REAL,
+        prediction_result TEXT,
+        confidence TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        confirmed_diagnosis TEXT,
+        confirmed_at DATETIME,
+        model_version TEXT
+    )
+'''
+
+# Columns added after the columnar schema shipped; init_db adds them to older files
+ADDED_COLUMNS = (
+    ('confirmed_diagnosis', 'TEXT'),
+    ('confirmed_at', 'DATETIME'),
+    ('model_version', 'TEXT'),
+)
+
+# Indexes superseded by the ones above
+DROPPED_INDEXES = ('idx_patients_prediction_result',)
+
+CREATE_INDEXES_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_patients_timestamp ON patients (timestamp)",
+    # History filters: equality column first, then timestamp (the index's implicit rowid gives the id tie-break)
+    "CREATE INDEX IF NOT EXISTS idx_patients_prediction_timestamp ON patients (prediction_result, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_patients_name_timestamp ON patients (name, timestamp)",
+    # Partial index: only confirmed rows, in the order retrain.py streams them
+    "CREATE INDEX IF NOT EXISTS idx_patients_confirmed ON patients (confirmed_at, id) WHERE confirmed_at IS NOT NULL",
+)
+
+INSERT_PATIENT_SQL = "INSERT INTO patients ({}) VALUES ({})".format(
+    ', '.join(PATIENT_COLUMNS), ', '.join('?' * len(PATIENT_COLUMNS))
+)
+
+SELECT_PATIENT_SQL = "SELECT * FROM patients WHERE id = ?"
+SELECT_LATEST_PATIENT_SQL = "SELECT * FROM patients ORDER BY timestamp DESC LIMIT 1"
+
+CONFIRM_DIAGNOSIS_SQL = "UPDATE patients SET confirmed_diagnosis = ?, confirmed_at = ? WHERE id = ?"
+
+# Keyset pagination on (confirmed_at, id) so each chunk is an index range scan
+SELECT_CONFIRMED_SQL = """
+    SELECT id, {}, confirmed_diagnosis, confirmed_at FROM patients
+    WHERE confirmed_at IS NOT NULL AND (confirmed_at > ? OR (confirmed_at = ? AND id > ?))
+    ORDER BY confirmed_at, id
+    LIMIT ?
+""".format(', '.join(FEATURE_COLUMNS))
+
+
+class ConnectionPool:
+    """A bounded pool of SQLite connections shared across request threads."""
+
+    def __init__(self, path, max_size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.path = path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=max_size)
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # Each connection keeps its own prepared-statement cache, so reusing
+        # connections also reuses compiled statements.
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=128)
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self):
+        """Take an idle connection, opening a new one while under max_size."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.max_size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError("Timed out waiting for a database connection")
+
+    def release(self, conn):
+        """Return a connection to the pool, discarding any open transaction."""
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put_nowait(conn)
+
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+# Latest-patient cache: path -> (patient dict or None, cached_at). Inserts made in
+# this process update it directly; LATEST_PATIENT_CACHE_TTL (seconds) bounds how
+# stale it can get when other worker processes write to the same file.
+LATEST_CACHE_TTL = float(os.environ.get('LATEST_PATIENT_CACHE_TTL', 0))
+_latest = {}
+_latest_lock = threading.Lock()
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(path=None):
+    """Return the process-wide pool for a database path."""
+    path = path or DB_PATH
+    with _pools_lock:
+        if path not in _pools:
+            _pools[path] = ConnectionPool(path)
+        return _pools[path]
+
+@contextmanager
+def connection(path=None):
+    """Borrow a pooled connection for the duration of a with-block."""
+    pool = get_pool(path)
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+@contextmanager
+def transaction(path=None):
+    """Borrow a pooled connection and commit on success, roll back on error."""
+    with connection(path) as conn:
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+def is_legacy_schema(conn, table='patients'):
+    """True if the table predates the columnar schema (JSON clinical_data or database_setup.py layout)."""
+    columns = {row['name'] for row in conn.execute(f"PRAGMA table_info({table})")}
+    return bool(columns) and ('id' not in columns or not set(FEATURE_COLUMNS) <= columns)
+
+def init_db(path=None):
+    """Initialize the database with required tables, migrating legacy files first."""
+    with connection(path) as conn:
+        legacy = is_legacy_schema(conn)
+    if legacy:
+        from migrate_db import migrate
+        migrate(path or DB_PATH)
+
+    with transaction(path) as conn:
+        conn.execute(CREATE_PATIENTS_SQL.format(table='patients'))
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(patients)")}
+        for column, column_type in ADDED_COLUMNS:
+            if column not in columns:
+                conn.execute(f"ALTER TABLE patients ADD COLUMN {column} {column_type}")
+        for index in DROPPED_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {index}")
+        for statement in CREATE_INDEXES_SQL:
+            conn.execute(statement)
+
+def clinical_data_from_row(row):
+    """Build the clinical_data dict straight from a row's feature columns."""
+    return {feature: row[feature] for feature in FEATURE_COLUMNS}
+
+def insert_patients(rows, path=None):
+    """Insert INSERT_PATIENT_SQL parameter tuples in one transaction and return their ids."""
+    ids = []
+    with span('db.insert_patients'), transaction(path) as conn:
+        cursor = conn.cursor()
+        for row in rows:
+            cursor.execute(INSERT_PATIENT_SQL, row)
+            ids.append(cursor.lastrowid)
+    remember_latest(rows, ids, path)
+    return ids
+
+def get_patient_row(patient_id, path=None):
+    """Return the patients row for an id, or None."""
+    with span('db.get_patient'), connection(path) as conn:
+        return conn.execute(SELECT_PATIENT_SQL, (patient_id,)).fetchone()
+
+def confirm_diagnosis(patient_id, diagnosis, path=None):
+    """Record the clinically confirmed label ('M' or 'B') for a stored prediction; False if no such id."""
+    with span('db.confirm_diagnosis'), transaction(path) as conn:
+        updated = conn.execute(CONFIRM_DIAGNOSIS_SQL, (diagnosis, datetime.now().isoformat(' '), patient_id)).rowcount
+    return updated > 0
+
+def iter_confirmed_rows(after=('', 0), chunk_size=5000, path=None):
+    """
+    Yield lists of confirmed rows (id, features..., confirmed_diagnosis, confirmed_at)
+    ordered by (confirmed_at, id), starting after the `after` watermark. A pooled
+    connection is only held while each chunk is fetched.
+    """
+    confirmed_at, last_id = after
+    while True:
+        with connection(path) as conn:
+            chunk = conn.execute(SELECT_CONFIRMED_SQL, (confirmed_at, confirmed_at, last_id, chunk_size)).fetchall()
+        if not chunk:
+            return
+        yield chunk
+        confirmed_at, last_id = chunk[-1]['confirmed_at'], chunk[-1]['id']
+        if len(chunk) < chunk_size:
+            return
+
+# Stored diagnoses use the display form; filters accept the bare class label
+DIAGNOSIS_LABELS = {'M': 'Malignant (M)', 'B': 'Benign (B)'}
+
+def diagnosis_label(value):
+    """
+    The stored prediction_result for a diagnosis filter given as 'M'/'B',
+    'Malignant'/'Benign' or the full label, in any case; None if it names neither.
+    """
+    wanted = str(value).strip().casefold()
+    for code, label in DIAGNOSIS_LABELS.items():
+        if wanted in (code.casefold(), label.casefold(), label.split()[0].casefold()):
+            return label
+    return None
+
+def _history_where(name=None, diagnosis=None, since=None, until=None, before=None):
+    """WHERE clause and parameters for history queries; `before` is a (timestamp, id) keyset cursor."""
+    clauses, params = [], []
+    if name is not None:
+        clauses.append("name = ?")
+        params.append(name)
+    if diagnosis is not None:
+        # A single equality (not IN) so the index also delivers the timestamp order
+        clauses.append("prediction_result = ?")
+        params.append(diagnosis_label(diagnosis) or diagnosis)
+    if since is not None:
+        clauses.append("timestamp >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("timestamp < ?")
+        params.append(until)
+    if before is not None:
+        # Row-value comparison keeps this an index range scan, however deep the page
+        clauses.append("(timestamp, id) < (?, ?)")
+        params.extend(before)
+    return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+def get_history_page(limit, before=None, name=None, diagnosis=None, since=None, until=None, path=None):
+    """Up to `limit` patients, newest first, strictly after the `before` cursor in that order."""
+    where, params = _history_where(name, diagnosis, since, until, before)
+    with span('db.history_page'), connection(path) as conn:
+        return conn.execute(
+            f"SELECT * FROM patients {where} ORDER BY timestamp DESC, id DESC LIMIT ?", (*params, limit)
+        ).fetchall()
+
+def iter_history(name=None, diagnosis=None, since=None, until=None, batch_size=500, path=None):
+    """
+    Yield every matching patient, newest first, from one server-side cursor.
+    A dedicated connection is used so a long export never ties up the pool,
+    and WAL gives it a consistent snapshot for the whole stream.
+    """
+    where, params = _history_where(name, diagnosis, since, until)
+    conn = sqlite3.connect(path or DB_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    try:
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        cursor = conn.execute(f"SELECT * FROM patients {where} ORDER BY timestamp DESC, id DESC", params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        conn.close()
+
+def get_latest_patient_row(path=None):
+    """Return the most recent patient as a dict, served from the in-process cache when warm."""
+    path = path or DB_PATH
+    with _latest_lock:
+        cached = _latest.get(path)
+    if cached is not None and (not LATEST_CACHE_TTL or time.monotonic() - cached[1] < LATEST_CACHE_TTL):
+        return cached[0]
+
+    # Backed by idx_patients_timestamp, so this is an index seek rather than scan + sort
+    with span('db.latest_patient'), connection(path) as conn:
+        row = conn.execute(SELECT_LATEST_PATIENT_SQL).fetchone()
+    patient = dict(row) if row else None
+    with _latest_lock:
+        _latest[path] = (patient, time.monotonic())
+    return patient
+
+def remember_latest(rows, ids, path=None):
+    """Update the latest-patient cache with freshly inserted INSERT_PATIENT_SQL rows."""
+    if not rows:
+        return
+    path = path or DB_PATH
+    patient = dict(zip(PATIENT_COLUMNS, rows[-1]), id=ids[-1])
+    # sqlite3 stores datetimes in this form; keep the cached copy identical to a read-back row
+    if isinstance(patient['timestamp'], datetime):
+        patient['timestamp'] = patient['timestamp'].isoformat(' ')
+
+    with _latest_lock:
+        cached = _latest.get(path)
+        if cached is None:
+            return  # cold cache: the next read will query the index
+        current = cached[0]
+        if current is None or str(patient['timestamp']) >= str(current['timestamp']):
+            _latest[path] = (patient, time.monotonic())
+
+def invalidate_latest(path=None):
+    """Drop the cached latest patient so the next read goes to SQLite."""
+    with _latest_lock:
+        _latest.pop(path or DB_PATH, None)
+
+def insert_patient(name, age, gender, family_history, symptoms, previous_cancer, clinical_data, diagnosis, confidence,
+                   model_version=None):
     """Insert patient data into the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''INSERT INTO patients 
-                      (name, age, gender, family_history, symptoms, previous_cancer, clinical_data, prediction_result, confidence) 
-                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', 
-                   (name, age, gender, family_history, symptoms, previous_cancer, json.dumps(clinical_data), diagnosis, confidence))
-    conn.commit()
-    conn.close()
+    insert_patients([(
+        name, age, gender, family_history, symptoms, previous_cancer,
+        *(clinical_data.get(feature) for feature in FEATURE_COLUMNS),
+        diagnosis, confidence, datetime.now(), model_version
+    )])
 
 def get_latest_patient():
     """Retrieve the most recent patient entry from the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM patients ORDER BY timestamp DESC LIMIT 1")
-    patient = cursor.fetchone()
-    conn.close()
-    
+    patient = get_latest_patient_row()
+
     if patient:
         return {
-            'id': patient[0],
-            'name': patient[1],
-            'age': patient[2],
-            'gender': patient[3],
-            'family_history': patient[4],
-            'symptoms': patient[5],
-            'previous_cancer': patient[6],
-            'clinical_data': json.loads(patient[7]),
-            'diagnosis': patient[8],
-            'confidence': patient[9],
-            'timestamp': patient[10]
+            'id': patient['id'],
+            'name': patient['name'],
+            'age': patient['age'],
+            'gender': patient['gender'],
+            'family_history': patient['family_history'],
+            'symptoms': patient['symptoms'],
+            'previous_cancer': patient['previous_cancer'],
+            'clinical_data': clinical_data_from_row(patient),
+            'diagnosis': patient['prediction_result'],
+            'confidence': patient['confidence'],
+            'timestamp': patient['timestamp']
         }
     return None
-
@@ -0,0 +1,164 @@
+"""
+Push newly stored diagnoses to open chatbot pages over Server-Sent Events.
+
+predict() publishes every diagnosis once it is stored, and each open
+/api/diagnosis-events stream holds a small subscription queue in this process.
+Publishing never blocks a prediction: a client that falls more than
+SSE_MAX_QUEUED events behind loses the oldest ones.
+
+Streams follow the same rule as /api/refresh-patient-data. A client whose
+session holds a diagnosis only gets its own diagnoses. Every other client gets
+each new patient as it is stored, in the public form (no probabilities).
+
+The hub is per process. On every heartbeat (SSE_HEARTBEAT seconds) a stream
+also checks what /api/refresh-patient-data would now return. This is how
+diagnoses stored by other workers reach it, and how it catches up on events it
+dropped.
+"""
+import asyncio
+import json
+import os
+import queue
+import threading
+
+SSE_HEARTBEAT = float(os.environ.get('SSE_HEARTBEAT', 15))
+SSE_MAX_QUEUED = int(os.environ.get('SSE_MAX_QUEUED', 16))
+SSE_RETRY_MS = 3000  # how long EventSource waits before reconnecting
+
+KEEPALIVE = ': keep-alive\n\n'  # an SSE comment; keeps proxies from closing an idle stream
+
+
+class Subscription:
+    """Published (sid, record) events for one stream served from a thread."""
+
+    def __init__(self, max_queued=SSE_MAX_QUEUED):
+        self._queue = queue.Queue(max_queued)
+
+    def offer(self, event):
+        while True:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()  # drop the oldest; the heartbeat resync covers it
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout):
+        """The next event, or None after `timeout` seconds without one."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription:
+    """Published (sid, record) events for one stream served from an event loop; offered from any thread."""
+
+    def __init__(self, max_queued=SSE_MAX_QUEUED):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(max_queued)
+
+    def offer(self, event):
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # the loop has shut down; the stream is gone
+
+    def _put(self, event):
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(event)
+
+    async def get(self, timeout):
+        """The next event, or None after `timeout` seconds without one."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class DiagnosisHub:
+    """Fan-out of stored diagnoses to the open streams of this process."""
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._published = 0
+
+    def subscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, sid, record):
+        """Hand a stored diagnosis, and the session id it was made under, to every open stream."""
+        with self._lock:
+            self._published += 1
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.offer((sid, record))
+
+    def stats(self):
+        with self._lock:
+            return {'streams': len(self._subscriptions), 'published': self._published}
+
+
+class StreamState:
+    """
+    Decides what one stream sends. `sid` is the client's session id and `bound`
+    says whether that session already holds a diagnosis. `public` turns a
+    session record into the form clients without one see. `last_id` is the id
+    of the record the client already shows.
+    """
+
+    def __init__(self, sid, bound, public, last_id=None):
+        self.sid = sid
+        self.bound = bound
+        self.public = public
+        self.last_id = last_id
+
+    def on_published(self, event):
+        """The SSE message for a published (sid, record) event, or None if it is not for this client."""
+        event_sid, record = event
+        if self.sid is not None and event_sid == self.sid:
+            self.bound = True
+        elif self.bound:
+            return None  # someone else's patient
+        else:
+            record = self.public(record)
+        return self._send(record)
+
+    def on_current(self, record, from_session=False):
+        """The SSE message for what /api/refresh-patient-data returns now, if the client hasn't seen it."""
+        self.bound = self.bound or from_session
+        return None if record is None else self._send(record)
+
+    def _send(self, record):
+        # The same diagnosis can arrive both published and through a heartbeat resync
+        if record.get('id') == self.last_id:
+            return None
+        self.last_id = record.get('id')
+        return format_event(record)
+
+
+def format_event(record, event='diagnosis'):
+    """One SSE message. The record id is the event id, so a reconnecting client reports what it last saw."""
+    return f"id: {record.get('id', '')}\nevent: {event}\ndata: {json.dumps(record, default=str)}\n\n"
+
+
+def preamble():
+    """The first bytes of every stream. They set the reconnect delay and make proxies flush the headers."""
+    return f"retry: {SSE_RETRY_MS}\n\n"
+
+
+def parse_last_event_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
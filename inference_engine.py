@@ -0,0 +1,376 @@
+"""
+Array-backed inference engine for the RandomForest in breast_cancer_model.pkl.
+
+All trees are flattened into contiguous NumPy node arrays so a batch of rows
+can be pushed through every tree at once, without sklearn's per-call input
+validation, DataFrame handling or joblib dispatch.
+
+The node arrays can also be exported to an uncompressed, memory-mappable
+file (`python inference_engine.py export`); every worker that maps it
+read-only shares the same physical pages instead of unpickling its own copy.
+
+Per-prediction feature attributions come from the same arrays: every node
+stores how much the class distribution changed from its parent, charged to
+the feature its parent split on, so a row's contributions are the sums of
+those changes along its decision path in every tree (Saabas' method).
+
+    python inference_engine.py verify        # exact match vs sklearn + latency comparison
+                                             # (the match is also pinned by tests/test_inference_engine.py)
+    python inference_engine.py export        # write MMAP_PATH from the pickle
+    python inference_engine.py compare-load  # load time / RSS per worker, pickle vs mmap
+"""
+import argparse
+import json
+import mmap
+import struct
+import time
+
+import numpy as np
+
+MODEL_PATH = 'breast_cancer_model.pkl'
+DATASET_PATH = 'BCA.1.csv'
+MMAP_PATH = 'breast_cancer_model.forest'
+
+MMAP_MAGIC = b'BCFOREST'
+MMAP_ALIGNMENT = 64
+ARRAY_FIELDS = ('feature', 'threshold', 'left', 'right', 'value', 'roots')
+
+
+class CompiledForest:
+    """A RandomForestClassifier flattened into node arrays."""
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, classes, feature_names):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes_ = classes
+        self.feature_names_in_ = feature_names
+        self.n_trees = len(roots)
+        self._attribution = None
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Flatten a fitted RandomForestClassifier into a CompiledForest."""
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes)
+            is_leaf = tree.children_left == -1
+
+            # Leaves point back at themselves, so every row can take the same
+            # number of steps regardless of which leaf it lands in.
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+            feature = np.where(is_leaf, 0, tree.feature)
+
+            # Same normalisation sklearn applies to tree_.value in predict_proba
+            value = tree.value[:, 0, :forest.n_classes_].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+
+            features.append(feature)
+            thresholds.append(tree.threshold)
+            lefts.append(left)
+            rights.append(right)
+            values.append(value / normalizer)
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n_nodes
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp),
+            right=np.ascontiguousarray(np.concatenate(rights), dtype=np.intp),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=np.asarray(forest.classes_),
+            feature_names=np.asarray(getattr(forest, 'feature_names_in_', [])),
+        )
+
+    def save(self, path):
+        """
+        Write the node arrays to a memory-mappable file: magic, header length,
+        a JSON header describing each array, then the raw arrays, 64-byte aligned.
+        """
+        arrays = {name: np.ascontiguousarray(getattr(self, name)) for name in ARRAY_FIELDS}
+        header = {
+            'max_depth': int(self.max_depth),
+            'classes': self.classes_.tolist(),
+            'feature_names': self.feature_names_in_.tolist(),
+            'arrays': {},
+        }
+        offset = 0
+        for name, array in arrays.items():
+            header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset += -(-array.nbytes // MMAP_ALIGNMENT) * MMAP_ALIGNMENT
+
+        header_bytes = json.dumps(header).encode('utf-8')
+        data_start = -(-(len(MMAP_MAGIC) + 8 + len(header_bytes)) // MMAP_ALIGNMENT) * MMAP_ALIGNMENT
+        with open(path, 'wb') as f:
+            f.write(MMAP_MAGIC + struct.pack('<Q', len(header_bytes)) + header_bytes)
+            for name, array in arrays.items():
+                f.seek(data_start + header['arrays'][name]['offset'])
+                f.write(array.tobytes())
+            f.truncate(data_start + offset)
+
+    @classmethod
+    def load_mmap(cls, path):
+        """Map a file written by save() read-only; arrays are views onto the shared mapping."""
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if buffer[:len(MMAP_MAGIC)] != MMAP_MAGIC:
+            raise ValueError(f"{path} is not a compiled forest file")
+        (header_length,) = struct.unpack_from('<Q', buffer, len(MMAP_MAGIC))
+        header_end = len(MMAP_MAGIC) + 8 + header_length
+        header = json.loads(buffer[len(MMAP_MAGIC) + 8:header_end].decode('utf-8'))
+        data_start = -(-header_end // MMAP_ALIGNMENT) * MMAP_ALIGNMENT
+
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(spec['shape']))
+            arrays[name] = np.frombuffer(
+                buffer, dtype=dtype, count=count, offset=data_start + spec['offset']
+            ).reshape(spec['shape'])
+
+        return cls(
+            max_depth=header['max_depth'],
+            classes=np.asarray(header['classes']),
+            feature_names=np.asarray(header['feature_names']),
+            **arrays
+        )
+
+    def apply(self, X):
+        """Return the leaf index reached in every tree, shape (n_rows, n_trees)."""
+        # sklearn's trees compare float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+
+        # Index into the flattened matrix: row offset + feature column
+        flat_X = np.ascontiguousarray(X).ravel()
+        row_offsets = (np.arange(X.shape[0]) * X.shape[1])[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            go_left = flat_X.take(row_offsets + self.feature.take(nodes)) <= self.threshold.take(nodes)
+            nodes = np.where(go_left, self.left.take(nodes), self.right.take(nodes))
+        return nodes
+
+    def predict_proba(self, X):
+        """Class probabilities, identical to RandomForestClassifier.predict_proba."""
+        leaf_values = self.value.take(self.apply(X), axis=0)
+        # Accumulate tree by tree, in the same order sklearn does
+        return np.cumsum(leaf_values, axis=1)[:, -1, :] / self.n_trees
+
+    def predict(self, X):
+        """Class labels, identical to RandomForestClassifier.predict."""
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def _attribution_arrays(self):
+        """Per node: change in class distribution from its parent, and the feature the parent split on."""
+        if self._attribution is None:
+            node_ids = np.arange(len(self.feature))
+            internal = self.left != node_ids
+            parent = node_ids.copy()  # roots are their own parent, so their delta is zero
+            parent[self.left[internal]] = node_ids[internal]
+            parent[self.right[internal]] = node_ids[internal]
+            delta = self.value - self.value[parent]
+            self._attribution = (np.ascontiguousarray(delta.T), self.feature[parent])
+        return self._attribution
+
+    def contributions(self, X):
+        """
+        Return (bias, contributions): bias has shape (n_classes,), contributions
+        (n_rows, n_features, n_classes). For every row, bias + contributions.sum(axis=1)
+        equals predict_proba up to float rounding.
+        """
+        delta, split_feature = self._attribution_arrays()
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        n_rows, n_features = X.shape
+
+        flat_X = np.ascontiguousarray(X).ravel()
+        row_offsets = (np.arange(n_rows) * n_features)[:, np.newaxis]
+        nodes = np.broadcast_to(self.roots, (n_rows, self.n_trees)).copy()
+        # Rows already sitting in a leaf record a root instead, whose delta is zero
+        stepped = np.empty((self.max_depth, n_rows, self.n_trees), dtype=np.intp)
+        for step in range(self.max_depth):
+            go_left = flat_X.take(row_offsets + self.feature.take(nodes)) <= self.threshold.take(nodes)
+            following = np.where(go_left, self.left.take(nodes), self.right.take(nodes))
+            stepped[step] = np.where(following != nodes, following, self.roots[0])
+            nodes = following
+
+        # One bincount per class sums every step of every tree into its (row, feature) cell
+        cells = (row_offsets + split_feature.take(stepped)).ravel()
+        contributions = np.stack([
+            np.bincount(cells, weights=class_delta.take(stepped).ravel(), minlength=n_rows * n_features)
+            for class_delta in delta
+        ], axis=-1).reshape(n_rows, n_features, -1) / self.n_trees
+        bias = self.value[self.roots].mean(axis=0)
+        return bias, contributions
+
+
+def load_engine(path=MODEL_PATH):
+    """Load the pickled forest once and compile it."""
+    import joblib
+    return CompiledForest.from_sklearn(joblib.load(path))
+
+
+def _time_per_call(fn, X, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(X)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def verify():
+    """Check exact agreement with sklearn on DATASET_PATH and print a latency comparison."""
+    import joblib
+    import pandas as pd
+
+    forest = joblib.load(MODEL_PATH)
+    engine = CompiledForest.from_sklearn(forest)
+    features = forest.feature_names_in_.tolist()
+
+    data = pd.read_csv(DATASET_PATH)
+    X_df = data[features]
+    X = X_df.to_numpy(dtype=np.float64)
+
+    expected = forest.predict_proba(X_df)
+    for label, candidate in [('compiled', engine), ('mmap', _mmap_roundtrip(engine))]:
+        actual = candidate.predict_proba(X)
+        if not np.array_equal(expected, actual):
+            raise SystemExit(f"❌ {label} mismatch: max abs diff {np.abs(expected - actual).max()}")
+        if not np.array_equal(forest.predict(X_df), candidate.predict(X)):
+            raise SystemExit(f"❌ {label} label mismatch")
+    print(f"✅ Compiled engine (in-memory and mmap) matches sklearn predict_proba exactly on {len(X)} rows")
+
+    bias, contributions = engine.contributions(X)
+    error = np.abs(bias + contributions.sum(axis=1) - expected).max()
+    if error > 1e-9:
+        raise SystemExit(f"❌ Contributions do not add up to predict_proba: max abs diff {error}")
+    print(f"✅ Bias + feature contributions reproduce predict_proba (max abs diff {error:.1e})")
+
+    print(f"{'case':<12}{'sklearn (ms)':>14}{'compiled (ms)':>16}{'speedup':>10}")
+    single_df, single = X_df.iloc[:1], X[:1]
+    for label, sk_input, engine_input, repeat in [
+        ('1 row', single_df, single, 200),
+        (f'{len(X)} rows', X_df, X, 20),
+    ]:
+        sk_ms = _time_per_call(forest.predict_proba, sk_input, repeat)
+        engine_ms = _time_per_call(engine.predict_proba, engine_input, repeat)
+        print(f"{label:<12}{sk_ms:>14.3f}{engine_ms:>16.3f}{sk_ms / engine_ms:>9.1f}x")
+
+    for label, engine_input, repeat in [('1 row', single, 200), (f'{len(X)} rows', X, 20)]:
+        ms = _time_per_call(engine.contributions, engine_input, repeat)
+        print(f"contributions, {label}: {ms:.3f} ms per call ({ms / len(engine_input):.4f} ms per row)")
+
+
+def _mmap_roundtrip(engine):
+    import os
+    import tempfile
+    fd, path = tempfile.mkstemp(suffix='.forest')
+    os.close(fd)
+    try:
+        engine.save(path)
+        return CompiledForest.load_mmap(path)
+    finally:
+        os.remove(path)  # the mapping stays valid after unlink
+
+
+def export(source=MODEL_PATH, target=MMAP_PATH):
+    """Compile the pickled forest and write it in the memory-mappable format."""
+    engine = load_engine(source)
+    engine.save(target)
+    print(f"✅ Wrote {target} ({engine.n_trees} trees, {len(engine.feature)} nodes)")
+
+
+def _memory_kb():
+    """(RSS, PSS) of this process in kB; PSS splits shared pages between the processes mapping them."""
+    values = {}
+    for filename, key in [('/proc/self/status', 'VmRSS'), ('/proc/self/smaps_rollup', 'Pss')]:
+        try:
+            with open(filename) as f:
+                for line in f:
+                    if line.startswith(key + ':'):
+                        values[key] = int(line.split()[1])
+        except OSError:
+            values[key] = None
+    return values.get('VmRSS'), values.get('Pss')
+
+
+def _load_worker(kind, barrier, results):
+    import warnings
+    warnings.filterwarnings('ignore')
+
+    start = time.perf_counter()
+    if kind == 'pickle':
+        import joblib
+        model = joblib.load(MODEL_PATH)
+        row = np.zeros((1, model.n_features_in_))
+    else:
+        model = CompiledForest.load_mmap(MMAP_PATH)
+        row = np.zeros((1, len(model.feature_names_in_)))
+    # Touch every page of the model the way the first real request would
+    model.predict_proba(row)
+    if kind == 'mmap':
+        for name in ARRAY_FIELDS:
+            getattr(model, name).sum()
+    elapsed = time.perf_counter() - start
+
+    barrier.wait()  # measure while every worker is alive, so shared pages are split
+    rss, pss = _memory_kb()
+    results.put((elapsed, rss, pss))
+    barrier.wait()
+
+
+def compare_load(workers=4):
+    """Start `workers` fresh processes per format and report load time and memory per worker."""
+    import multiprocessing
+    import os
+
+    if not os.path.exists(MMAP_PATH):
+        export()
+
+    context = multiprocessing.get_context('spawn')
+    print(f"{'format':<8}{'load (ms)':>12}{'RSS (MB)':>12}{'PSS (MB)':>12}   ({workers} workers)")
+    for kind in ('pickle', 'mmap'):
+        barrier = context.Barrier(workers)
+        results = context.Queue()
+        processes = [context.Process(target=_load_worker, args=(kind, barrier, results)) for _ in range(workers)]
+        for process in processes:
+            process.start()
+        samples = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        load_ms = sum(s[0] for s in samples) / workers * 1000
+        rss_mb = sum(s[1] or 0 for s in samples) / workers / 1024
+        pss_mb = sum(s[2] or 0 for s in samples) / workers / 1024
+        print(f"{kind:<8}{load_ms:>12.1f}{rss_mb:>12.1f}{pss_mb:>12.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compiled RandomForest engine tools')
+    parser.add_argument('command', nargs='?', default='verify', choices=['verify', 'export', 'compare-load'])
+    parser.add_argument('--workers', type=int, default=4, help='processes for compare-load')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        export()
+    elif args.command == 'compare-load':
+        compare_load(args.workers)
+    else:
+        verify()
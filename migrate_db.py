@@ -0,0 +1,120 @@
+"""
+Convert a legacy patient_metadata.db to the columnar patients schema.
+
+Two legacy layouts are understood:
+  * app.py's original table, with the clinical features in a JSON `clinical_data` blob
+  * database_setup.py's table, keyed by `patient_id` with a `diagnosis` column
+
+Rows are streamed into a new table in fixed-size chunks, each committed on
+its own, so the migration uses constant memory and can be resumed if it is
+interrupted. The old table is swapped out in the same transaction as the
+last chunk, so rows written during the migration are not lost.
+
+Usage: python migrate_db.py [path/to/patient_metadata.db] [--chunk-size N]
+"""
+import argparse
+import json
+import sqlite3
+
+import db_functions
+
+NEW_TABLE = 'patients_columnar'
+CHUNK_SIZE = 5000
+
+
+def _convert(row, columns):
+    """Map one legacy row onto db_functions.PATIENT_COLUMNS, prefixed with its id."""
+    patient_id = row['id'] if 'id' in columns else row['patient_id']
+
+    if 'clinical_data' in columns and row['clinical_data']:
+        try:
+            clinical_data = json.loads(row['clinical_data'])
+        except ValueError:
+            clinical_data = {}
+    else:
+        clinical_data = {feature: row[feature] for feature in db_functions.FEATURE_COLUMNS if feature in columns}
+
+    prediction_result = row['prediction_result'] if 'prediction_result' in columns else None
+    if not prediction_result and 'diagnosis' in columns:
+        prediction_result = db_functions.DIAGNOSIS_LABELS.get(row['diagnosis'], row['diagnosis'])
+
+    return (
+        patient_id,
+        *(row[column] if column in columns else None for column in db_functions.METADATA_COLUMNS),
+        *(clinical_data.get(feature) for feature in db_functions.FEATURE_COLUMNS),
+        prediction_result,
+        row['confidence'] if 'confidence' in columns else None,
+        row['timestamp'] if 'timestamp' in columns else None,
+        row['model_version'] if 'model_version' in columns else None,
+    )
+
+
+def _swap_tables(conn):
+    """Replace the legacy table with the fully copied columnar one."""
+    old_seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'patients'").fetchone()
+    conn.execute("DROP TABLE patients")
+    conn.execute(f"ALTER TABLE {NEW_TABLE} RENAME TO patients")
+    # Never hand out ids below what the legacy table had already issued
+    if old_seq is not None:
+        conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'patients'", (old_seq[0],))
+    for statement in db_functions.CREATE_INDEXES_SQL:
+        conn.execute(statement)
+
+
+def migrate(path, chunk_size=CHUNK_SIZE):
+    """Stream the legacy patients table into the columnar schema; returns rows copied."""
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    for pragma in db_functions.PRAGMAS:
+        conn.execute(pragma)
+
+    try:
+        if not db_functions.is_legacy_schema(conn):
+            return 0
+
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(patients)")}
+        id_column = 'id' if 'id' in columns else 'patient_id'
+        insert_sql = "INSERT INTO {} (id, {}) VALUES ({})".format(
+            NEW_TABLE, ', '.join(db_functions.PATIENT_COLUMNS), ', '.join('?' * (len(db_functions.PATIENT_COLUMNS) + 1))
+        )
+        conn.execute(db_functions.CREATE_PATIENTS_SQL.format(table=NEW_TABLE))
+        conn.commit()
+
+        copied = 0
+        while True:
+            # Resume point is read inside the write lock, so concurrent migrators never overlap
+            conn.execute("BEGIN IMMEDIATE")
+            if not db_functions.is_legacy_schema(conn):
+                # Another process finished the migration first
+                conn.execute(f"DROP TABLE IF EXISTS {NEW_TABLE}")
+                conn.commit()
+                break
+            last_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {NEW_TABLE}").fetchone()[0]
+            chunk = conn.execute(
+                f"SELECT * FROM patients WHERE {id_column} > ? ORDER BY {id_column} LIMIT ?",
+                (last_id, chunk_size)
+            ).fetchall()
+            conn.executemany(insert_sql, (_convert(row, columns) for row in chunk))
+            copied += len(chunk)
+
+            if len(chunk) < chunk_size:
+                # Last chunk: swap tables in the same transaction so no new rows slip past
+                _swap_tables(conn)
+                conn.commit()
+                break
+            conn.commit()
+            print(f"  migrated {copied} rows...")
+
+        return copied
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('path', nargs='?', default=db_functions.DB_PATH)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    copied = migrate(args.path, args.chunk_size)
+    print(f"✅ Migrated {copied} rows in {args.path} to the columnar schema")
@@ -1,70 +1,268 @@
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, confusion_matrix
+"""
+Training pipeline for the breast cancer classifier.
+
+Runs a cross-validated search over forest size, depth and feature subsampling
+on all cores, refits the best configuration on the training split and saves
+it to breast_cancer_model.pkl with a JSON metadata file next to it.
+
+Fold results are memoised on disk (joblib.Memory), so re-running with an
+extended grid only fits the configurations that have not been seen before.
+
+Usage: python model.py [--n-estimators 100 200 400] [--max-depth none 8 16]
+                       [--max-features sqrt 0.5 none] [--folds 5] [--n-jobs -1]
+                       [--scoring roc_auc] [--plots DIR] [--publish]
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from datetime import datetime
+
 import joblib
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
+import pandas as pd
+import sklearn
+from joblib import Memory, Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, confusion_matrix, f1_score, precision_score, recall_score, roc_auc_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
 
-# Load the dataset
-data = pd.read_csv('BCA.1.csv')
+DATA_PATH = 'BCA.1.csv'
+MODEL_PATH = 'breast_cancer_model.pkl'
+CACHE_DIR = '.model_cache'
+RANDOM_STATE = 42
 
-# Verify the dataset contains required columns
-required_features = [
+# Features the app validates and feeds to the model, in this order
+REQUIRED_FEATURES = [
     'concave_points_mean', 'concave_points_worst', 'radius_worst',
     'perimeter_worst', 'area_worst', 'concavity_mean',
     'perimeter_mean', 'area_mean'
 ]
 
-# Check if all required features exist in the dataset
-missing_features = [f for f in required_features if f not in data.columns]
-if missing_features:
-    raise ValueError(f"Dataset is missing required features: {missing_features}")
-
-# Separate features and target
-X = data[required_features]  # Use only the required features
-y = data['diagnosis']
-
-# Split data
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-# Initialize and train the model
-model = RandomForestClassifier(n_estimators=100, random_state=42)
-model.fit(X_train, y_train)
-
-# Evaluate
-y_pred = model.predict(X_test)
-
-# Save the model
-joblib.dump(model, 'breast_cancer_model.pkl')
-
-# Print feature names
-print("Model trained with features:", list(X.columns))
-
-# Visualization 1: Confusion Matrix Heatmap
-plt.figure(figsize=(8, 6))
-cm = confusion_matrix(y_test, y_pred)
-sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
-            xticklabels=['Predicted Benign', 'Predicted Malignant'],
-            yticklabels=['Actual Benign', 'Actual Malignant'])
-plt.title('Confusion Matrix Heatmap')
-plt.ylabel('True label')
-plt.xlabel('Predicted label')
-plt.show()
-
-# Visualization 2: Correlation Heatmap of Features
-plt.figure(figsize=(10, 8))
-corr = X.corr()
-sns.heatmap(corr, annot=True, cmap='coolwarm', center=0)
-plt.title('Feature Correlation Heatmap')
-plt.show()
-
-from sklearn.metrics import precision_score, recall_score, f1_score, roc_auc_score
-
-# Assuming y_test (true labels) and y_pred (predictions)
-print(f"Model Accuracy: {accuracy_score(y_test, y_pred):.2f}")
-print(f"Precision: {precision_score(y_test, y_pred, pos_label='M'):.2f}")
-print(f"Recall: {recall_score(y_test, y_pred, pos_label='M'):.2f}")
-print(f"F1-Score: {f1_score(y_test, y_pred, pos_label='M'):.2f}")
-print(f"ROC-AUC: {roc_auc_score(y_test, model.predict_proba(X_test)[:, 1]):.2f}")
\ No newline at end of file
+SCORING = ('roc_auc', 'accuracy', 'f1')
+
+
+def metadata_path(model_path):
+    """breast_cancer_model.pkl -> breast_cancer_model.json"""
+    return os.path.splitext(model_path)[0] + '.json'
+
+
+def load_dataset(path=DATA_PATH):
+    """Return (X, y) with X restricted to REQUIRED_FEATURES."""
+    data = pd.read_csv(path)
+
+    # Check if all required features exist in the dataset
+    missing_features = [f for f in REQUIRED_FEATURES if f not in data.columns]
+    if missing_features:
+        raise ValueError(f"Dataset is missing required features: {missing_features}")
+
+    return data[REQUIRED_FEATURES], data['diagnosis']
+
+
+def parameter_grid(n_estimators, max_depth, max_features):
+    """Every combination of the searched hyperparameters."""
+    return [
+        {'n_estimators': n, 'max_depth': depth, 'max_features': features}
+        for n, depth, features in itertools.product(n_estimators, max_depth, max_features)
+    ]
+
+
+def measure_latency(model, X, repeats=20):
+    """Median single-row predict_proba latency (ms) and batch cost per row (us)."""
+    single = X[:1]
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict_proba(single)
+        timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    model.predict_proba(X)
+    batch = time.perf_counter() - start
+    return float(np.median(timings)) * 1000, batch / len(X) * 1e6
+
+
+def evaluate_fold(params, X_train, y_train, X_test, y_test):
+    """Fit one configuration on one fold and return its scores and costs."""
+    model = RandomForestClassifier(**params, random_state=RANDOM_STATE, n_jobs=1)
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    probabilities = model.predict_proba(X_test)[:, list(model.classes_).index('M')]
+    y_pred = model.predict(X_test)
+    latency_ms, per_row_us = measure_latency(model, X_test)
+
+    return {
+        'roc_auc': roc_auc_score(y_test == 'M', probabilities),
+        'accuracy': accuracy_score(y_test, y_pred),
+        'f1': f1_score(y_test, y_pred, pos_label='M'),
+        'fit_seconds': fit_seconds,
+        'latency_ms': latency_ms,
+        'batch_us_per_row': per_row_us,
+        'nodes': int(sum(tree.tree_.node_count for tree in model.estimators_)),
+    }
+
+
+def search(X, y, grid, folds=5, n_jobs=-1, memory=None):
+    """
+    Cross-validate every configuration in `grid`, one (configuration, fold) fit
+    per job, and return per-configuration means in grid order.
+    """
+    evaluate = memory.cache(evaluate_fold) if memory is not None else evaluate_fold
+    X, y = np.asarray(X), np.asarray(y)
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=RANDOM_STATE).split(X, y))
+
+    # Forests are fitted single-threaded; the parallelism is across fits
+    scores = Parallel(n_jobs=n_jobs)(
+        delayed(evaluate)(params, X[train], y[train], X[test], y[test])
+        for params in grid for train, test in splits
+    )
+
+    results = []
+    for index, params in enumerate(grid):
+        fold_scores = scores[index * folds:(index + 1) * folds]
+        summary = {'params': params}
+        for metric in fold_scores[0]:
+            values = [fold[metric] for fold in fold_scores]
+            summary[metric] = float(np.mean(values))
+            if metric in SCORING:
+                summary[f'{metric}_std'] = float(np.std(values))
+        results.append(summary)
+    return results
+
+
+def best_configuration(results, scoring):
+    """Highest mean score wins; ties go to the faster model."""
+    return max(results, key=lambda result: (round(result[scoring], 4), -result['latency_ms']))
+
+
+def print_results(results, scoring):
+    print(f"\n{'n_estimators':>12} {'max_depth':>9} {'max_features':>12} "
+          f"{scoring:>10} {'fit s':>7} {'1-row ms':>8} {'us/row':>7}")
+    for result in sorted(results, key=lambda result: result[scoring], reverse=True):
+        params = result['params']
+        print(f"{params['n_estimators']:>12} {str(params['max_depth']):>9} {str(params['max_features']):>12} "
+              f"{result[scoring]:>10.4f} {result['fit_seconds']:>7.2f} {result['latency_ms']:>8.2f} "
+              f"{result['batch_us_per_row']:>7.1f}")
+
+
+def save_plots(model, X_test, y_test, X, directory):
+    """Write the confusion-matrix and feature-correlation heatmaps as PNG files."""
+    import matplotlib
+    matplotlib.use('Agg')  # never open a window, so training runs headless
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    os.makedirs(directory, exist_ok=True)
+
+    # Visualization 1: Confusion Matrix Heatmap
+    plt.figure(figsize=(8, 6))
+    cm = confusion_matrix(y_test, model.predict(X_test), labels=['B', 'M'])
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues',
+                xticklabels=['Predicted Benign', 'Predicted Malignant'],
+                yticklabels=['Actual Benign', 'Actual Malignant'])
+    plt.title('Confusion Matrix Heatmap')
+    plt.ylabel('True label')
+    plt.xlabel('Predicted label')
+    plt.savefig(os.path.join(directory, 'confusion_matrix.png'), bbox_inches='tight')
+    plt.close()
+
+    # Visualization 2: Correlation Heatmap of Features
+    plt.figure(figsize=(10, 8))
+    sns.heatmap(X.corr(), annot=True, cmap='coolwarm', center=0)
+    plt.title('Feature Correlation Heatmap')
+    plt.savefig(os.path.join(directory, 'feature_correlation.png'), bbox_inches='tight')
+    plt.close()
+
+
+def _optional(value, convert):
+    """CLI values: 'none' -> None, otherwise convert(value)."""
+    return None if value.lower() == 'none' else convert(value)
+
+
+def _max_features(value):
+    if value.lower() in ('sqrt', 'log2', 'none'):
+        return _optional(value, str)
+    return float(value) if '.' in value else int(value)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--output', default=MODEL_PATH)
+    parser.add_argument('--n-estimators', type=int, nargs='+', default=[100, 200, 400])
+    parser.add_argument('--max-depth', type=lambda v: _optional(v, int), nargs='+', default=[None, 8, 16])
+    parser.add_argument('--max-features', type=_max_features, nargs='+', default=['sqrt', 0.5, None])
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--n-jobs', type=int, default=-1, help='parallel fits (-1 = all cores)')
+    parser.add_argument('--scoring', choices=SCORING, default='roc_auc')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help="fold result cache ('none' to disable)")
+    parser.add_argument('--plots', metavar='DIR', help='save evaluation heatmaps to this directory')
+    parser.add_argument('--publish', action='store_true',
+                        help='also publish the model to the registry and activate it (see model_registry.py)')
+    args = parser.parse_args()
+
+    X, y = load_dataset(args.data)
+
+    # Split data; the holdout is never seen by the search
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=RANDOM_STATE)
+
+    # ===== Cross-Validated Search =====
+    grid = parameter_grid(args.n_estimators, args.max_depth, args.max_features)
+    memory = None if args.cache_dir.lower() == 'none' else Memory(args.cache_dir, verbose=0)
+    print(f"Searching {len(grid)} configurations x {args.folds} folds...")
+    start = time.perf_counter()
+    results = search(X_train, y_train, grid, folds=args.folds, n_jobs=args.n_jobs, memory=memory)
+    print(f"✅ Search finished in {time.perf_counter() - start:.1f}s")
+    print_results(results, args.scoring)
+
+    # ===== Refit Best Configuration =====
+    best = best_configuration(results, args.scoring)
+    print(f"\nBest configuration: {best['params']}")
+    model = RandomForestClassifier(**best['params'], random_state=RANDOM_STATE, n_jobs=1)
+    model.fit(X_train, y_train)
+
+    # ===== Evaluate on Holdout =====
+    y_pred = model.predict(X_test)
+    holdout = {
+        'accuracy': accuracy_score(y_test, y_pred),
+        'precision': precision_score(y_test, y_pred, pos_label='M'),
+        'recall': recall_score(y_test, y_pred, pos_label='M'),
+        'f1': f1_score(y_test, y_pred, pos_label='M'),
+        'roc_auc': roc_auc_score(y_test == 'M', model.predict_proba(X_test)[:, list(model.classes_).index('M')]),
+    }
+    print(f"Model Accuracy: {holdout['accuracy']:.2f}")
+    print(f"Precision: {holdout['precision']:.2f}")
+    print(f"Recall: {holdout['recall']:.2f}")
+    print(f"F1-Score: {holdout['f1']:.2f}")
+    print(f"ROC-AUC: {holdout['roc_auc']:.2f}")
+
+    # ===== Save Model and Metadata =====
+    joblib.dump(model, args.output)
+    with open(metadata_path(args.output), 'w') as f:
+        json.dump({
+            'required_features': list(model.feature_names_in_),
+            'classes': list(model.classes_),
+            'params': best['params'],
+            'scoring': args.scoring,
+            'cv': best,
+            'holdout': holdout,
+            'search': results,
+            'trained_at': datetime.now().isoformat(),
+            'training_rows': len(X_train),
+            'sklearn_version': sklearn.__version__,
+        }, f, indent=2)
+    print(f"✅ Model trained with features: {list(model.feature_names_in_)}")
+    print(f"✅ Saved {args.output} and {metadata_path(args.output)}")
+
+    if args.publish:
+        import model_registry
+        published = model_registry.publish(args.output)
+        print(f"✅ Published and activated model version {published['version']}")
+
+    if args.plots:
+        save_plots(model, X_test, y_test, X, args.plots)
+        print(f"✅ Saved plots to {args.plots}")
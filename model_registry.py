@@ -0,0 +1,270 @@
+"""
+Versioned model registry with hot reload.
+
+Every published model gets its own directory, and CURRENT names the one to
+serve:
+
+    model_registry/
+        CURRENT
+        20261018T142501123456789_1a2b3c4d/   # publish time to the nanosecond, checksum prefix
+            model.pkl
+            metadata.json    # required_features, classes, training metrics, sha256
+
+Workers poll CURRENT from a background thread (RegistryWatcher). A newly
+activated version is loaded, checksum-verified and compiled off the request
+path, then swapped in with a single reference assignment, so requests that
+already hold the previous version finish on it.
+
+Only models trained on db_functions.FEATURE_COLUMNS, in that order, can be
+published or loaded: the patients table, validation and the compiled engine
+all assume that layout.
+
+    python model_registry.py publish breast_cancer_model.pkl   # copy in, checksum, activate
+    python model_registry.py list
+    python model_registry.py activate <version>                # also how to roll back
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import db_functions
+from inference_engine import CompiledForest
+
+REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR', 'model_registry')
+CURRENT_FILE = 'CURRENT'
+ARTIFACT_FILE = 'model.pkl'
+METADATA_FILE = 'metadata.json'
+
+# Versions published before nanosecond stamps have whole seconds only
+_VERSION = re.compile(r'^[0-9]{8}T[0-9]{6}([0-9]{9})?_[0-9a-f]{8}$')
+
+
+class LoadedModel:
+    """One model version ready to serve: the estimator, its compiled forms and its identity."""
+
+    def __init__(self, model, version, use_compiled=False, metadata=None):
+        self.model = model
+        self.version = version
+        self.metadata = metadata or {}
+        self.required_features = model.feature_names_in_.tolist()
+        self.classes = model.classes_.tolist()
+        if isinstance(model, CompiledForest):
+            self.compiled = model
+        else:
+            self.compiled = CompiledForest.from_sklearn(model) if use_compiled else None
+        # Feature attributions always walk the node arrays, whichever model serves predictions
+        self.explainer = self.compiled if self.compiled is not None else CompiledForest.from_sklearn(model)
+
+    def predict_proba(self, matrix):
+        if self.compiled is not None:
+            return self.compiled.predict_proba(matrix)
+        return self.model.predict_proba(matrix)
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def check_features(model, name='Model'):
+    """Refuse a model whose feature list is not FEATURE_COLUMNS in the same order."""
+    features = model.feature_names_in_.tolist()
+    if features != db_functions.FEATURE_COLUMNS:
+        raise ValueError(f"{name} was trained on {features}; expected {db_functions.FEATURE_COLUMNS} in that order")
+
+
+def new_version(checksum):
+    """A version id that sorts by publish time: local time to the nanosecond, then the checksum prefix."""
+    now = time.time_ns()
+    return f"{time.strftime('%Y%m%dT%H%M%S', time.localtime(now // 10 ** 9))}{now % 10 ** 9:09d}_{checksum[:8]}"
+
+
+def _version_dir(version, registry_dir):
+    if not _VERSION.match(version):
+        raise ValueError(f"Invalid model version: {version!r}")
+    return os.path.join(registry_dir, version)
+
+
+def current_version(registry_dir=REGISTRY_DIR):
+    """The active version named by CURRENT, or None for an empty or missing registry."""
+    try:
+        with open(os.path.join(registry_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def set_current(version, registry_dir=REGISTRY_DIR):
+    """Point CURRENT at an existing version, atomically."""
+    if not os.path.exists(os.path.join(_version_dir(version, registry_dir), METADATA_FILE)):
+        raise ValueError(f"Unknown model version: {version}")
+    fd, tmp_path = tempfile.mkstemp(dir=registry_dir, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp_path, os.path.join(registry_dir, CURRENT_FILE))
+
+
+def read_metadata(version, registry_dir=REGISTRY_DIR):
+    with open(os.path.join(_version_dir(version, registry_dir), METADATA_FILE)) as f:
+        return json.load(f)
+
+
+def list_versions(registry_dir=REGISTRY_DIR):
+    """Metadata of every published version, newest first."""
+    if not os.path.isdir(registry_dir):
+        return []
+    active = current_version(registry_dir)
+    versions = []
+    for name in sorted(os.listdir(registry_dir), reverse=True):
+        if _VERSION.match(name):
+            try:
+                versions.append({**read_metadata(name, registry_dir), 'active': name == active})
+            except (OSError, ValueError):
+                continue  # half-deleted by hand
+    return versions
+
+
+def publish(model_path, registry_dir=REGISTRY_DIR, activate=True):
+    """
+    Copy a trained model into the registry as a new version, with its feature
+    list, classes, checksum and the training metrics model.py / retrain.py
+    wrote next to it. Returns the new version's metadata.
+    """
+    import joblib  # pulls in sklearn; only needed when publishing or loading a version
+    model = joblib.load(model_path)  # refuse artifacts that do not load
+    check_features(model, model_path)
+    checksum = sha256_file(model_path)
+    version = new_version(checksum)
+
+    training = {}
+    training_path = os.path.splitext(model_path)[0] + '.json'
+    if os.path.exists(training_path):
+        with open(training_path) as f:
+            training = json.load(f)
+        training.pop('search', None)  # every grid-search fold; stays with the training run
+
+    metadata = {
+        'version': version,
+        'required_features': model.feature_names_in_.tolist(),
+        'classes': model.classes_.tolist(),
+        'n_estimators': len(getattr(model, 'estimators_', [])),
+        'sha256': checksum,
+        'size_bytes': os.path.getsize(model_path),
+        'published_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'source': os.path.abspath(model_path),
+        'training': training,
+    }
+
+    # Assemble in a hidden directory and rename it in, so watchers never see a partial version
+    os.makedirs(registry_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=registry_dir, prefix='.publishing-')
+    try:
+        shutil.copyfile(model_path, os.path.join(staging, ARTIFACT_FILE))
+        with open(os.path.join(staging, METADATA_FILE), 'w') as f:
+            json.dump(metadata, f, indent=2)
+        os.rename(staging, _version_dir(version, registry_dir))
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    if activate:
+        set_current(version, registry_dir)
+    return metadata
+
+
+def load_version(version, registry_dir=REGISTRY_DIR, use_compiled=False):
+    """Load one version, verifying its checksum and feature list against the metadata."""
+    import joblib
+    metadata = read_metadata(version, registry_dir)
+    path = os.path.join(_version_dir(version, registry_dir), ARTIFACT_FILE)
+    if sha256_file(path) != metadata['sha256']:
+        raise ValueError(f"Checksum mismatch for model version {version}")
+    model = joblib.load(path)
+    if model.feature_names_in_.tolist() != metadata['required_features']:
+        raise ValueError(f"Model version {version} does not match its recorded feature list")
+    check_features(model, f"Model version {version}")
+    return LoadedModel(model, version, use_compiled, metadata)
+
+
+class RegistryWatcher:
+    """Poll CURRENT and pass each newly activated version, fully loaded, to on_load."""
+
+    def __init__(self, on_load, registry_dir=REGISTRY_DIR, interval_seconds=5.0, loaded_version=None,
+                 use_compiled=False):
+        self.on_load = on_load
+        self.registry_dir = registry_dir
+        self.interval = interval_seconds
+        self.use_compiled = use_compiled
+        self._seen = loaded_version
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='model-registry-watcher', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def check(self):
+        """Load and hand over the active version if it changed; returns it, or None."""
+        version = current_version(self.registry_dir)
+        if version is None or version == self._seen:
+            return None
+        # Marked seen before loading, so a broken version is reported once rather than every poll
+        self._seen = version
+        try:
+            start = time.perf_counter()
+            loaded = load_version(version, self.registry_dir, self.use_compiled)
+            self.on_load(loaded)
+        except Exception as e:
+            print(f"❌ Could not hot-load model version {version}: {str(e)}")
+            return None
+        print(f"✅ Model version {version} loaded in {(time.perf_counter() - start) * 1000:.0f} ms and swapped in")
+        return loaded
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Versioned model registry')
+    parser.add_argument('--registry', default=REGISTRY_DIR, help='registry directory')
+    commands = parser.add_subparsers(dest='command', required=True)
+    publish_parser = commands.add_parser('publish', help='add a trained model as a new version')
+    publish_parser.add_argument('model', help='model pickle, e.g. breast_cancer_model.pkl')
+    publish_parser.add_argument('--no-activate', action='store_true', help='publish without serving it')
+    commands.add_parser('list', help='list published versions')
+    activate_parser = commands.add_parser('activate', help='serve an existing version')
+    activate_parser.add_argument('version')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'publish':
+            metadata = publish(args.model, args.registry, activate=not args.no_activate)
+            state = 'published' if args.no_activate else 'published and activated'
+            print(f"✅ {metadata['version']} {state} (sha256 {metadata['sha256'][:12]}...)")
+        elif args.command == 'activate':
+            set_current(args.version, args.registry)
+            print(f"✅ {args.version} is now active; workers pick it up on their next poll")
+        else:
+            for metadata in list_versions(args.registry):
+                holdout = metadata.get('training', {}).get('holdout', {})
+                marker = '*' if metadata['active'] else ' '
+                print(f"{marker} {metadata['version']}  {metadata['n_estimators']:>4} trees  "
+                      f"published {metadata['published_at']}  holdout {holdout or 'n/a'}")
+    except (OSError, ValueError) as e:
+        print(f"❌ {str(e)}")
+        sys.exit(1)
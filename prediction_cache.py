@@ -0,0 +1,82 @@
+"""
+In-memory LRU cache of model outputs for /predict.
+
+Entries are keyed by the clinical feature vector in REQUIRED_FEATURES order,
+each value rounded to a fixed number of decimals, so resubmitting the same
+measurements (or the same ones re-serialised as 0.1 vs 0.10000000001) skips
+the forest entirely. Values are raw model outputs (probabilities and the
+contribution vector), never response dicts: a hit is formatted against the
+caller's own input, so nothing from the request that filled the entry leaks
+into another response.
+
+The cache is bound to the model it was filled from: bind() is called with the
+model version (registry version, or a checksum of the model file) every time
+a model is loaded or hot-swapped, and clears every entry when it changes. An
+entry computed by a model that was replaced mid-request is dropped instead of
+stored: put() is given the version that produced it and only stores outputs
+of the bound version.
+"""
+import threading
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """Bounded LRU of feature vector -> model output."""
+
+    def __init__(self, max_entries=10000, precision=6):
+        self.max_entries = max_entries
+        self.precision = precision
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # least recently used first
+        self._signature = None
+        self._generation = 0
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def key_for(self, row):
+        """Canonical key: every feature rounded to `precision` decimals, -0.0 folded into 0.0."""
+        return tuple(round(float(value), self.precision) + 0.0 for value in row)
+
+    def bind(self, signature):
+        """Attach the cache to a loaded model version; a different version clears it."""
+        with self._lock:
+            if signature == self._signature:
+                return
+            if self._entries:
+                self._counters['invalidations'] += 1
+            self._entries.clear()
+            self._signature = signature
+            self._generation += 1
+
+    def get(self, key):
+        """Return (value, generation); value is None on a miss. Pass generation back to put()."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._counters['misses'] += 1
+            else:
+                self._entries.move_to_end(key)
+                self._counters['hits'] += 1
+            return value, self._generation
+
+    def put(self, key, value, generation, signature):
+        """Store an output of model version `signature` unless the bound model changed since the matching get()."""
+        with self._lock:
+            if generation != self._generation or signature != self._signature:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def stats(self):
+        """Hit ratio, evictions, invalidations and current size."""
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                **self._counters,
+                'hit_ratio': self._counters['hits'] / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'precision': self.precision,
+            }
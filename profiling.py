@@ -0,0 +1,146 @@
+"""
+Opt-in cProfile capture of individual requests.
+
+A request is profiled when it carries `X-Profile: <PROFILE_TOKEN>` or is
+picked by PROFILE_SAMPLE_RATE (0.0-1.0). Each profile is saved as a .prof
+file (loadable with pstats or snakeviz) plus a .json file with the route,
+status and timing, in a directory bounded to PROFILE_MAX_COUNT profiles,
+oldest evicted first.
+
+With neither PROFILE_TOKEN nor PROFILE_SAMPLE_RATE set, app.py registers no
+profiling hooks at all, so the normal request path pays nothing.
+"""
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import re
+import tempfile
+import threading
+import time
+import uuid
+
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILING_ENABLED = bool(PROFILE_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+HEADER = 'X-Profile'
+_PROFILE_ID = re.compile(r'^[0-9]{8}T[0-9]{12}_[0-9a-f]{8}$')
+
+# cProfile only supports one active profiler per interpreter at a time
+_active = threading.Lock()
+
+
+def _token_matches(value):
+    """Constant-time check of a header value against PROFILE_TOKEN; anything malformed is simply no match."""
+    if not PROFILE_TOKEN or not value:
+        return False
+    # compare_digest only accepts ASCII str, and header values can carry any byte
+    try:
+        return hmac.compare_digest(value.encode('utf-8', 'surrogateescape'), PROFILE_TOKEN.encode('utf-8'))
+    except (AttributeError, UnicodeError):
+        return False
+
+
+def should_profile(header_value):
+    """True if the request asked for profiling with the right token, or was sampled."""
+    if _token_matches(header_value):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def is_authorized(token):
+    """Profiles can reveal request internals, so listing/downloading needs the token too."""
+    return _token_matches(token)
+
+
+def start():
+    """Start a profiler for this request, or return None if another request is being profiled."""
+    if not _active.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except Exception:
+        _active.release()
+        raise
+    return profiler
+
+
+def stop(profiler):
+    profiler.disable()
+    _active.release()
+
+
+class ProfileStore:
+    """Bounded directory of saved profiles, newest kept."""
+
+    def __init__(self, directory, max_profiles=50):
+        self.directory = os.path.abspath(directory)
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, profile_id, extension):
+        return os.path.join(self.directory, f"{profile_id}.{extension}")
+
+    def save(self, profiler, metadata):
+        """Write one profile and its metadata atomically, then evict the oldest beyond max_profiles."""
+        now = time.time()
+        # Sortable by creation time down to the microsecond, which eviction relies on
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S', time.localtime(now))}{int(now % 1 * 1e6):06d}_{uuid.uuid4().hex[:8]}"
+        metadata = {'id': profile_id, 'created': now, **metadata}
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+        profiler.dump_stats(tmp_path)
+        os.replace(tmp_path, self._path(profile_id, 'prof'))
+        # The .json is written last, so a listed profile always has its .prof
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(metadata, f)
+        os.replace(tmp_path, self._path(profile_id, 'json'))
+
+        self._evict()
+        return metadata
+
+    def list(self):
+        """Metadata of every stored profile, newest first."""
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if name.endswith('.json'):
+                try:
+                    with open(os.path.join(self.directory, name)) as f:
+                        profiles.append(json.load(f))
+                except (OSError, ValueError):
+                    continue  # evicted or half-written meanwhile
+        return profiles
+
+    def path_for(self, profile_id):
+        """Path of a stored .prof file, or None for unknown or malformed ids."""
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        path = self._path(profile_id, 'prof')
+        return path if os.path.exists(path) else None
+
+    def summary(self, profile_id, limit=40):
+        """pstats text of the top functions by cumulative time."""
+        path = self.path_for(profile_id)
+        if path is None:
+            return None
+        stream = io.StringIO()
+        pstats.Stats(path, stream=stream).sort_stats('cumulative').print_stats(limit)
+        return stream.getvalue()
+
+    def _evict(self):
+        with self._lock:
+            ids = sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith('.json'))
+            for profile_id in ids[:max(len(ids) - self.max_profiles, 0)]:
+                for extension in ('json', 'prof'):
+                    try:
+                        os.remove(self._path(profile_id, extension))
+                    except FileNotFoundError:
+                        pass
@@ -0,0 +1,607 @@
+"""
+PDF diagnostic report rendering with reportlab.
+
+Kept separate from app.py so report workers can render without importing the
+Flask app, the model or the database layer.
+
+Fonts, paragraph styles, table styles and every section that does not depend
+on the patient are built once in a ReportTemplate; each report only lays out
+the patient-specific parts. Run `python report.py` to compare per-report
+render time against rebuilding the template on every call.
+"""
+import copy
+import threading
+import time
+from io import BytesIO
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+PAGE_MARGIN = 50
+FRAME_WIDTH = A4[0] - 2 * PAGE_MARGIN  # SimpleDocTemplate's doc.width
+
+# Choose a single pastel color theme for the whole report
+# Using a soft blue-green pastel (#83C5BE) as the primary color
+PRIMARY_COLOR = colors.HexColor('#83C5BE')
+SECONDARY_COLOR = colors.HexColor('#EDF6F9')  # Very light blue-gray for backgrounds
+ACCENT_COLOR = colors.HexColor('#006D77')  # Darker version for headers
+ELEVATED_RISK_COLOR = colors.HexColor('#E76F51')  # Salmon color for elevated risk
+
+FEATURE_EXPLANATIONS = {
+    "radius_mean": "Larger values suggest potential malignancy",
+    "texture_mean": "Higher values indicate irregular cell structure",
+    "perimeter_mean": "Larger perimeter correlates with abnormal growth",
+    "area_mean": "Increased area is a key malignancy indicator",
+    "smoothness_mean": "Higher values suggest cell membrane abnormality",
+    "compactness_mean": "Greater compactness indicates malignant tendency",
+    "concavity_mean": "Strong predictor of cell boundary irregularity",
+    "concave_points_mean": "Critical indicator of invasive potential",
+    "symmetry_mean": "Asymmetry suggests abnormal cell development",
+    "fractal_dimension_mean": "Higher complexity often indicates malignancy",
+    "radius_worst": "Strong predictor - larger worst case indicates risk",
+    "texture_worst": "High texture variance strongly predicts malignancy",
+    "perimeter_worst": "Large worst perimeter strongly indicates cancer",
+    "area_worst": "One of the strongest predictors of malignancy",
+    "smoothness_worst": "Extreme values suggest abnormal cell surface",
+    "compactness_worst": "High compactness extremes predict malignancy",
+    "concavity_worst": "Key predictor of invasive characteristics",
+    "concave_points_worst": "Critical predictor of boundary irregularity",
+    "symmetry_worst": "Extreme asymmetry suggests aggressive growth",
+    "fractal_dimension_worst": "Complex boundaries suggest malignancy"
+}
+
+LIFESTYLE_POINTS = {
+    'malignant': [
+        "Prioritize a plant-based diet rich in cruciferous vegetables, berries, and leafy greens",
+        "Include sources of omega-3 fatty acids such as flaxseeds, walnuts, and fatty fish",
+        "Strictly limit alcohol consumption and avoid tobacco products entirely",
+        "Maintain moderate physical activity (with physician approval) - aim for gentle exercise like walking",
+        "Consider joining a cancer nutrition program for personalized dietary guidance",
+        "Stay well-hydrated with filtered water and herbal teas without added sugars",
+        "Minimize exposure to environmental toxins and chemicals in personal care products"
+    ],
+    'benign': [
+        "Maintain a balanced Mediterranean-style diet rich in fruits, vegetables, and whole grains",
+        "Limit alcohol consumption to reduce breast cancer risk (no more than one drink per day)",
+        "Maintain healthy weight through balanced nutrition and regular exercise",
+        "Incorporate regular physical activity for at least 150 minutes per week",
+        "Ensure adequate vitamin D through sun exposure or supplements (with physician guidance)",
+        "Practice stress reduction techniques like meditation, yoga, or mindfulness",
+        "Get sufficient sleep (7-8 hours nightly) to support immune function"
+    ]
+}
+
+FOLLOWUP_POINTS = {
+    'malignant': [
+        "Schedule appointment with oncologist within one week for treatment planning",
+        "Prepare for additional diagnostic imaging (MRI, PET scan) as recommended",
+        "Discuss surgical options and timing with breast cancer surgeon",
+        "Consider genetic testing for treatment planning if not already completed",
+        "Schedule consultation with radiation and medical oncology teams",
+        "Keep detailed journal of symptoms, side effects, and questions for medical team",
+        "Look into clinical trial opportunities that may be appropriate for your specific diagnosis",
+        "Meet with patient navigator to coordinate appointments and support services"
+    ],
+    'benign': [
+        "Follow up with your physician in 6 months for clinical breast examination",
+        "Schedule next mammogram according to age-appropriate guidelines (typically annually)",
+        "Consider supplemental screening with ultrasound if you have dense breast tissue",
+        "Report any changes in breast tissue or symptoms immediately to your doctor",
+        "Maintain records of all imaging and examination results for comparison over time",
+        "Continue or establish regular breast self-examination routine",
+        "Annual risk re-evaluation with your healthcare provider",
+        "Consider consultation with genetic counselor if you have family history of breast cancer"
+    ]
+}
+
+SUPPORT_RESOURCES = [
+    ("American Cancer Society:", "https://www.cancer.org", "Comprehensive cancer information and support services"),
+    ("National Cancer Institute:", "https://www.cancer.gov", "Government resource for cancer research and patient support"),
+    ("Breast Cancer Research Foundation:", "https://www.bcrf.org", "Research updates and patient resources"),
+    ("National Cancer Helpline:", "1-800-227-2345", "24/7 assistance and guidance")
+]
+
+ADVISORY = """This report is intended to serve as a supplemental tool for breast cancer screening and risk assessment.
+It is not a replacement for professional medical advice, diagnosis, or treatment. Always seek the advice of your
+physician with any questions regarding your medical condition or the results presented in this report."""
+
+
+def register_fonts():
+    """Register the Calibri report fonts with reportlab (parses the TTF files)."""
+    # Ensure these font files are in your project directory or specify the full path
+    pdfmetrics.registerFont(TTFont('Calibri', 'Calibri.ttf'))
+    pdfmetrics.registerFont(TTFont('Calibri-Bold', 'calibrib.ttf'))
+    # Optional: Add italic if you have the font file
+    try:
+        pdfmetrics.registerFont(TTFont('Calibri-Italic', 'calibrii.ttf'))
+    except Exception:
+        pass  # Fall back to Calibri if Italic is not available
+
+
+def _rule(height, color):
+    """A horizontal line drawn as a one-cell Table with a colored background."""
+    line = Table([[""]], colWidths=[FRAME_WIDTH], rowHeights=[height])
+    line.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), color),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]))
+    return line
+
+
+class ReportTemplate:
+    """Fonts, styles and pre-laid-out static sections shared by every report."""
+
+    def __init__(self):
+        register_fonts()
+        styles = getSampleStyleSheet()
+
+        # Create custom styles with improved formatting and consistent color scheme
+        self.title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Title'],
+            fontName='Calibri-Bold',
+            fontSize=18,  # Reduced size to save space
+            alignment=TA_CENTER,
+            spaceAfter=16,
+            textColor=ACCENT_COLOR
+        )
+
+        self.heading_style = ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontName='Calibri-Bold',
+            fontSize=12,  # Reduced size to save space
+            spaceBefore=14,
+            spaceAfter=8,
+            textColor=ACCENT_COLOR
+        )
+
+        self.subheading_style = ParagraphStyle(
+            'CustomSubheading',
+            parent=styles['Heading3'],
+            fontName='Calibri-Bold',
+            fontSize=11,
+            spaceBefore=8,
+            spaceAfter=6,
+            textColor=ACCENT_COLOR
+        )
+
+        self.normal_style = ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontName='Calibri',
+            fontSize=10,  # Reduced size to save space
+            spaceBefore=4,
+            spaceAfter=4,
+            leading=12  # Reduced line spacing to save space
+        )
+
+        self.normal_style_black = ParagraphStyle(
+            'CustomNormalBlack',
+            parent=styles['Normal'],
+            fontName='Calibri',
+            fontSize=10,
+            spaceBefore=4,
+            spaceAfter=4,
+            textColor=colors.black,
+            leading=12
+        )
+
+        self.bullet_style = ParagraphStyle(
+            'CustomBullet',
+            parent=styles['Normal'],
+            fontName='Calibri',
+            fontSize=10,
+            spaceBefore=2,
+            spaceAfter=2,
+            leftIndent=20,
+            bulletIndent=10,
+            leading=12
+        )
+
+        self.footer_style = ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontName='Calibri',
+            fontSize=8,
+            textColor=colors.darkgray,
+            alignment=TA_CENTER
+        )
+
+        # ===== Static Table Styles =====
+        self.patient_table_style = TableStyle([
+            ('FONTNAME', (0,0), (-1,-1), 'Calibri'),
+            ('FONTSIZE', (0,0), (-1,-1), 10),
+            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+            ('GRID', (0,0), (-1,-1), 0.5, colors.lightgrey),
+            ('BOX', (0,0), (-1,-1), 1, PRIMARY_COLOR),
+            ('BACKGROUND', (0,0), (-1,-1), SECONDARY_COLOR),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 8),
+            ('TOPPADDING', (0,0), (-1,-1), 8),
+            ('LEFTPADDING', (0,0), (-1,-1), 15),
+            ('RIGHTPADDING', (0,0), (-1,-1), 15),
+            ('SPAN', (1, 1), (2, 1)),  # Span the Date cell to fix layout
+        ])
+
+        self.clinical_table_style = TableStyle([
+            ('BACKGROUND', (0,0), (-1,0), PRIMARY_COLOR),
+            ('TEXTCOLOR', (0,0), (-1,0), colors.white),
+            ('GRID', (0,0), (-1,-1), 0.5, colors.lightgrey),
+            ('FONTNAME', (0,0), (-1,-1), 'Calibri'),
+            ('FONTNAME', (0,0), (-1,0), 'Calibri-Bold'),
+            ('FONTSIZE', (0,0), (-1,-1), 9),  # Smaller font to fit in 2 pages
+            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 5),  # Reduced padding
+            ('TOPPADDING', (0,0), (-1,-1), 5),
+            ('LEFTPADDING', (0,0), (-1,-1), 10),
+            ('RIGHTPADDING', (0,0), (-1,-1), 10),
+            ('ROWBACKGROUNDS', (0,1), (-1,-1), [SECONDARY_COLOR, colors.white]),
+        ])
+
+        # Only two risk colors exist, so both risk box styles are built up front
+        self.risk_box_styles = {
+            'Normal': self._risk_box_style(PRIMARY_COLOR),
+            'Elevated': self._risk_box_style(ELEVATED_RISK_COLOR),
+        }
+
+        # ===== Static Flowables =====
+        self.title = Paragraph("BREAST CANCER DIAGNOSTIC REPORT", self.title_style)
+        self.hr_line = _rule(2, PRIMARY_COLOR)
+        self.hr_footer = _rule(1, colors.lightgrey)
+        self.headings = {
+            number: Paragraph(text, self.heading_style)
+            for number, text in enumerate([
+                "1. PATIENT INFORMATION",
+                "2. CLINICAL INPUT DATA",
+                "3. YOUR CLINICAL SNAPSHOT",
+                "4. RISK SCORE AND CATEGORY",
+                "5. AGE & GENDER-BASED GUIDANCE",
+                "6. LIFESTYLE & NUTRITION RECOMMENDATIONS",
+                "7. MONITORING & FOLLOW-UP",
+                "8. SUPPORT RESOURCES",
+                "9. ADDITIONAL INFORMATION",
+            ], 1)
+        }
+        self.top_features_heading = Paragraph("Top 3 Significant Features:", self.subheading_style)
+        self.risk_notes = [
+            Paragraph("Estimated from clinical features like concavity, perimeter, etc.", self.normal_style),
+            Paragraph("A score > 500% indicates high risk. Normal range: <500%", self.normal_style),
+        ]
+        self.lifestyle = {key: self._bullets(points) for key, points in LIFESTYLE_POINTS.items()}
+        self.followup = {key: self._bullets(points) for key, points in FOLLOWUP_POINTS.items()}
+
+        # Using numbered list
+        self.support_resources = [
+            Paragraph(f"{i}. <b>{name}</b> {url} - {description}", self.normal_style_black)
+            for i, (name, url, description) in enumerate(SUPPORT_RESOURCES, 1)
+        ]
+
+        # Create a framed advisory box
+        self.advisory_frame = Table([[Paragraph(ADVISORY, self.normal_style)]], colWidths=[470])
+        self.advisory_frame.setStyle(TableStyle([
+            ('BOX', (0,0), (-1,-1), 1, PRIMARY_COLOR),
+            ('BACKGROUND', (0,0), (-1,-1), SECONDARY_COLOR),
+            ('LEFTPADDING', (0,0), (-1,-1), 10),
+            ('RIGHTPADDING', (0,0), (-1,-1), 10),
+            ('TOPPADDING', (0,0), (-1,-1), 6),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 6),
+        ]))
+
+    @staticmethod
+    def _risk_box_style(risk_color):
+        return TableStyle([
+            ('BACKGROUND', (0,0), (0,0), risk_color),
+            ('BACKGROUND', (0,1), (0,-1), SECONDARY_COLOR),
+            ('TEXTCOLOR', (0,0), (0,0), colors.white),
+            ('FONTNAME', (0,0), (0,0), 'Calibri-Bold'),
+            ('ALIGNMENT', (0,0), (0,0), 'CENTER'),
+            ('BOX', (0,0), (-1,-1), 1, risk_color),
+            ('FONTSIZE', (0,0), (0,0), 11),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 6),
+            ('TOPPADDING', (0,0), (-1,-1), 6),
+            ('LEFTPADDING', (0,0), (-1,-1), 15),
+            ('RIGHTPADDING', (0,0), (-1,-1), 15),
+        ])
+
+    def _bullets(self, points):
+        return [Paragraph(f"• {point}", self.bullet_style) for point in points]
+
+    @staticmethod
+    def _static(*flowables):
+        # Shallow copies keep the parsed text but give each document its own layout state.
+        # Tables are deep-copied: their cells are flowables too, and drawing one attaches
+        # the document's canvas to it, so concurrent renders must not share them.
+        return [copy.deepcopy(flowable) if isinstance(flowable, Table) else copy.copy(flowable)
+                for flowable in flowables]
+
+    def render(self, data, report_date):
+        """Render the diagnostic report PDF for a /generate-report payload and return its bytes."""
+        normal_style = self.normal_style
+
+        # Create PDF buffer
+        pdf_buffer = BytesIO()
+        doc = SimpleDocTemplate(pdf_buffer, pagesize=A4, leftMargin=PAGE_MARGIN, rightMargin=PAGE_MARGIN,
+                                topMargin=PAGE_MARGIN, bottomMargin=PAGE_MARGIN)
+
+        # Prepare data from the request
+        patient_name = data.get('name', 'Patient')
+        age = data.get('age', 'N/A')
+        gender = data.get('gender', 'N/A')
+        diagnosis = data.get('prediction', 'Unknown')
+        clinical_data = data.get('clinical_data', {})
+        diagnosis_key = 'malignant' if diagnosis.lower() == 'malignant' else 'benign'
+
+        # Calculate risk score using provided formula
+        concave_points_worst = clinical_data.get('concave_points_worst', 0)
+        concavity_mean = clinical_data.get('concavity_mean', 0)
+        radius_worst = clinical_data.get('radius_worst', 0)
+
+        risk_score = ((concave_points_worst + concavity_mean + radius_worst) / 3) * 100
+
+        # Top 3 features: the model's own per-prediction contributions when the
+        # payload carries them, otherwise the name-based heuristic
+        contributions = data.get('feature_contributions')
+        if contributions:
+            top_features = get_top_contributions(contributions, 3)
+        else:
+            top_features = [(feature, value, None) for feature, value in get_top_features(clinical_data, 3)]
+
+        elements = []
+
+        # 1. Title and Patient Information
+        elements += self._static(self.title, self.hr_line)
+        elements.append(Spacer(1, 12))
+        elements += self._static(self.headings[1])
+
+        # Create a boxed patient information layout with improved styling - labels and values bold
+        patient_data = [
+            [Paragraph("<b>Name:</b> <b>" + patient_name + "</b>", normal_style),
+             Paragraph("<b>Age:</b> <b>" + str(age) + "</b>", normal_style),
+             Paragraph("<b>Gender:</b> <b>" + gender + "</b>", normal_style)],
+            [Paragraph("<b>Diagnosis:</b> <b>" + diagnosis + "</b>", normal_style),
+             Paragraph("<b>Date:</b> <b>" + report_date + "</b>", normal_style), ""]
+        ]
+
+        # Modified layout - improved spacing
+        patient_table = Table(patient_data, colWidths=[180, 160, 140])
+        patient_table.setStyle(self.patient_table_style)
+        elements.append(patient_table)
+        elements.append(Spacer(1, 12))
+
+        # 2. Clinical Input Data with prediction-focused explanations - feature names bold
+        elements += self._static(self.headings[2])
+
+        clinical_items = [["Feature", "Value", "Prediction Impact"]]
+        for key, value in clinical_data.items():
+            explanation = FEATURE_EXPLANATIONS.get(key, "Contributes to overall prediction model")
+            # Make feature names bold and ensure they stay bold in table
+            clinical_items.append([Paragraph(f"<b>{key}</b>", normal_style), str(round(value, 4)), explanation])
+
+        clinical_table = Table(clinical_items, colWidths=[150, 100, 220])
+        clinical_table.setStyle(self.clinical_table_style)
+        elements.append(clinical_table)
+        elements.append(Spacer(1, 10))
+
+        # 3. Clinical Snapshot - with bold clinical values
+        elements += self._static(self.headings[3], self.top_features_heading)
+
+        # Create top features section with bold feature names AND values
+        for feature, value, contribution in top_features:
+            formatted_value = round(value, 3)
+            if contribution is not None:
+                direction = "raises" if contribution > 0 else "lowers"
+                elements.append(Paragraph(f"<b>{feature}</b> of <b>{formatted_value}</b> - {direction} the model's malignancy "
+                                          f"probability by <b>{abs(contribution) * 100:.1f}</b> percentage points", normal_style))
+            elif "concave_points" in feature and value > 0.1:
+                elements.append(Paragraph(f"<b>{feature}</b> of <b>{formatted_value}</b> - Elevated concave points suggest abnormal curvature in cell structure", normal_style))
+            elif "radius" in feature and value > 15:
+                elements.append(Paragraph(f"<b>{feature}</b> of <b>{formatted_value}</b> - Increased radius indicates larger than normal cell size", normal_style))
+            elif "area" in feature and value > 800:
+                elements.append(Paragraph(f"<b>{feature}</b> of <b>{formatted_value}</b> - Enlarged area measurement suggests abnormal cell growth", normal_style))
+            elif "perimeter" in feature and value > 100:
+                elements.append(Paragraph(f"<b>{feature}</b> of <b>{formatted_value}</b> - Extended perimeter indicates larger boundary of the cells", normal_style))
+            elif "texture" in feature and value > 20:
+                elements.append(Paragraph(f"<b>{feature}</b> of <b>{formatted_value}</b> - Higher texture variation shows cellular structural irregularity", normal_style))
+            else:
+                elements.append(Paragraph(f"<b>{feature}</b> of <b>{formatted_value}</b> - Notable indicator for diagnostic assessment", normal_style))
+
+        elements.append(Spacer(1, 10))
+
+        # 4. Risk Score and Category
+        elements += self._static(self.headings[4])
+
+        # Determine risk category based on score
+        risk_score_formatted = round(risk_score, 1)
+
+        if risk_score < 500:
+            risk_level = "Normal"
+            if diagnosis.lower() == 'benign':
+                risk_note = "Your risk profile is within normal range. Continue routine screenings."
+            else:
+                risk_note = "Despite low risk score, follow recommended treatment due to diagnosis."
+        else:
+            risk_level = "Elevated"
+            if diagnosis.lower() == 'malignant':
+                risk_note = "Your elevated risk score requires immediate medical attention."
+            else:
+                risk_note = "Further testing recommended due to elevated risk indicators."
+
+        # Create a highlighted risk information box
+        risk_data = [
+            [Paragraph("<b>RISK ASSESSMENT</b>", normal_style)],
+            [Paragraph(f"<b>Score:</b> {risk_score_formatted}%", normal_style)],
+            [Paragraph(f"<b>Status:</b> {risk_level}", normal_style)],
+            [Paragraph(f"<b>Assessment:</b> {risk_note}", normal_style)]
+        ]
+
+        risk_box = Table(risk_data, colWidths=[470])
+        risk_box.setStyle(self.risk_box_styles[risk_level])
+        elements.append(risk_box)
+        elements.append(Spacer(1, 6))
+
+        elements += self._static(*self.risk_notes)
+        elements.append(Spacer(1, 10))
+
+        # 5. Age & Gender-Based Guidance - More personalized, with patient name in sentence instead of bullet
+        elements += self._static(self.headings[5])
+
+        # Personalized age and gender guidance
+        if gender.lower() == 'female':
+            if int(age) < 40:
+                elements.append(Paragraph(f"At {age} years old as a woman, your risk of breast cancer is lower than older age groups, but vigilance is still important:", normal_style))
+                # Add patient name recommendation as normal text instead of bullet point
+                elements.append(Paragraph(f"<b>{patient_name}</b>, we recommend clinical breast examinations every 1-3 years at your age of {age}.", normal_style))
+                guidance_points = [
+                    "Learn and practice monthly breast self-examinations - early detection is key",
+                    "Discuss your family history with your doctor to identify any hereditary risk factors"
+                ]
+            elif int(age) < 50:
+                elements.append(Paragraph(f"At {age} years old as a woman, you're entering a period where regular screening becomes increasingly important:", normal_style))
+                # Add patient name recommendation as normal text instead of bullet point
+                elements.append(Paragraph(f"<b>{patient_name}</b>, we strongly recommend annual mammograms starting at your current age of {age}.", normal_style))
+                guidance_points = [
+                    "Continue monthly breast self-examinations to monitor any changes",
+                    "Consider digital mammography which may be more effective for your age group"
+                ]
+            else:
+                elements.append(Paragraph(f"At {age} years old as a woman, your age group has an increased risk that requires diligent monitoring:", normal_style))
+                # Add patient name recommendation as normal text instead of bullet point
+                elements.append(Paragraph(f"<b>{patient_name}</b>, at {age}, annual mammograms are essential - schedule your next one promptly.", normal_style))
+                guidance_points = [
+                    "Consider additional screening methods like breast MRI if you have other risk factors",
+                    "Maintain regular clinical examinations every 6-12 months"
+                ]
+        elif gender.lower() == 'male':
+            elements.append(Paragraph(f"As a {age}-year-old man, breast cancer is rare but still possible:", normal_style))
+            # Add patient name recommendation as normal text instead of bullet point
+            elements.append(Paragraph(f"<b>{patient_name}</b>, even as a male at {age}, be aware of any unusual changes to chest tissue.", normal_style))
+            guidance_points = [
+                "Discuss any family history of breast cancer (especially in male relatives) with your doctor",
+                "Regular physical examinations are recommended to monitor overall health"
+            ]
+        else:
+            elements.append(Paragraph(f"Based on your age of {age}, we recommend:", normal_style))
+            # Add patient name recommendation as normal text instead of bullet point
+            elements.append(Paragraph(f"<b>{patient_name}</b>, regular breast health monitoring is appropriate for your age of {age}.", normal_style))
+            guidance_points = [
+                "Discuss personalized screening recommendations with your healthcare provider",
+                "Be aware of any changes in breast tissue and report them promptly"
+            ]
+
+        elements += self._bullets(guidance_points)
+        elements.append(Spacer(1, 10))
+
+        # 6. Lifestyle & Nutrition Recommendations - DIFFERENT BASED ON DIAGNOSIS
+        elements += self._static(self.headings[6], *self.lifestyle[diagnosis_key])
+        elements.append(Spacer(1, 10))
+
+        # 7. Monitoring & Follow-Up - DIFFERENT BASED ON DIAGNOSIS
+        elements += self._static(self.headings[7], *self.followup[diagnosis_key])
+        elements.append(Spacer(1, 10))
+
+        # 8. Support Resources - numbered list
+        elements += self._static(self.headings[8], *self.support_resources)
+        elements.append(Spacer(1, 10))
+
+        # 9. Additional Information - condensed for space
+        elements += self._static(self.headings[9], self.advisory_frame)
+        elements.append(Spacer(1, 10))
+
+        # Add dividing line before footer using a Table instead of HRFlowable
+        elements += self._static(self.hr_footer)
+        elements.append(Spacer(1, 4))
+
+        # 10. Report Footer
+        footer_text = f"Report generated for: {patient_name} | Date: {report_date} | CONFIDENTIAL MEDICAL INFORMATION"
+        elements.append(Paragraph(footer_text, self.footer_style))
+
+        # Build PDF
+        doc.build(elements)
+        return pdf_buffer.getvalue()
+
+
+_template = None
+_template_lock = threading.Lock()
+
+def get_template():
+    """Return the process-wide ReportTemplate, building it on first use."""
+    global _template
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                _template = ReportTemplate()
+    return _template
+
+
+def render_report(data, report_date):
+    """Render the diagnostic report PDF for a /generate-report payload and return its bytes."""
+    return get_template().render(data, report_date)
+
+
+def get_top_contributions(contributions, num_features=3):
+    """
+    Get the top N features by absolute contribution to the malignancy probability,
+    from the feature_contributions returned by /predict.
+    """
+    features = sorted(contributions.get('features', []), key=lambda f: abs(f['contribution']), reverse=True)
+    return [(f['feature'], f['value'], f['contribution']) for f in features[:num_features]]
+
+
+def get_top_features(clinical_data, num_features=3):
+    """
+    Get the top N most significant features based on relative values.
+    For simplicity, we're using 'worst' features as they typically have more significance.
+    """
+    # Define important feature patterns to prioritize
+    important_patterns = ['_worst', 'concave_points', 'area', 'radius', 'perimeter']
+
+    # Extract and sort features
+    features = []
+    for key, value in clinical_data.items():
+        # Calculate importance score - higher for important patterns
+        importance = 0
+        for pattern in important_patterns:
+            if pattern in key:
+                importance += 1
+
+        # Add tuple (key, value, importance)
+        features.append((key, value, importance))
+
+    # Sort by importance (descending) and then by value (descending)
+    features.sort(key=lambda x: (x[2], x[1]), reverse=True)
+
+    # Return top N features (without the importance score)
+    return [(f[0], f[1]) for f in features[:num_features]]
+
+
+if __name__ == '__main__':
+    sample = {
+        'name': 'Benchmark Patient', 'age': 52, 'gender': 'female', 'prediction': 'Malignant',
+        'clinical_data': {
+            'concave_points_mean': 0.1471, 'concave_points_worst': 0.2654, 'radius_worst': 25.38,
+            'perimeter_worst': 184.6, 'area_worst': 2019.0, 'concavity_mean': 0.3001,
+            'perimeter_mean': 122.8, 'area_mean': 1001.0
+        }
+    }
+    repeat = 30
+
+    # Before: fonts, styles and static sections rebuilt for every report
+    start = time.perf_counter()
+    for _ in range(repeat):
+        ReportTemplate().render(sample, '2025-01-01')
+    per_call_ms = (time.perf_counter() - start) / repeat * 1000
+
+    # After: one template shared by every report
+    template = ReportTemplate()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        template.render(sample, '2025-01-01')
+    shared_ms = (time.perf_counter() - start) / repeat * 1000
+
+    print(f"Template rebuilt per report: {per_call_ms:.2f} ms/report")
+    print(f"Shared template:             {shared_ms:.2f} ms/report ({per_call_ms / shared_ms:.2f}x)")
@@ -0,0 +1,186 @@
+"""
+Disk-backed, content-addressed cache for generated PDF reports.
+
+Reports are keyed by a SHA-256 of the canonicalised request payload and the
+report date, written atomically (temp file + rename) and evicted
+least-recently-used first once the cache exceeds its size or age limits.
+
+The directory is shared by every worker process (and the report job pool),
+so the limits apply to its contents, not to what one process wrote: each
+store re-reads the directory under an exclusive file lock before evicting.
+File mtimes double as last-access times, so every process sees the others'
+hits. Without fcntl (Windows) the lock is per process only.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+LOCK_FILE = '.lock'
+STALE_TMP_SECONDS = 3600  # older .tmp files are leftovers of interrupted writes
+
+
+class ReportCache:
+    """LRU cache of rendered reports stored as files in one directory."""
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024, max_age_seconds=24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (size, last_access), least recently used first
+        self._bytes = 0
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_existing()
+
+    @staticmethod
+    def key_for(payload, report_date):
+        """Canonical hash of the payload: key order and whitespace don't change the key."""
+        canonical = json.dumps({'payload': payload, 'report_date': report_date},
+                               sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def _load_existing(self):
+        """Index reports left on disk by previous or concurrent processes."""
+        with self._directory_lock(), self._lock:
+            self._rescan()
+            self._evict()
+
+    @contextmanager
+    def _directory_lock(self):
+        """Exclusive lock shared by every process using this directory."""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, LOCK_FILE), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _rescan(self):
+        """Rebuild the index from the directory, least recently used first. Caller holds both locks."""
+        now = time.time()
+        found = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pdf'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # evicted by another process meanwhile
+                found.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+            elif entry.name.endswith('.tmp'):
+                # Another process may be writing this one right now; only clear out old leftovers
+                try:
+                    if now - entry.stat().st_mtime > STALE_TMP_SECONDS:
+                        os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+        self._entries = OrderedDict((key, (size, mtime)) for mtime, key, size in sorted(found))
+        self._bytes = sum(size for _, _, size in found)
+
+    def _discover(self, key):
+        """Index a report another process stored since our last scan; None if there is none. Caller holds the lock."""
+        try:
+            stat = os.stat(self._path(key))
+        except FileNotFoundError:
+            return None
+        self._entries[key] = (stat.st_size, stat.st_mtime)
+        self._bytes += stat.st_size
+        return self._entries[key]
+
+    def get(self, key):
+        """Return an open binary file for a cached report, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key) or self._discover(key)
+            if entry is None or now - entry[1] > self.max_age:
+                self._counters['misses'] += 1
+                return None
+            self._entries[key] = (entry[0], now)
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            try:
+                # Opened under the lock, so eviction can only unlink it after we hold a handle
+                report = open(self._path(key), 'rb')
+            except FileNotFoundError:
+                self._drop(key)
+                self._counters['hits'] -= 1
+                self._counters['misses'] += 1
+                return None
+        # mtime doubles as last-access time for _load_existing after a restart. Set through the open
+        # handle where possible: another process may evict (unlink) the path at any moment
+        try:
+            os.utime(report.fileno() if os.utime in os.supports_fd else self._path(key), (now, now))
+        except FileNotFoundError:
+            pass  # evicted meanwhile; the open handle still serves this hit
+        return report
+
+    def put(self, key, data):
+        """Store a rendered report atomically and return it as an open binary file."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # Other processes write to the same directory, so evict from what is actually there
+        with self._directory_lock(), self._lock:
+            self._rescan()
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            else:
+                self._entries[key] = (len(data), time.time())  # already evicted by a concurrent store
+                self._bytes += len(data)
+            self._evict(keep=key)
+            return open(self._path(key), 'rb')
+
+    def stats(self):
+        """Hit ratio and evictions of this process; entries and bytes as of its last store."""
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                **self._counters,
+                'hit_ratio': self._counters['hits'] / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes_stored': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _drop(self, key):
+        size, _ = self._entries.pop(key)
+        self._bytes -= size
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, keep=None):
+        """Remove expired entries, then least recently used ones until under max_bytes. Caller holds the lock."""
+        now = time.time()
+        while self._entries:
+            key, (_, last_access) = next(iter(self._entries.items()))
+            # Entries are in access order, so the oldest one decides whether to continue
+            if key == keep or (now - last_access <= self.max_age and self._bytes <= self.max_bytes):
+                break
+            self._drop(key)
+            self._counters['evictions'] += 1
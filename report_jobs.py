@@ -0,0 +1,211 @@
+"""
+Asynchronous report-generation jobs on a process pool.
+
+POSTing a job returns an id straight away; each patient's PDF is rendered in
+a worker process (so reportlab never holds the web worker's GIL) and the
+client polls for status and downloads the result. A job with several
+patients produces a ZIP of their reports.
+"""
+import io
+import logging
+import multiprocessing
+import re
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def render_in_worker(payload, report_date):
+    """Render one report; module-level so a ProcessPoolExecutor can pickle it."""
+    # Imported here so only the worker processes load reportlab, not the web process
+    from report import render_report
+    return render_report(payload, report_date)
+
+
+def safe_filename(name, default='Patient'):
+    """Reduce a user-supplied name to characters safe in a file or ZIP entry name."""
+    # Dropping every separator and dot also rules out '..' and absolute paths
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', str(name)).strip('_') or default
+
+
+class JobQueueFullError(Exception):
+    """Raised when too many reports are already waiting to be rendered."""
+
+
+class ReportJob:
+    """One submitted job: a list of report payloads and their per-patient results."""
+
+    def __init__(self, payloads, report_date):
+        self.id = uuid.uuid4().hex
+        self.payloads = payloads
+        self.report_date = report_date
+        self.created = time.time()
+        self.finished = None
+        self.futures = []
+        self.results = [None] * len(payloads)
+        self.errors = []
+        self.cancelled = False
+
+    @property
+    def status(self):
+        """queued, running, done, failed or cancelled.
+
+        A job only turns failed once every report has either rendered or
+        failed, so a client never stops polling while renders are in flight.
+        """
+        if self.cancelled:
+            return 'cancelled'
+        remaining = sum(result is None for result in self.results) - len(self.errors)
+        if remaining > 0:
+            if any(future.running() or future.done() for future in self.futures):
+                return 'running'
+            return 'queued'
+        return 'failed' if self.errors else 'done'
+
+    def describe(self):
+        """JSON-ready summary for the status endpoint."""
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'completed': sum(result is not None for result in self.results),
+            'total': len(self.payloads),
+            'errors': self.errors,
+            'created': self.created,
+            'finished': self.finished,
+        }
+
+
+class ReportJobQueue:
+    """Bounded queue of report jobs rendered by a ProcessPoolExecutor."""
+
+    def __init__(self, max_workers=2, max_pending=100, job_ttl_seconds=3600, cache=None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.job_ttl = job_ttl_seconds
+        self.cache = cache
+        self._executor = None
+        self._jobs = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created on first use so importing the app never forks worker processes
+        with self._lock:
+            if self._executor is None:
+                # Spawned, not forked: a fork of this multi-threaded process would inherit
+                # locks held by the batcher, write-behind and watcher threads
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def submit(self, payloads, report_date):
+        """Queue one report per payload and return the new job."""
+        self._expire()
+        job = ReportJob(payloads, report_date)
+
+        # Reports already in the cache don't need a worker
+        to_render = []
+        for index, payload in enumerate(payloads):
+            cached = self.cache.get(self.cache.key_for(payload, report_date)) if self.cache else None
+            if cached is not None:
+                with cached:
+                    job.results[index] = cached.read()
+            else:
+                to_render.append(index)
+
+        with self._lock:
+            if self._pending + len(to_render) > self.max_pending:
+                raise JobQueueFullError('Too many reports queued, please retry later')
+            self._pending += len(to_render)
+            self._jobs[job.id] = job
+
+        executor = self._get_executor()
+        for index in to_render:
+            future = executor.submit(render_in_worker, payloads[index], report_date)
+            future.add_done_callback(lambda future, index=index: self._on_done(job, index, future))
+            job.futures.append(future)
+        if not to_render:
+            job.finished = time.time()
+        return job
+
+    def _on_done(self, job, index, future):
+        pdf = None
+        try:
+            if not future.cancelled() and future.exception() is None:
+                pdf = future.result()
+        finally:
+            # The slot is freed and the outcome recorded whatever happens next
+            with self._lock:
+                self._pending -= 1
+                if not future.cancelled():
+                    if pdf is None:
+                        job.errors.append({'index': index, 'error': str(future.exception())})
+                    else:
+                        job.results[index] = pdf
+                    if job.status not in ('queued', 'running'):
+                        job.finished = time.time()
+
+        if pdf is not None and self.cache:
+            try:
+                self.cache.put(self.cache.key_for(job.payloads[index], job.report_date), pdf).close()
+            except OSError:
+                # Only costs a re-render next time
+                logger.warning("Could not cache report %d of job %s", index, job.id, exc_info=True)
+
+    def get(self, job_id):
+        """Return a job by id, or None if unknown or expired."""
+        self._expire()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel every report of a job that has not started rendering yet."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        for future in job.futures:
+            future.cancel()
+        with self._lock:
+            if job.status != 'done':
+                job.cancelled = True
+                job.finished = time.time()
+        return job
+
+    def result(self, job):
+        """The finished job's output as (bytes, mimetype, extension)."""
+        if len(job.results) == 1:
+            return job.results[0], 'application/pdf', 'pdf'
+
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for index, (payload, pdf) in enumerate(zip(job.payloads, job.results), 1):
+                zf.writestr(f"{index:03d}_breast_cancer_report_{safe_filename(payload.get('name', 'Patient'))}.pdf", pdf)
+        return archive.getvalue(), 'application/zip', 'zip'
+
+    def stats(self):
+        """Job counts by status and queue occupancy."""
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {
+            'jobs': len(statuses),
+            'pending_reports': self._pending,
+            'max_pending': self.max_pending,
+            'workers': self.max_workers,
+            **{status: statuses.count(status) for status in ('queued', 'running', 'done', 'failed', 'cancelled')},
+        }
+
+    def _expire(self):
+        """Forget finished jobs older than the TTL, freeing their results."""
+        cutoff = time.time() - self.job_ttl
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.finished < cutoff]:
+                del self._jobs[job_id]
+
+    def shutdown(self):
+        """Stop the worker pool, dropping reports that have not started."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,199 @@
+"""
+Incremental retraining from clinically confirmed patient records.
+
+Rows whose diagnosis has been confirmed (POST /api/patients/<id>/confirm) are
+streamed out of SQLite in chunks, starting after the watermark stored in the
+model's metadata file, so each run only reads records confirmed since the
+last one. The existing forest is not refitted: it is copied and grown with a
+few warm-started trees fitted on the new rows plus a fixed-size replay sample
+of the original training data, so the cost scales with new data rather than
+total history.
+
+A holdout check decides promotion: the candidate must score within
+--tolerance of the current model on the original holdout split plus a
+deterministic slice of the new rows. Promotion replaces the model file and
+its metadata atomically.
+
+Usage: python retrain.py [--model breast_cancer_model.pkl] [--db patient_metadata.db]
+                         [--new-trees 20] [--chunk-size 5000] [--dry-run] [--publish]
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.model_selection import train_test_split
+
+import db_functions
+from model import DATA_PATH, MODEL_PATH, RANDOM_STATE, REQUIRED_FEATURES, load_dataset, metadata_path
+
+NEW_TREES = 20
+MAX_TREES = 1000
+REPLAY_ROWS = 200
+MIN_NEW_ROWS = 20
+HOLDOUT_EVERY = 5  # every 5th confirmed id is held out for the promotion check
+TOLERANCE = 0.005
+
+
+def load_metadata(model_path):
+    """The model's metadata JSON, or {} for a model trained before metadata existed."""
+    try:
+        with open(metadata_path(model_path)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def read_confirmed(after, chunk_size, path=None):
+    """
+    Stream confirmed rows after the watermark and return (X, y, ids, watermark).
+    Only the new rows are kept in memory, as compact float arrays.
+    """
+    features, labels, ids = [], [], []
+    watermark = after
+    for chunk in db_functions.iter_confirmed_rows(after, chunk_size, path):
+        features.append(np.array([[row[f] for f in REQUIRED_FEATURES] for row in chunk], dtype=np.float64))
+        labels.extend(row['confirmed_diagnosis'] for row in chunk)
+        ids.extend(row['id'] for row in chunk)
+        watermark = (chunk[-1]['confirmed_at'], chunk[-1]['id'])
+
+    X = np.vstack(features) if features else np.empty((0, len(REQUIRED_FEATURES)))
+    return X, np.array(labels, dtype=object), np.array(ids, dtype=np.int64), watermark
+
+
+def grow_forest(model, X, y, new_trees):
+    """Return a copy of `model` with `new_trees` extra trees fitted on (X, y); the original is untouched."""
+    candidate = copy.deepcopy(model)
+    candidate.set_params(warm_start=True, n_estimators=len(model.estimators_) + new_trees)
+    candidate.fit(pd.DataFrame(X, columns=REQUIRED_FEATURES), y)  # DataFrame keeps feature_names_in_
+    candidate.set_params(warm_start=False)
+    return candidate
+
+
+def score(model, X, y):
+    """Accuracy and ROC-AUC of a model on a labelled set."""
+    X = pd.DataFrame(X, columns=REQUIRED_FEATURES)
+    malignant = model.predict_proba(X)[:, list(model.classes_).index('M')]
+    return {
+        'accuracy': float(accuracy_score(y, model.predict(X))),
+        'roc_auc': float(roc_auc_score(y == 'M', malignant)) if len(set(y)) == 2 else None,
+    }
+
+
+def should_promote(current, candidate, tolerance):
+    """The candidate may not lose more than `tolerance` on any holdout metric."""
+    return all(
+        candidate[metric] >= current[metric] - tolerance
+        for metric in ('accuracy', 'roc_auc') if current[metric] is not None
+    )
+
+
+def save_atomically(model, metadata, model_path):
+    """Write model and metadata to temp files and rename them into place."""
+    joblib.dump(model, model_path + '.tmp')
+    with open(metadata_path(model_path) + '.tmp', 'w') as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(model_path + '.tmp', model_path)
+    os.replace(metadata_path(model_path) + '.tmp', metadata_path(model_path))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--db', default=db_functions.DB_PATH)
+    parser.add_argument('--data', default=DATA_PATH, help='original training CSV (replay sample and holdout)')
+    parser.add_argument('--new-trees', type=int, default=NEW_TREES)
+    parser.add_argument('--max-trees', type=int, default=MAX_TREES)
+    parser.add_argument('--replay-rows', type=int, default=REPLAY_ROWS)
+    parser.add_argument('--min-rows', type=int, default=MIN_NEW_ROWS)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--dry-run', action='store_true', help='evaluate the candidate but never promote it')
+    parser.add_argument('--publish', action='store_true',
+                        help='also publish the promoted model to the registry, so serving workers hot-load it')
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    metadata = load_metadata(args.model)
+    after = tuple(metadata.get('confirmed_through', ('', 0)))
+
+    # ===== Stream New Confirmed Rows =====
+    start = time.perf_counter()
+    db_functions.init_db(args.db)
+    X_new, y_new, ids, watermark = read_confirmed(after, args.chunk_size, args.db)
+    print(f"Read {len(ids)} confirmed rows after {after} in {time.perf_counter() - start:.2f}s")
+
+    if len(ids) < args.min_rows:
+        print(f"✅ Nothing to do: fewer than {args.min_rows} new confirmed rows")
+        sys.exit(0)
+    if len(model.estimators_) + args.new_trees > args.max_trees:
+        print(f"❌ Forest would exceed {args.max_trees} trees; run a full retrain with model.py instead")
+        sys.exit(1)
+
+    held_out = ids % HOLDOUT_EVERY == 0
+
+    # ===== Training Set for the New Trees =====
+    # The replay sample keeps both classes present and anchors the new trees to
+    # the original distribution at a constant cost.
+    X_base, y_base = load_dataset(args.data)
+    X_train, X_test, y_train, y_test = train_test_split(X_base, y_base, test_size=0.2, random_state=RANDOM_STATE)
+    replay_rows = min(args.replay_rows, len(X_train))
+    if replay_rows < len(X_train):
+        X_replay, _, y_replay, _ = train_test_split(
+            X_train, y_train, train_size=replay_rows, stratify=y_train, random_state=RANDOM_STATE
+        )
+    else:
+        X_replay, y_replay = X_train, y_train
+    X_fit = np.vstack([X_replay.to_numpy(), X_new[~held_out]])
+    y_fit = np.concatenate([y_replay.to_numpy(dtype=object), y_new[~held_out]])
+
+    # ===== Grow the Forest =====
+    start = time.perf_counter()
+    candidate = grow_forest(model, X_fit, y_fit, args.new_trees)
+    fit_seconds = time.perf_counter() - start
+    print(f"Grew forest {len(model.estimators_)} -> {len(candidate.estimators_)} trees "
+          f"on {len(X_fit)} rows in {fit_seconds:.2f}s")
+
+    # ===== Holdout Check =====
+    X_holdout = np.vstack([X_test.to_numpy(), X_new[held_out]])
+    y_holdout = np.concatenate([y_test.to_numpy(dtype=object), y_new[held_out]])
+    current_scores = score(model, X_holdout, y_holdout)
+    candidate_scores = score(candidate, X_holdout, y_holdout)
+    print(f"Holdout ({len(y_holdout)} rows, {int(held_out.sum())} new): "
+          f"current {current_scores}, candidate {candidate_scores}")
+
+    if not should_promote(current_scores, candidate_scores, args.tolerance):
+        print("❌ Candidate is worse than the current model on the holdout; not promoted")
+        sys.exit(1)
+    if args.dry_run:
+        print("✅ Candidate passed the holdout check (dry run, not promoted)")
+        sys.exit(0)
+
+    # ===== Promote =====
+    metadata.setdefault('required_features', list(candidate.feature_names_in_))
+    metadata.setdefault('classes', list(candidate.classes_))
+    metadata['holdout'] = candidate_scores
+    metadata['confirmed_through'] = list(watermark)
+    metadata.setdefault('retrain_history', []).append({
+        'retrained_at': datetime.now().isoformat(),
+        'new_rows': int(len(ids)),
+        'new_rows_held_out': int(held_out.sum()),
+        'trees': len(candidate.estimators_),
+        'fit_seconds': fit_seconds,
+        'holdout_before': current_scores,
+        'holdout_after': candidate_scores,
+    })
+    save_atomically(candidate, metadata, args.model)
+    print(f"✅ Promoted {args.model} ({len(candidate.estimators_)} trees), confirmed through {watermark}")
+
+    if args.publish:
+        import model_registry
+        published = model_registry.publish(args.model)
+        print(f"✅ Published and activated model version {published['version']}")
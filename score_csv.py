@@ -0,0 +1,167 @@
+"""
+Bulk-score CSV files with the breast cancer model.
+
+The input is read in fixed-size chunks and flows through a generator
+pipeline (read -> score -> write), so memory stays flat however large the
+file is. Each chunk is scored as one vectorized batch by the compiled
+forest (inference_engine.py); with --workers N chunks are fanned out to a
+process pool, keeping at most 2N chunks in flight and the output in input
+order.
+
+Every input column is passed through as read, followed by prediction,
+malignant_prob, benign_prob and status. Rows with a missing, non-numeric or
+infinite feature get status 'invalid' and no prediction. Parquet output has
+a fixed schema: features and probabilities are doubles, every other column
+a string.
+
+Usage: python score_csv.py input.csv output.csv [--chunk-size 50000] [--workers 4]
+       python score_csv.py input.csv output.parquet   # needs pyarrow
+"""
+import argparse
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from inference_engine import MODEL_PATH, CompiledForest, load_engine
+
+CHUNK_SIZE = 50000
+SCORE_TYPES = {'prediction': 'string', 'malignant_prob': 'float64', 'benign_prob': 'float64', 'status': 'string'}
+
+_engine = None  # per process: set by load_model() in the parent or each pool worker
+
+
+def load_model(path=MODEL_PATH):
+    """Load the model for this process: .forest files are memory-mapped, pickles compiled."""
+    global _engine
+    _engine = CompiledForest.load_mmap(path) if path.endswith('.forest') else load_engine(path)
+    return _engine
+
+
+def read_chunks(path, chunk_size, features):
+    """Yield DataFrame chunks of the CSV after checking that every feature column exists."""
+    header = pd.read_csv(path, nrows=0).columns
+    missing = [feature for feature in features if feature not in header]
+    if missing:
+        raise ValueError(f"Input is missing required features: {missing}")
+    # Read as text so a column's type never depends on which rows a chunk happens to hold
+    yield from pd.read_csv(path, chunksize=chunk_size, dtype=str)
+
+
+def score_chunk(chunk):
+    """Append prediction columns to one chunk, scoring all of its valid rows in one call."""
+    features = chunk[_engine.feature_names_in_].apply(pd.to_numeric, errors='coerce').to_numpy(np.float64)
+    valid = np.isfinite(features).all(axis=1)  # NaN (missing or non-numeric) and +/-inf
+
+    probabilities = np.full((len(chunk), len(_engine.classes_)), np.nan)
+    if valid.any():
+        probabilities[valid] = _engine.predict_proba(features[valid])
+
+    classes = _engine.classes_.tolist()
+    labels = np.asarray(_engine.classes_, dtype=object)[np.nan_to_num(probabilities).argmax(axis=1)]
+    chunk = chunk.copy()
+    chunk['prediction'] = np.where(valid, labels, None)
+    chunk['malignant_prob'] = probabilities[:, classes.index('M')]
+    chunk['benign_prob'] = probabilities[:, classes.index('B')]
+    chunk['status'] = np.where(valid, 'ok', 'invalid')
+    return chunk
+
+
+def score_chunks(chunks, workers=0, model_path=MODEL_PATH):
+    """Score chunks in order, in this process or on a pool with a bounded number in flight."""
+    if workers <= 1:
+        yield from map(score_chunk, chunks)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=load_model, initargs=(model_path,)) as pool:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(pool.submit(score_chunk, chunk))
+            if len(in_flight) >= 2 * workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def write_csv(chunks, path):
+    """Append each scored chunk to a CSV file; returns (rows, invalid rows)."""
+    rows = invalid = 0
+    for index, chunk in enumerate(chunks):
+        chunk.to_csv(path, mode='w' if index == 0 else 'a', header=index == 0, index=False)
+        rows += len(chunk)
+        invalid += int((chunk['status'] == 'invalid').sum())
+    return rows, invalid
+
+
+def parquet_schema(columns, features):
+    """The output schema, fixed by column names alone: features and scores typed, everything else a string."""
+    import pyarrow as pa
+    types = {**{feature: 'float64' for feature in features}, **SCORE_TYPES}
+    return pa.schema([(column, pa.type_for_alias(types.get(column, 'string'))) for column in columns])
+
+
+def write_parquet(chunks, path):
+    """Write each scored chunk as a Parquet row group; returns (rows, invalid rows)."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)")
+
+    rows = invalid = 0
+    writer = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                # Not inferred from the first chunk: an all-invalid chunk would fix null-typed columns
+                writer = pq.ParquetWriter(path, parquet_schema(chunk.columns, _engine.feature_names_in_))
+            chunk = chunk.copy()
+            for field in writer.schema:
+                if pa.types.is_floating(field.type):
+                    chunk[field.name] = pd.to_numeric(chunk[field.name], errors='coerce')
+            writer.write_table(pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False))
+            rows += len(chunk)
+            invalid += int((chunk['status'] == 'invalid').sum())
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows, invalid
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None where there is no resource module (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('input')
+    parser.add_argument('output', help='.csv or .parquet')
+    parser.add_argument('--model', default=MODEL_PATH, help='pickle, or a .forest file from inference_engine.py export')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=0, help='score chunks on a process pool of this size')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    engine = load_model(args.model)
+    write = write_parquet if args.output.endswith('.parquet') else write_csv
+
+    try:
+        chunks = read_chunks(args.input, args.chunk_size, engine.feature_names_in_)
+        rows, invalid = write(score_chunks(chunks, args.workers, args.model), args.output)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    elapsed = time.perf_counter() - start
+    peak_mb = peak_rss_mb()
+    peak = f", peak RSS {peak_mb:.0f} MB" if peak_mb is not None else ''
+    print(f"✅ Scored {rows} rows ({invalid} invalid) into {args.output} in {elapsed:.1f}s "
+          f"({rows / elapsed:,.0f} rows/sec{peak})")
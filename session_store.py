@@ -0,0 +1,213 @@
+"""
+Server-side sessions: the cookie carries only a random session id, and the
+session data (e.g. the last diagnosis the chatbot shows) stays on the server.
+
+    SESSION_BACKEND=sqlite   # default; shared by every worker on the host, survives restarts
+    SESSION_BACKEND=memory   # per process; for a single worker or development
+
+A session expires SESSION_TTL seconds after it was last written; reads
+extend it once half of that has passed. Expired entries are purged at most
+once per PURGE_INTERVAL seconds. The id is 256 random bits rather than a
+signed payload, so sessions no longer depend on app.secret_key being the
+same in every worker and across restarts.
+"""
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from werkzeug.datastructures import CallbackDict
+
+import db_functions
+from metrics import span
+
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'sqlite')
+SESSION_DB_PATH = os.environ.get('SESSION_DB_PATH', 'sessions.db')
+SESSION_TTL = int(os.environ.get('SESSION_TTL', 24 * 3600))
+SESSION_MAX_ENTRIES = int(os.environ.get('SESSION_MAX_ENTRIES', 100000))  # memory backend only
+PURGE_INTERVAL = 60
+
+CREATE_SESSIONS_SQL = (
+    "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)",
+)
+UPSERT_SESSION_SQL = """
+    INSERT INTO sessions (id, data, expires_at) VALUES (?, ?, ?)
+    ON CONFLICT (id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at
+"""
+
+
+class MemorySessionStore:
+    """Serialised sessions in a per-process dict; the least recently written are evicted beyond max_entries."""
+
+    def __init__(self, ttl_seconds=SESSION_TTL, max_entries=SESSION_MAX_ENTRIES):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # sid -> (data, expires_at), least recently written first
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+
+    def load(self, sid):
+        """Return (data, expires_at), or None for unknown or expired ids."""
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is None or entry[1] < time.time():
+                return None
+            return entry
+
+    def save(self, sid, data):
+        now = time.time()
+        with self._lock:
+            self._entries[sid] = (data, now + self.ttl)
+            self._entries.move_to_end(sid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if now >= self._next_purge:
+                self._next_purge = now + PURGE_INTERVAL
+                for expired in [key for key, (_, expires_at) in self._entries.items() if expires_at < now]:
+                    del self._entries[expired]
+
+    def delete(self, sid):
+        with self._lock:
+            self._entries.pop(sid, None)
+
+
+class SqliteSessionStore:
+    """Serialised sessions in a SQLite table, through db_functions' connection pool."""
+
+    def __init__(self, path=SESSION_DB_PATH, ttl_seconds=SESSION_TTL):
+        self.path = path
+        self.ttl = ttl_seconds
+        self._ready = False
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+
+    def _ensure_table(self):
+        # Created on first use: the interface is installed at import time, before warmup()
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    with db_functions.transaction(self.path) as conn:
+                        for statement in CREATE_SESSIONS_SQL:
+                            conn.execute(statement)
+                    self._ready = True
+
+    def load(self, sid):
+        """Return (data, expires_at), or None for unknown or expired ids."""
+        self._ensure_table()
+        with db_functions.connection(self.path) as conn:
+            row = conn.execute("SELECT data, expires_at FROM sessions WHERE id = ?", (sid,)).fetchone()
+        if row is None or row['expires_at'] < time.time():
+            return None
+        return row['data'], row['expires_at']
+
+    def save(self, sid, data):
+        self._ensure_table()
+        now = time.time()
+        purge = now >= self._next_purge
+        if purge:
+            self._next_purge = now + PURGE_INTERVAL
+        with db_functions.transaction(self.path) as conn:
+            conn.execute(UPSERT_SESSION_SQL, (sid, data, now + self.ttl))
+            if purge:
+                conn.execute("DELETE FROM sessions WHERE expires_at < ?", (now,))
+
+    def delete(self, sid):
+        self._ensure_table()
+        with db_functions.transaction(self.path) as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (sid,))
+
+
+def create_store(backend=SESSION_BACKEND):
+    if backend == 'memory':
+        return MemorySessionStore()
+    if backend == 'sqlite':
+        return SqliteSessionStore()
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend!r} (expected 'sqlite' or 'memory')")
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """A session dict that remembers its id, its expiry and whether it was changed."""
+
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        def on_update(session):
+            session.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.modified = False
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Flask session interface keeping session data in a store and only its id in the cookie."""
+
+    def __init__(self, store):
+        self.store = store
+
+    # ===== Framework-Neutral Helpers (also used by asgi_app.py) =====
+    def load(self, sid):
+        """Session data for an id, or None if it is unknown or expired."""
+        with span('session.load'):
+            entry = self.store.load(sid) if sid else None
+        return None if entry is None else session_json_serializer.loads(entry[0])
+
+    def save(self, sid, data):
+        """Store session data under its id (a new one if sid is None) and return the id."""
+        sid = sid or secrets.token_urlsafe(32)
+        with span('session.save'):
+            self.store.save(sid, session_json_serializer.dumps(dict(data)))
+        return sid
+
+    def ensure_sid(self, session):
+        """
+        Give a new session its id now rather than at save time, so the request
+        can use it (e.g. to tag published diagnoses). The session is then
+        stored and its cookie set even if it stays empty.
+        """
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(32)
+            session.modified = True
+        return session.sid
+
+    def cookie_options(self, app):
+        return {
+            'path': self.get_cookie_path(app),
+            'domain': self.get_cookie_domain(app),
+            'secure': self.get_cookie_secure(app),
+            'httponly': self.get_cookie_httponly(app),
+            'samesite': self.get_cookie_samesite(app),
+        }
+
+    # ===== Flask SessionInterface =====
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        # Static files never read the session, so they skip the store lookup
+        if request.path.startswith(f"{app.static_url_path}/"):
+            return ServerSideSession(sid=sid)
+
+        with span('session.load'):
+            entry = self.store.load(sid) if sid else None
+        if entry is None:
+            return ServerSideSession()  # unknown ids get a fresh one on save, never reused
+        data, expires_at = entry
+        return ServerSideSession(session_json_serializer.loads(data), sid=sid, expires_at=expires_at)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        # An empty session is only kept when ensure_sid() gave it an id this request
+        if not session and (session.sid is None or session.expires_at is not None):
+            if session.modified and session.sid:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, path=self.get_cookie_path(app), domain=self.get_cookie_domain(app))
+            return
+
+        # Sliding expiry without a write per request: only rewrite once half the TTL has passed
+        stale = session.expires_at is not None and session.expires_at - time.time() < self.store.ttl / 2
+        if not (session.modified or stale):
+            return
+        sid = self.save(session.sid, session)
+        response.set_cookie(name, sid, expires=self.get_expiration_time(app, session), **self.cookie_options(app))
+        response.vary.add('Cookie')
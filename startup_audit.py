@@ -0,0 +1,123 @@
+"""
+Import-time audit and cold-start benchmark for app.py.
+
+Each measurement runs in a fresh interpreter, so nothing is already cached in
+sys.modules:
+  * `python -X importtime` lists the slowest modules pulled in by `import app`
+  * heavy libraries (reportlab, pandas, sklearn, ...) must not be among them
+  * `import app` and `app.warmup()` are timed over several runs and the
+    medians are checked against the startup budget
+
+Exits non-zero when a heavy module is imported eagerly or a budget is exceeded.
+
+Usage: python startup_audit.py [--runs N] [--import-budget-ms MS] [--budget-ms MS] [--output results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Modules that must only be loaded on first use, never by `import app`
+DEFERRED_MODULES = ('reportlab', 'pandas', 'sklearn', 'joblib', 'matplotlib', 'seaborn')
+
+IMPORT_BUDGET_MS = float(os.environ.get('STARTUP_IMPORT_BUDGET_MS', 1000))
+STARTUP_BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', 5000))
+
+COLD_START_SNIPPET = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.warmup()
+warm = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000, 'warmup_ms': (warm - imported) * 1000}))
+"""
+
+
+def import_profile(module='app'):
+    """Return [(cumulative_us, self_us, name), ...] for `import module`, slowest first."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, check=True
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        entries.append((int(cumulative_us), int(self_us), name.strip()))
+    return sorted(entries, reverse=True)
+
+
+def cold_start(runs):
+    """Time `import app` and `app.warmup()` in `runs` fresh interpreters."""
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-W', 'ignore', '-c', COLD_START_SNIPPET],
+            capture_output=True, text=True, check=True
+        )
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='slowest imports to list')
+    parser.add_argument('--import-budget-ms', type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS,
+                        help='budget for import plus warmup')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    # ===== Import Profile =====
+    profile = import_profile()
+    print("Slowest imports for `import app` (cumulative ms / self ms):")
+    for cumulative_us, self_us, name in profile[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} {self_us / 1000:8.1f}  {name}")
+
+    eager = sorted({name.split('.')[0] for _, _, name in profile} & set(DEFERRED_MODULES))
+
+    # ===== Cold Start =====
+    samples = cold_start(args.runs)
+    import_ms = statistics.median(sample['import_ms'] for sample in samples)
+    warmup_ms = statistics.median(sample['warmup_ms'] for sample in samples)
+    total_ms = statistics.median(sample['import_ms'] + sample['warmup_ms'] for sample in samples)
+
+    print(f"\nCold start over {args.runs} runs (median):")
+    print(f"  import app      {import_ms:8.1f} ms  (budget {args.import_budget_ms:.0f} ms)")
+    print(f"  app.warmup()    {warmup_ms:8.1f} ms")
+    print(f"  total           {total_ms:8.1f} ms  (budget {args.budget_ms:.0f} ms)")
+
+    failures = []
+    if eager:
+        failures.append(f"`import app` eagerly loads {', '.join(eager)}")
+    if import_ms > args.import_budget_ms:
+        failures.append(f"import took {import_ms:.0f} ms, budget is {args.import_budget_ms:.0f} ms")
+    if total_ms > args.budget_ms:
+        failures.append(f"cold start took {total_ms:.0f} ms, budget is {args.budget_ms:.0f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'import_ms': import_ms,
+                'warmup_ms': warmup_ms,
+                'total_ms': total_ms,
+                'import_budget_ms': args.import_budget_ms,
+                'budget_ms': args.budget_ms,
+                'eager_heavy_modules': eager,
+                'samples': samples,
+                'slowest_imports': [
+                    {'module': name, 'cumulative_ms': cumulative_us / 1000, 'self_ms': self_us / 1000}
+                    for cumulative_us, self_us, name in profile[:args.top]
+                ],
+            }, f, indent=2)
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ Startup within budget")
@@ -173,6 +173,26 @@ async function refreshPatientData() {
     }
 }
 
+/**
+ * Receive each new diagnosis as soon as the server stores it (Server-Sent Events)
+ * instead of waiting for a manual refresh; EventSource reconnects by itself
+ */
+function subscribeToDiagnoses() {
+    if (!('EventSource' in window)) return; // the Refresh button still works
+
+    const source = new EventSource('/api/diagnosis-events');
+    source.addEventListener('diagnosis', (event) => {
+        const patient = JSON.parse(event.data);
+        if (state.patientData && state.patientData.id === patient.id) return;
+
+        state.patientData = patient;
+        updatePatientDisplay();
+        updateHealthChart(state.patientData);
+        addBotMessage(`New diagnosis received for ${patient.name || 'the patient'}.`);
+    });
+    source.onerror = () => console.warn('Diagnosis stream interrupted, reconnecting...');
+}
+
 // =============================================
 // Event Handling Functions
 // =============================================
@@ -717,6 +737,7 @@ function initChatScroll() {
 // Call this in your init function
 function init() {
     loadInitialPatientData();
+    subscribeToDiagnoses();
     initHealthChart();
     setupEventListeners();
     initChatScroll(); // Add this line
@@ -0,0 +1,77 @@
+"""
+Shared test setup.
+
+Everything the app writes (patients database, sessions, report cache, model
+registry, profiles) goes to a temporary directory, so running the suite never
+touches the tracked patient_metadata.db. The environment is set here, before
+any test imports app.py, because the app reads it at import time.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STATE_DIR = tempfile.mkdtemp(prefix='breast-cancer-tests-')
+for name, value in {
+    'DATABASE_PATH': os.path.join(STATE_DIR, 'patients.db'),
+    'SESSION_DB_PATH': os.path.join(STATE_DIR, 'sessions.db'),
+    'REPORT_CACHE_DIR': os.path.join(STATE_DIR, 'report_cache'),
+    'MODEL_REGISTRY_DIR': os.path.join(STATE_DIR, 'model_registry'),
+    'PROFILE_DIR': os.path.join(STATE_DIR, 'profiles'),
+    'MODEL_PATH': os.path.join(ROOT, 'breast_cancer_model.pkl'),
+    'MODEL_WATCH_INTERVAL': '0',
+}.items():
+    os.environ.setdefault(name, value)
+
+MODEL_PATH = os.path.join(ROOT, 'breast_cancer_model.pkl')
+DATASET_PATH = os.path.join(ROOT, 'BCA.1.csv')
+
+# First row of BCA.1.csv (malignant), keyed by feature name
+MALIGNANT_CASE = {
+    'concave_points_mean': 0.1471, 'concave_points_worst': 0.2654, 'radius_worst': 25.38,
+    'perimeter_worst': 184.6, 'area_worst': 2019, 'concavity_mean': 0.3001,
+    'perimeter_mean': 122.8, 'area_mean': 1001,
+}
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(STATE_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope='session')
+def flask_app():
+    """The app module, warmed up once for the whole run."""
+    import app
+    app.create_app()
+    return app
+
+
+@pytest.fixture
+def client(flask_app):
+    return flask_app.app.test_client()
+
+
+@pytest.fixture
+def case():
+    return dict(MALIGNANT_CASE)
+
+
+@pytest.fixture
+def report_fonts(tmp_path, monkeypatch):
+    """
+    Run in a directory holding the report fonts. The Calibri files are not
+    distributed with the repo, so reportlab's bundled Vera fonts stand in for
+    them when they are missing.
+    """
+    import reportlab
+    bundled = os.path.join(os.path.dirname(reportlab.__file__), 'fonts')
+    for name, fallback in (('Calibri.ttf', 'Vera.ttf'), ('calibrib.ttf', 'VeraBd.ttf'), ('calibrii.ttf', 'VeraIt.ttf')):
+        source = os.path.join(ROOT, name)
+        shutil.copyfile(source if os.path.exists(source) else os.path.join(bundled, fallback), tmp_path / name)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
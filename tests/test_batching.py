@@ -0,0 +1,75 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from batching import BatcherFullError, BatcherTimeoutError, MicroBatcher
+
+
+class BlockingScorer:
+    """score_fn that doubles its input, holding the worker inside the call until released."""
+
+    def __init__(self):
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.batches = []
+
+    def __call__(self, matrix):
+        self.batches.append(len(matrix))
+        self.entered.set()
+        self.release.wait(5)
+        return matrix * 2
+
+
+def test_concurrent_rows_are_coalesced_and_answered_individually():
+    batcher = MicroBatcher(lambda matrix: matrix * 2, max_batch_size=64, window_ms=50)
+    rows = np.arange(40, dtype=np.float64).reshape(20, 2)
+    with ThreadPoolExecutor(20) as pool:
+        results = list(pool.map(batcher.submit, rows))
+    np.testing.assert_array_equal(np.array(results), rows * 2)
+    stats = batcher.stats()
+    assert stats['rows_scored'] == 20
+    assert stats['batches'] < 20
+
+
+def test_full_queue_rejects_immediately():
+    scorer = BlockingScorer()
+    batcher = MicroBatcher(scorer, max_batch_size=1, window_ms=0, max_queue_size=1, timeout_ms=5000)
+    with ThreadPoolExecutor(2) as pool:
+        running = pool.submit(batcher.submit, [1.0])
+        assert scorer.entered.wait(5)           # the worker is busy with the first row
+        queued = pool.submit(batcher.submit, [2.0])
+        while batcher.stats()['queue_depth'] < 1:
+            time.sleep(0.001)                   # the second row now fills the queue
+        with pytest.raises(BatcherFullError):
+            batcher.submit([3.0])
+        scorer.release.set()
+        assert running.result(5)[0] == 2.0
+        assert queued.result(5)[0] == 4.0
+    assert batcher.stats()['rejected'] == 1
+
+
+def test_timed_out_rows_are_never_scored():
+    scorer = BlockingScorer()
+    batcher = MicroBatcher(scorer, max_batch_size=1, window_ms=0, timeout_ms=5000)
+    with ThreadPoolExecutor(1) as pool:
+        running = pool.submit(batcher.submit, [1.0])
+        assert scorer.entered.wait(5)
+        with pytest.raises(BatcherTimeoutError):
+            batcher.submit([2.0], timeout=0.05)
+        scorer.release.set()
+        running.result(5)
+    assert batcher.submit([3.0])[0] == 6.0
+    assert scorer.batches == [1, 1]  # the timed-out row was skipped, not scored late
+    assert batcher.stats()['timed_out'] == 1
+
+
+def test_scoring_errors_reach_every_caller():
+    def broken(matrix):
+        raise ValueError('model exploded')
+
+    batcher = MicroBatcher(broken, window_ms=0)
+    with pytest.raises(ValueError, match='model exploded'):
+        batcher.submit([1.0])
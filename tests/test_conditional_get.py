@@ -0,0 +1,70 @@
+from datetime import datetime, timezone
+
+import pytest
+
+
+@pytest.fixture
+def diagnosed_client(client, case):
+    """A client whose session holds a diagnosis."""
+    assert client.post('/predict', json={'patient_name': 'Conditional', **case}).status_code == 200
+    return client
+
+
+def test_refresh_patient_data_revalidates_with_etag(diagnosed_client):
+    first = diagnosed_client.get('/api/refresh-patient-data')
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'no-cache'
+    assert 'Cookie' in first.headers['Vary']
+    assert first.headers['Last-Modified']
+
+    again = diagnosed_client.get('/api/refresh-patient-data', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == first.headers['ETag']
+
+
+def test_refresh_patient_data_revalidates_with_last_modified(diagnosed_client):
+    first = diagnosed_client.get('/api/refresh-patient-data')
+    again = diagnosed_client.get('/api/refresh-patient-data', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert again.status_code == 304
+
+
+def test_a_new_diagnosis_changes_the_etag(diagnosed_client, case):
+    etag = diagnosed_client.get('/api/refresh-patient-data').headers['ETag']
+    diagnosed_client.post('/predict', json={'patient_name': 'Second', **case})
+    response = diagnosed_client.get('/api/refresh-patient-data', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['name'] == 'Second'
+
+
+def test_etag_decides_when_both_validators_are_sent(diagnosed_client):
+    first = diagnosed_client.get('/api/refresh-patient-data')
+    response = diagnosed_client.get('/api/refresh-patient-data', headers={
+        'If-None-Match': '"stale"', 'If-Modified-Since': first.headers['Last-Modified']
+    })
+    assert response.status_code == 200
+
+
+def test_previous_metrics_revalidates(diagnosed_client):
+    patient_id = diagnosed_client.get('/api/refresh-patient-data').get_json()['id']
+    first = diagnosed_client.get('/get_previous_metrics', query_string={'patient_id': patient_id})
+    assert first.status_code == 200
+    again = diagnosed_client.get('/get_previous_metrics', query_string={'patient_id': patient_id},
+                                 headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert diagnosed_client.get('/get_previous_metrics', query_string={'patient_id': 10 ** 9}).status_code == 404
+
+
+def test_validators_for_unparseable_timestamps(flask_app):
+    etag, last_modified = flask_app.record_validators({'id': 1, 'timestamp': 'yesterday'}, 'latest')
+    assert etag.startswith('latest-1-')
+    assert last_modified is None
+    assert not flask_app.is_not_modified(None, 'Sun, 06 Nov 1994 08:49:37 GMT', etag, last_modified)
+    assert flask_app.is_not_modified(f'W/"{etag}"', None, etag, last_modified)
+
+
+def test_last_modified_has_whole_seconds(flask_app):
+    _, last_modified = flask_app.record_validators({'id': 1, 'timestamp': '2024-01-02 03:04:05.678901'}, 'patient')
+    assert last_modified.microsecond == 0
+    assert last_modified.tzinfo == timezone.utc
+    assert last_modified <= datetime.now(timezone.utc)
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from diagnosis_events import StreamState, format_event
+
+
+def public(record):
+    return {key: value for key, value in record.items() if key != 'malignant_prob'}
+
+
+def message(record):
+    return format_event(record)
+
+
+def test_unbound_stream_gets_every_patient_in_public_form():
+    stream = StreamState('mine', bound=False, public=public)
+    record = {'id': 1, 'malignant_prob': 0.9}
+    assert stream.on_published(('theirs', record)) == message({'id': 1})
+
+
+def test_own_diagnosis_binds_the_stream_and_hides_other_patients():
+    stream = StreamState('mine', bound=False, public=public)
+    own = {'id': 1, 'malignant_prob': 0.9}
+    assert stream.on_published(('mine', own)) == message(own)
+    assert stream.on_published(('theirs', {'id': 2, 'malignant_prob': 0.1})) is None
+
+
+def test_a_stream_without_a_session_never_claims_anonymous_events():
+    stream = StreamState(None, bound=False, public=public)
+    assert stream.on_published((None, {'id': 1, 'malignant_prob': 0.9})) == message({'id': 1})
+    assert not stream.bound
+
+
+def test_records_already_shown_are_not_sent_again():
+    stream = StreamState('mine', bound=True, public=public, last_id=1)
+    assert stream.on_current({'id': 1}, from_session=True) is None
+    assert stream.on_published(('mine', {'id': 1})) is None
+    assert stream.on_current({'id': 2}, from_session=True) == message({'id': 2})
+
+
+def events(chunks):
+    """Parse SSE data lines out of streamed chunks until a diagnosis arrives."""
+    for chunk in chunks:
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        for line in chunk.splitlines():
+            if line.startswith('data: '):
+                return json.loads(line[len('data: '):])
+
+
+def test_first_diagnosis_reaches_its_own_stream_in_full(client, case):
+    response = client.get('/api/diagnosis-events', buffered=False)
+    try:
+        assert client.get_cookie('session') is not None  # a new client gets its session with the stream
+        chunks = iter(response.response)
+        next(chunks)  # the preamble; the stream is subscribed from here on
+
+        assert client.post('/predict', json={'patient_name': 'First Visit', 'age': 50, 'gender': 'Female', **case}).status_code == 200
+        record = events(chunks)
+    finally:
+        response.close()
+
+    assert record['name'] == 'First Visit'
+    assert 'malignant_prob' in record  # the full session record, not the public form
+
+
+def test_predict_publishes_under_the_session_id_of_its_cookie(flask_app, client, case, monkeypatch):
+    published = []
+    monkeypatch.setattr(flask_app.diagnosis_hub, 'publish', lambda sid, record: published.append(sid))
+    client.post('/predict', json={'patient_name': 'New', 'age': 40, 'gender': 'Female', **case})
+    assert published == [client.get_cookie('session').value]
+
+
+def test_asgi_predict_publishes_under_the_new_session_id(flask_app, case, monkeypatch):
+    pytest.importorskip('starlette')
+    pytest.importorskip('httpx')
+    from starlette.testclient import TestClient
+    import asgi_app
+
+    published = []
+    monkeypatch.setattr(flask_app.diagnosis_hub, 'publish', lambda sid, record: published.append(sid))
+    with TestClient(asgi_app.app) as client:
+        response = client.post('/predict', json={'patient_name': 'New', 'age': 40, 'gender': 'Female', **case})
+        assert response.status_code == 200
+        assert published == [response.cookies['session']]
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+import db_functions
+
+
+def patient_row(name, timestamp, prediction='Benign (B)'):
+    values = {column: 0.1 for column in db_functions.FEATURE_COLUMNS}
+    values.update(name=name, age=50, gender='Female', family_history='No', symptoms='', previous_cancer='No',
+                  prediction_result=prediction, confidence=0.9, timestamp=timestamp, model_version='test')
+    return tuple(values[column] for column in db_functions.PATIENT_COLUMNS)
+
+
+@pytest.fixture
+def history(flask_app, request):
+    """Seven rows under a name unique to the test; three share one timestamp so pages must break ties by id."""
+    name = request.node.name
+    timestamps = ['2024-01-01 09:00:00', '2024-01-02 09:00:00', *['2024-01-03 09:00:00'] * 3,
+                  '2024-01-04 09:00:00', '2024-01-05 09:00:00']
+    ids = db_functions.insert_patients([
+        patient_row(name, timestamp, 'Malignant (M)' if i % 2 else 'Benign (B)') for i, timestamp in enumerate(timestamps)
+    ])
+    newest_first = [patient_id for _, patient_id in sorted(zip(timestamps, ids), reverse=True)]
+    return name, newest_first
+
+
+def walk(client, **params):
+    """Follow next_cursor until the last page, returning the ids of every page."""
+    pages, cursor = [], None
+    while True:
+        response = client.get('/api/history', query_string={**params, **({'cursor': cursor} if cursor else {})})
+        assert response.status_code == 200
+        body = response.get_json()
+        pages.append([patient['id'] for patient in body['patients']])
+        cursor = body['next_cursor']
+        if cursor is None:
+            return pages
+
+
+def test_pages_neither_overlap_nor_skip_rows(client, history):
+    name, newest_first = history
+    pages = walk(client, name=name, limit=2)
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    assert [patient_id for page in pages for patient_id in page] == newest_first
+
+
+def test_filters_apply_on_every_page(client, history):
+    name, newest_first = history
+    pages = walk(client, name=name, diagnosis='m', limit=1)
+    malignant = [patient['id'] for patient in db_functions.get_history_page(10, name=name, diagnosis='M')]
+    assert [patient_id for page in pages for patient_id in page] == malignant
+    assert len(malignant) == 3
+
+
+def test_a_full_last_page_has_no_next_cursor(client, history):
+    name, newest_first = history
+    body = client.get('/api/history', query_string={'name': name, 'limit': len(newest_first)}).get_json()
+    assert body['next_cursor'] is None
+
+
+def test_ndjson_export_streams_every_row(client, history):
+    name, newest_first = history
+    response = client.get('/api/history', query_string={'name': name, 'format': 'ndjson'})
+    assert [json.loads(line)['id'] for line in response.get_data(as_text=True).splitlines()] == newest_first
+
+
+@pytest.mark.parametrize('query', [{'cursor': 'not-a-cursor'}, {'cursor': 'WzFd'}, {'limit': 'ten'}])
+def test_invalid_cursor_or_limit_is_a_bad_request(client, query):
+    assert client.get('/api/history', query_string=query).status_code == 400
+
+
+@pytest.mark.parametrize('diagnosis', ['M', 'm', 'Malignant', 'MALIGNANT', 'Malignant (M)', 'malignant (m)'])
+def test_diagnosis_filter_accepts_codes_and_labels(client, history, diagnosis):
+    name, _ = history
+    body = client.get('/api/history', query_string={'name': name, 'diagnosis': diagnosis}).get_json()
+    assert len(body['patients']) == 3
+    assert {patient['prediction_result'] for patient in body['patients']} == {'Malignant (M)'}
+
+
+def test_diagnosis_filter_applies_to_the_ndjson_export(client, history):
+    name, _ = history
+    response = client.get('/api/history', query_string={'name': name, 'diagnosis': 'Benign', 'format': 'ndjson'})
+    assert [json.loads(line)['prediction_result'] for line in response.get_data(as_text=True).splitlines()] == ['Benign (B)'] * 4
+
+
+def test_unknown_diagnosis_is_a_bad_request(client):
+    assert client.get('/api/history', query_string={'diagnosis': 'Maybe'}).status_code == 400
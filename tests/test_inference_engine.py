@@ -0,0 +1,43 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import DATASET_PATH, MODEL_PATH
+from inference_engine import CompiledForest, _mmap_roundtrip
+
+
+@pytest.fixture(scope='module')
+def forest():
+    return joblib.load(MODEL_PATH)
+
+
+@pytest.fixture(scope='module')
+def engine(forest):
+    return CompiledForest.from_sklearn(forest)
+
+
+@pytest.fixture(scope='module')
+def dataset(forest):
+    data = pd.read_csv(DATASET_PATH)[forest.feature_names_in_.tolist()]
+    return data, data.to_numpy(dtype=np.float64)
+
+
+@pytest.mark.parametrize('variant', ['compiled', 'mmap'])
+def test_matches_sklearn_exactly(forest, engine, dataset, variant):
+    X_df, X = dataset
+    candidate = engine if variant == 'compiled' else _mmap_roundtrip(engine)
+    np.testing.assert_array_equal(candidate.predict_proba(X), forest.predict_proba(X_df))
+    np.testing.assert_array_equal(candidate.predict(X), forest.predict(X_df))
+
+
+def test_single_row_matches_sklearn(forest, engine, dataset):
+    X_df, X = dataset
+    np.testing.assert_array_equal(engine.predict_proba(X[:1]), forest.predict_proba(X_df.iloc[:1]))
+
+
+def test_contributions_add_up_to_probabilities(forest, engine, dataset):
+    X_df, X = dataset
+    bias, contributions = engine.contributions(X)
+    assert contributions.shape == (len(X), X.shape[1], len(forest.classes_))
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), forest.predict_proba(X_df), rtol=0, atol=1e-9)
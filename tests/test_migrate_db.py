@@ -0,0 +1,98 @@
+import json
+import shutil
+import sqlite3
+
+import pytest
+
+import db_functions
+from conftest import MALIGNANT_CASE, ROOT
+from migrate_db import migrate
+
+# app.py's original table: clinical features in a JSON blob
+JSON_BLOB_SCHEMA = '''
+    CREATE TABLE patients (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, age INTEGER NOT NULL, gender TEXT NOT NULL,
+        family_history TEXT, symptoms TEXT, previous_cancer TEXT, clinical_data TEXT, prediction_result TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, confidence TEXT, diagnosis TEXT
+    )
+'''
+
+# database_setup.py's original table: keyed by patient_id, one column per feature
+SETUP_SCHEMA = '''
+    CREATE TABLE patients (
+        patient_id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, age INTEGER, gender TEXT, family_history TEXT,
+        previous_cancer TEXT, symptoms TEXT, {features}, diagnosis TEXT
+    )
+'''.format(features=', '.join(f'{feature} REAL' for feature in db_functions.FEATURE_COLUMNS))
+
+
+def legacy_db(path, schema, rows):
+    conn = sqlite3.connect(path)
+    conn.execute(schema)
+    for row in rows:
+        conn.execute(f"INSERT INTO patients ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})", list(row.values()))
+    conn.commit()
+    conn.close()
+
+
+def read_patients(path):
+    with sqlite3.connect(path) as conn:
+        conn.row_factory = sqlite3.Row
+        return [dict(row) for row in conn.execute("SELECT * FROM patients ORDER BY id")]
+
+
+def test_json_blob_layout_is_migrated_in_chunks(tmp_path):
+    path = str(tmp_path / 'legacy.db')
+    legacy_db(path, JSON_BLOB_SCHEMA, [
+        {'name': f'p{i}', 'age': 40 + i, 'gender': 'Female', 'clinical_data': json.dumps(MALIGNANT_CASE),
+         'prediction_result': 'Malignant (M)', 'confidence': '0.9', 'timestamp': f'2024-01-0{i + 1} 10:00:00'}
+        for i in range(5)
+    ])
+
+    assert migrate(path, chunk_size=2) == 5
+
+    patients = read_patients(path)
+    assert [patient['id'] for patient in patients] == [1, 2, 3, 4, 5]
+    assert patients[0]['name'] == 'p0'
+    assert {feature: patients[0][feature] for feature in db_functions.FEATURE_COLUMNS} == MALIGNANT_CASE
+    assert patients[4]['timestamp'] == '2024-01-05 10:00:00'
+    with db_functions.transaction(path) as conn:
+        assert not db_functions.is_legacy_schema(conn)
+        # New rows continue after the legacy ids
+        conn.execute("INSERT INTO patients (name) VALUES ('new')")
+        assert conn.execute("SELECT MAX(id) FROM patients").fetchone()[0] == 6
+
+
+def test_database_setup_layout_maps_diagnosis_labels(tmp_path):
+    path = str(tmp_path / 'legacy.db')
+    legacy_db(path, SETUP_SCHEMA, [
+        {'patient_id': 7, 'name': 'setup', 'age': 61, 'gender': 'Female', **MALIGNANT_CASE, 'diagnosis': 'M'},
+    ])
+
+    assert migrate(path) == 1
+
+    patient, = read_patients(path)
+    assert patient['id'] == 7
+    assert patient['prediction_result'] == 'Malignant (M)'
+    assert patient['area_mean'] == MALIGNANT_CASE['area_mean']
+
+
+def test_migrating_twice_is_a_no_op(tmp_path):
+    path = str(tmp_path / 'legacy.db')
+    legacy_db(path, JSON_BLOB_SCHEMA, [{'name': 'once', 'age': 50, 'gender': 'Female', 'clinical_data': '{}'}])
+    assert migrate(path) == 1
+    assert migrate(path) == 0
+    assert len(read_patients(path)) == 1
+
+
+def test_tracked_database_migrates_without_losing_rows(tmp_path):
+    path = str(tmp_path / 'patient_metadata.db')
+    shutil.copyfile(f'{ROOT}/patient_metadata.db', path)
+    with db_functions.connection(path) as conn:
+        if not db_functions.is_legacy_schema(conn):
+            pytest.skip('patient_metadata.db is already columnar')
+        before = conn.execute("SELECT COUNT(*) FROM patients").fetchone()[0]
+
+    db_functions.init_db(path)  # what app startup does: migrates, then adds newer columns and indexes
+
+    assert len(read_patients(path)) == before
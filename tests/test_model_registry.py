@@ -0,0 +1,108 @@
+import os
+import time
+
+import joblib
+import pytest
+
+import db_functions
+import model_registry
+from conftest import MODEL_PATH
+from prediction_cache import PredictionCache
+
+
+@pytest.fixture(scope='module')
+def reordered_model_path(tmp_path_factory):
+    """The shipped model, claiming its features in a different order."""
+    model = joblib.load(MODEL_PATH)
+    model.feature_names_in_ = model.feature_names_in_[::-1]
+    path = tmp_path_factory.mktemp('models') / 'reordered.pkl'
+    joblib.dump(model, path)
+    return str(path)
+
+
+def test_published_version_records_the_serving_feature_order(tmp_path):
+    metadata = model_registry.publish(MODEL_PATH, str(tmp_path))
+    assert metadata['required_features'] == db_functions.FEATURE_COLUMNS
+    assert model_registry.current_version(str(tmp_path)) == metadata['version']
+    loaded = model_registry.load_version(metadata['version'], str(tmp_path))
+    assert loaded.required_features == db_functions.FEATURE_COLUMNS
+
+
+def test_models_with_other_feature_orders_are_refused(tmp_path, reordered_model_path):
+    with pytest.raises(ValueError, match='expected'):
+        model_registry.publish(reordered_model_path, str(tmp_path))
+    assert model_registry.list_versions(str(tmp_path)) == []
+
+
+def test_app_refuses_to_activate_a_reordered_model(flask_app, reordered_model_path):
+    loaded = model_registry.LoadedModel(joblib.load(reordered_model_path), 'reordered')
+    serving = flask_app.current_model
+    with pytest.raises(ValueError):
+        flask_app.activate_model(loaded)
+    assert flask_app.current_model is serving
+
+
+def test_versions_published_in_the_same_second_are_distinct_and_ordered(tmp_path):
+    versions = [model_registry.publish(MODEL_PATH, str(tmp_path), activate=False)['version'] for _ in range(3)]
+    assert len(set(versions)) == 3
+    assert [metadata['version'] for metadata in model_registry.list_versions(str(tmp_path))] == versions[::-1]
+
+
+def test_second_resolution_versions_still_load(tmp_path):
+    assert model_registry._version_dir('20261018T142501_1a2b3c4d', str(tmp_path))
+    with pytest.raises(ValueError):
+        model_registry._version_dir('../20261018T142501_1a2b3c4d', str(tmp_path))
+
+
+@pytest.fixture
+def serving(flask_app, monkeypatch):
+    """The app with its own prediction cache; the model serving before the test is swapped back in afterwards."""
+    cache = PredictionCache()
+    monkeypatch.setattr(flask_app, 'prediction_cache', cache)
+    original = flask_app.current_model
+    cache.bind(original.version)
+    yield flask_app
+    flask_app.activate_model(original)
+
+
+def test_watcher_hot_loads_a_newly_published_version(serving, tmp_path):
+    registry = str(tmp_path)
+    first = model_registry.publish(MODEL_PATH, registry)['version']
+    watcher = model_registry.RegistryWatcher(serving.activate_model, registry, loaded_version=first)
+    assert watcher.check() is None  # nothing new yet
+
+    cache = serving.prediction_cache
+    generation = cache.get('key')[1]
+    cache.put('key', 'old output', generation, serving.current_model.version)
+
+    second = model_registry.publish(MODEL_PATH, registry)['version']
+    loaded = watcher.check()
+    assert loaded.version == second
+    assert serving.current_model is loaded
+    value, new_generation = cache.get('key')
+    assert value is None and new_generation != generation
+
+
+def test_watcher_polls_in_the_background(serving, tmp_path):
+    registry = str(tmp_path)
+    watcher = model_registry.RegistryWatcher(serving.activate_model, registry, interval_seconds=0.01).start()
+    try:
+        version = model_registry.publish(MODEL_PATH, registry)['version']
+        deadline = time.time() + 10
+        while serving.current_model.version != version and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        watcher.stop()
+    assert serving.current_model.version == version
+
+
+def test_watcher_skips_a_corrupt_version_and_keeps_serving(serving, tmp_path):
+    registry = str(tmp_path)
+    version = model_registry.publish(MODEL_PATH, registry)['version']
+    with open(os.path.join(registry, version, model_registry.ARTIFACT_FILE), 'ab') as f:
+        f.write(b'tampered')
+    before = serving.current_model
+    watcher = model_registry.RegistryWatcher(serving.activate_model, registry)
+    assert watcher.check() is None
+    assert serving.current_model is before
+    assert watcher.check() is None  # reported once, not reloaded on every poll
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from conftest import MALIGNANT_CASE
+from prediction_cache import PredictionCache
+
+
+def test_keys_fold_float_noise_and_negative_zero():
+    cache = PredictionCache(precision=6)
+    assert cache.key_for([0.1, -0.0]) == cache.key_for([0.10000000001, 0.0])
+    assert cache.key_for([0.1]) != cache.key_for([0.1001])
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(max_entries=2)
+    cache.bind('v1')
+    generation = cache.get('a')[1]
+    cache.put('a', 1, generation, 'v1')
+    cache.put('b', 2, generation, 'v1')
+    assert cache.get('a')[0] == 1  # 'b' is now the least recently used
+    cache.put('c', 3, generation, 'v1')
+    assert cache.get('b')[0] is None
+    assert cache.stats()['evictions'] == 1
+
+
+def test_binding_a_new_model_clears_entries():
+    cache = PredictionCache()
+    cache.bind('v1')
+    cache.put('a', 1, cache.get('a')[1], 'v1')
+    cache.bind('v1')
+    assert cache.get('a')[0] == 1
+    cache.bind('v2')
+    assert cache.get('a')[0] is None
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_outputs_of_a_replaced_model_are_not_stored():
+    cache = PredictionCache()
+    cache.bind('v1')
+    _, generation = cache.get('a')
+    cache.bind('v2')  # hot swap while the request was scoring
+    cache.put('a', 1, generation, 'v1')
+    assert cache.get('a')[0] is None
+
+
+def test_outputs_of_another_model_version_are_not_stored():
+    cache = PredictionCache()
+    cache.bind('v2')
+    # A request that picked up the old model just before the swap, then looked up the new generation
+    cache.put('a', 1, cache.get('a')[1], 'v1')
+    assert cache.get('a')[0] is None
+    cache.put('a', 2, cache.get('a')[1], 'v2')
+    assert cache.get('a')[0] == 2
+
+
+@pytest.fixture
+def score_case(flask_app, monkeypatch):
+    cache = PredictionCache(precision=6)
+    cache.bind(flask_app.current_model.version)
+    monkeypatch.setattr(flask_app, 'prediction_cache', cache)
+    monkeypatch.setattr(flask_app, 'batcher', None)
+    return flask_app.score_case
+
+
+def test_cache_hits_are_formatted_from_the_current_input(flask_app, score_case):
+    first = np.array([[MALIGNANT_CASE[f] for f in flask_app.REQUIRED_FEATURES]], dtype=np.float64)
+    second = first + 1e-9  # a different request that rounds to the same cache key
+
+    probabilities, contributions, _ = score_case(first)
+    cached_probabilities, cached_contributions, _ = score_case(second)
+
+    assert flask_app.prediction_cache.stats()['hits'] == 1
+    np.testing.assert_array_equal(cached_probabilities, probabilities)
+    values = {feature['feature']: feature['value'] for feature in cached_contributions['features']}
+    assert values == dict(zip(flask_app.REQUIRED_FEATURES, second[0].tolist()))
+    assert [f['contribution'] for f in cached_contributions['features']] == [f['contribution'] for f in contributions['features']]
+
+
+def test_cached_contributions_match_a_fresh_explanation(flask_app, score_case):
+    row = np.array([[MALIGNANT_CASE[f] for f in flask_app.REQUIRED_FEATURES]], dtype=np.float64)
+    score_case(row)
+    _, contributions, _ = score_case(row)
+    assert contributions == flask_app.explain_matrix(row)[0]
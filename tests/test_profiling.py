@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import profiling
+from conftest import ROOT
+
+
+@pytest.fixture
+def token(monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_TOKEN', 'secret')
+    monkeypatch.setattr(profiling, 'PROFILE_SAMPLE_RATE', 0)
+    return 'secret'
+
+
+@pytest.mark.parametrize('value', ['é', 'secret☃', '\udcff', None, ''])
+def test_malformed_tokens_are_refused_not_raised(token, value):
+    assert not profiling.should_profile(value)
+    assert not profiling.is_authorized(value)
+
+
+def test_matching_token_is_accepted(token):
+    assert profiling.should_profile(token)
+    assert profiling.is_authorized(token)
+
+
+def test_nothing_is_authorized_without_a_configured_token(monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_TOKEN', '')
+    assert not profiling.is_authorized('')
+
+
+def test_non_ascii_header_is_forbidden_not_a_server_error(flask_app, client, token, tmp_path, monkeypatch):
+    monkeypatch.setattr(flask_app, 'profile_store', profiling.ProfileStore(str(tmp_path)))
+    assert client.get('/api/profiles', headers={profiling.HEADER: 'é'}).status_code == 403
+    response = client.get('/api/profiles', headers={profiling.HEADER: token})
+    assert response.status_code == 200
+    assert response.get_json() == {'enabled': True, 'profiles': []}
+
+
+def test_profiling_hook_ignores_non_ascii_headers(tmp_path):
+    # The before_request hook is only registered when PROFILE_TOKEN is set at import, so check it in a fresh interpreter
+    script = (
+        "import app\n"
+        "client = app.app.test_client()\n"
+        "print(client.get('/metrics', headers={'X-Profile': 'é'}).status_code)\n"
+    )
+    env = {**os.environ, 'PROFILE_TOKEN': 'secret', 'PROFILE_DIR': str(tmp_path)}
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+    assert result.stdout.split()[-1] == '200', result.stderr
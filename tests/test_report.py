@@ -0,0 +1,35 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from reportlab import rl_config
+from reportlab.platypus import Table
+
+from conftest import MALIGNANT_CASE
+from report import ReportTemplate
+
+
+def payload(name):
+    return {'name': name, 'age': 52, 'gender': 'Female', 'prediction': 'Malignant', 'clinical_data': MALIGNANT_CASE}
+
+
+@pytest.fixture
+def template(report_fonts, monkeypatch):
+    monkeypatch.setattr(rl_config, 'invariant', 1)  # byte-identical output for identical input
+    return ReportTemplate()
+
+
+def test_static_tables_are_not_shared_between_documents(template):
+    table = Table([['a', 'b']])
+    first, = template._static(table)
+    second, = template._static(table)
+    assert first is not second
+    assert first._cellvalues is not second._cellvalues
+
+
+def test_concurrent_renders_match_serial_renders(template):
+    names = [f'patient-{i}' for i in range(8)]
+    serial = [template.render(payload(name), '2026-01-01') for name in names]
+    with ThreadPoolExecutor(8) as pool:
+        concurrent = list(pool.map(lambda name: template.render(payload(name), '2026-01-01'), names))
+    assert concurrent == serial
+    assert len(set(serial)) == len(names)
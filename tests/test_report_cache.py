@@ -0,0 +1,76 @@
+import os
+import time
+
+from report_cache import ReportCache
+
+
+def stored_bytes(directory):
+    return sum(entry.stat().st_size for entry in os.scandir(directory) if entry.name.endswith('.pdf'))
+
+
+def put(cache, key, size):
+    cache.put(key, b'x' * size).close()
+
+
+def test_key_ignores_payload_key_order():
+    assert ReportCache.key_for({'a': 1, 'b': 2}, '2026-01-01') == ReportCache.key_for({'b': 2, 'a': 1}, '2026-01-01')
+    assert ReportCache.key_for({'a': 1}, '2026-01-01') != ReportCache.key_for({'a': 1}, '2026-01-02')
+
+
+def test_least_recently_used_report_is_evicted(tmp_path):
+    cache = ReportCache(str(tmp_path), max_bytes=300)
+    for key in ('a', 'b', 'c'):
+        put(cache, key, 100)
+        time.sleep(0.01)
+    cache.get('a').close()  # 'b' is now the least recently used
+    put(cache, 'd', 100)
+
+    assert cache.get('b') is None
+    for key in ('a', 'c', 'd'):
+        cache.get(key).close()
+    assert cache.stats()['evictions'] == 1
+
+
+def test_expired_reports_are_misses(tmp_path):
+    cache = ReportCache(str(tmp_path), max_age_seconds=0.05)
+    put(cache, 'a', 10)
+    time.sleep(0.1)
+    assert cache.get('a') is None
+
+
+def test_bound_holds_for_the_shared_directory(tmp_path):
+    # Two instances stand in for two worker processes sharing REPORT_CACHE_DIR
+    first, second = ReportCache(str(tmp_path), max_bytes=300), ReportCache(str(tmp_path), max_bytes=300)
+    for i in range(4):
+        put(first, f'first-{i}', 100)
+        put(second, f'second-{i}', 100)
+        assert stored_bytes(tmp_path) <= 300
+    assert second.stats()['bytes_stored'] == stored_bytes(tmp_path)
+
+
+def test_reports_stored_by_another_process_are_hits(tmp_path):
+    first, second = ReportCache(str(tmp_path)), ReportCache(str(tmp_path))
+    first.put('shared', b'%PDF').close()
+    with second.get('shared') as report:
+        assert report.read() == b'%PDF'
+
+
+def test_restart_reindexes_existing_reports(tmp_path):
+    put(ReportCache(str(tmp_path)), 'kept', 10)
+    restarted = ReportCache(str(tmp_path))
+    assert restarted.stats()['entries'] == 1
+    restarted.get('kept').close()
+
+
+def test_hit_survives_eviction_by_another_process(tmp_path, monkeypatch):
+    cache = ReportCache(str(tmp_path))
+    cache.put('raced', b'%PDF').close()
+
+    def open_then_evict(path, mode):
+        report = open(path, mode)
+        os.unlink(path)  # another worker evicts the entry right after we opened it
+        return report
+
+    monkeypatch.setattr('report_cache.open', open_then_evict, raising=False)
+    with cache.get('raced') as report:
+        assert report.read() == b'%PDF'
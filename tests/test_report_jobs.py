@@ -0,0 +1,107 @@
+import io
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import report_jobs
+from report_jobs import JobQueueFullError, ReportJob, ReportJobQueue, safe_filename
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    """A job queue whose 'workers' are threads running a fake renderer, so tests control when each report finishes."""
+    release = threading.Event()
+
+    def render(payload, report_date):
+        if payload.get('fail'):
+            raise RuntimeError('render failed')
+        release.wait(5)
+        return f"%PDF {payload['name']}".encode()
+
+    monkeypatch.setattr(report_jobs, 'render_in_worker', render)
+    queue = ReportJobQueue(max_pending=3)
+    queue._executor = ThreadPoolExecutor(2)
+    queue.release = release
+    yield queue
+    release.set()
+    queue._executor.shutdown()
+
+
+def wait_for(job, status):
+    deadline = time.time() + 5
+    while job.status != status and time.time() < deadline:
+        time.sleep(0.001)
+    return job.status
+
+
+def test_job_is_not_failed_while_other_reports_are_rendering(queue):
+    job = queue.submit([{'name': 'a', 'fail': True}, {'name': 'b'}], '2026-01-01')
+    while not job.errors:
+        time.sleep(0.001)
+    assert job.status == 'running'
+    assert job.finished is None
+
+    queue.release.set()
+    assert wait_for(job, 'failed') == 'failed'
+    assert job.describe()['completed'] == 1
+    assert job.finished is not None
+
+
+def test_multi_patient_job_zips_every_report(queue):
+    queue.release.set()
+    job = queue.submit([{'name': 'a'}, {'name': 'b'}], '2026-01-01')
+    assert wait_for(job, 'done') == 'done'
+    content, mimetype, extension = queue.result(job)
+    assert (mimetype, extension) == ('application/zip', 'zip')
+    with zipfile.ZipFile(io.BytesIO(content)) as zf:
+        assert zf.read('002_breast_cancer_report_b.pdf') == b'%PDF b'
+
+
+def test_queue_rejects_jobs_beyond_max_pending(queue):
+    queue.submit([{'name': 'a'}, {'name': 'b'}], '2026-01-01')
+    with pytest.raises(JobQueueFullError):
+        queue.submit([{'name': 'c'}, {'name': 'd'}], '2026-01-01')
+
+
+@pytest.mark.parametrize('name', ['../../etc/passwd', '/tmp/evil', '..\\..\\boot.ini', 'a/../b'])
+def test_zip_entry_names_cannot_escape_the_archive(name):
+    job = ReportJob([{'name': name}, {}], '2026-01-01')
+    job.results = [b'%PDF', b'%PDF']
+    content, _, _ = ReportJobQueue().result(job)
+    with zipfile.ZipFile(io.BytesIO(content)) as zf:
+        names = zf.namelist()
+    assert names[1] == '002_breast_cancer_report_Patient.pdf'
+    assert not any('/' in entry or '\\' in entry or '..' in entry for entry in names)
+
+
+def test_safe_filename_keeps_ordinary_names():
+    assert safe_filename('Jane Doe') == 'Jane_Doe'
+    assert safe_filename('...') == 'Patient'
+
+
+def test_cache_write_failure_still_frees_the_slot(queue):
+    class FullDisk:
+        key_for = staticmethod(lambda payload, report_date: payload['name'])
+
+        def get(self, key):
+            return None
+
+        def put(self, key, pdf):
+            raise OSError(28, 'No space left on device')
+
+    queue.cache = FullDisk()
+    queue.release.set()
+    job = queue.submit([{'name': 'a'}], '2026-01-01')
+    assert wait_for(job, 'done') == 'done'
+    assert queue.stats()['pending_reports'] == 0
+
+
+def test_workers_are_spawned_not_forked():
+    queue = ReportJobQueue(max_workers=1)
+    try:
+        assert queue._get_executor()._mp_context.get_start_method() == 'spawn'
+    finally:
+        queue.shutdown()
@@ -0,0 +1,87 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+from datetime import datetime
+
+import joblib
+import pytest
+
+import db_functions
+import model_registry
+import retrain
+from conftest import DATASET_PATH, MODEL_PATH, ROOT
+from model import load_dataset
+
+
+@pytest.fixture
+def confirmed_db(tmp_path):
+    """A patients database holding 30 dataset rows; the first 25 have their diagnosis confirmed."""
+    path = str(tmp_path / 'patients.db')
+    db_functions.init_db(path)
+    X, y = load_dataset(DATASET_PATH)
+    rows = []
+    for features, label in zip(X.head(30).to_dict('records'), y.head(30)):
+        values = {**features, 'name': 'confirmed', 'age': 50, 'gender': 'Female', 'family_history': 'No',
+                  'symptoms': '', 'previous_cancer': 'No', 'prediction_result': db_functions.DIAGNOSIS_LABELS[label],
+                  'confidence': 0.9, 'timestamp': datetime.now(), 'model_version': 'test'}
+        rows.append(tuple(values[column] for column in db_functions.PATIENT_COLUMNS))
+    ids = db_functions.insert_patients(rows, path)
+    for patient_id, label in zip(ids[:25], y.head(25)):
+        assert db_functions.confirm_diagnosis(patient_id, label, path)
+    return path, ids, list(y.head(30))
+
+
+def test_only_confirmed_rows_are_read_in_watermark_order(confirmed_db):
+    path, ids, labels = confirmed_db
+    X, y, read_ids, watermark = retrain.read_confirmed(('', 0), chunk_size=4, path=path)
+    assert read_ids.tolist() == ids[:25]
+    assert y.tolist() == labels[:25]
+    assert X.shape == (25, len(db_functions.FEATURE_COLUMNS))
+    assert watermark[1] == ids[24]
+
+    # The next run starts after the watermark and sees only what was confirmed since
+    assert len(retrain.read_confirmed(watermark, 4, path)[2]) == 0
+    db_functions.confirm_diagnosis(ids[27], labels[27], path)
+    assert retrain.read_confirmed(watermark, 4, path)[2].tolist() == [ids[27]]
+
+
+def test_confirm_endpoint_validates_the_label(client, case):
+    client.post('/predict', json={'patient_name': 'To Confirm', **case})
+    patient_id = client.get('/api/refresh-patient-data').get_json()['id']
+    assert client.post(f'/api/patients/{patient_id}/confirm', json={'diagnosis': 'x'}).status_code == 400
+    assert client.post(f'/api/patients/{10 ** 9}/confirm', json={'diagnosis': 'M'}).status_code == 404
+    response = client.post(f'/api/patients/{patient_id}/confirm', json={'diagnosis': 'm'})
+    assert response.get_json()['confirmed_diagnosis'] == 'M'
+    assert db_functions.get_patient_row(patient_id)['confirmed_diagnosis'] == 'M'
+
+
+def test_retrained_model_is_published_and_activated(flask_app, confirmed_db, tmp_path):
+    path, ids, _ = confirmed_db
+    model_path = str(tmp_path / 'model.pkl')
+    shutil.copyfile(MODEL_PATH, model_path)
+    registry = str(tmp_path / 'registry')
+    trees_before = len(joblib.load(model_path).estimators_)
+
+    result = subprocess.run(
+        [sys.executable, 'retrain.py', '--model', model_path, '--db', path, '--data', DATASET_PATH,
+         '--new-trees', '5', '--tolerance', '1', '--publish'],
+        cwd=ROOT, env={**os.environ, 'MODEL_REGISTRY_DIR': registry}, capture_output=True, text=True, timeout=300,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    with open(retrain.metadata_path(model_path)) as f:
+        assert json.load(f)['confirmed_through'][1] == ids[24]
+    version = model_registry.current_version(registry)
+    loaded = model_registry.load_version(version, registry)
+    assert loaded.required_features == db_functions.FEATURE_COLUMNS
+    assert len(loaded.model.estimators_) == trees_before + 5
+
+    serving = flask_app.current_model
+    try:
+        flask_app.activate_model(loaded)
+        assert flask_app.current_model.version == version
+        assert flask_app.REQUIRED_FEATURES == db_functions.FEATURE_COLUMNS
+    finally:
+        flask_app.activate_model(serving)
@@ -0,0 +1,63 @@
+import importlib
+import sys
+
+import pandas as pd
+import pytest
+
+import score_csv
+from conftest import MALIGNANT_CASE, MODEL_PATH
+
+
+@pytest.fixture(scope='module', autouse=True)
+def engine():
+    return score_csv.load_model(MODEL_PATH)
+
+
+def write_input(path, overrides):
+    """One CSV row per entry in `overrides`, each the malignant case with some features replaced."""
+    rows = [{'patient': f'p{i}', **MALIGNANT_CASE, **override} for i, override in enumerate(overrides)]
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return str(path)
+
+
+def score(path, chunk_size=10):
+    return list(score_csv.score_chunks(score_csv.read_chunks(path, chunk_size, score_csv._engine.feature_names_in_)))
+
+
+def test_missing_non_numeric_and_infinite_features_are_invalid(tmp_path):
+    path = write_input(tmp_path / 'in.csv', [{}, {'area_mean': 'inf'}, {'radius_worst': '-inf'},
+                                             {'area_mean': None}, {'area_mean': 'abc'}])
+    chunk, = score(path)
+    assert chunk['status'].tolist() == ['ok', 'invalid', 'invalid', 'invalid', 'invalid']
+    assert chunk['prediction'].tolist()[0] == 'M'
+    assert chunk['prediction'].isna().tolist()[1:] == [True] * 4
+
+
+def test_csv_output_passes_input_text_through(tmp_path):
+    path = write_input(tmp_path / 'in.csv', [{'patient': '007'}, {'area_mean': 'abc'}])
+    output = tmp_path / 'out.csv'
+    assert score_csv.write_csv(score(path, chunk_size=1), str(output)) == (2, 1)
+    text = output.read_text()
+    assert text.splitlines()[0].endswith('prediction,malignant_prob,benign_prob,status')
+    assert '007,' in text and ',abc,' in text
+
+
+def test_parquet_schema_does_not_depend_on_the_first_chunk(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = write_input(tmp_path / 'in.csv', [{'area_mean': 'abc'}, {}, {}])
+    output = str(tmp_path / 'out.parquet')
+    assert score_csv.write_parquet(score(path, chunk_size=1), output) == (3, 1)  # the first chunk is all invalid
+    table = pq.read_table(output)
+    assert str(table.schema.field('malignant_prob').type) == 'double'
+    assert str(table.schema.field('prediction').type) == 'string'
+    assert table.column('prediction').to_pylist() == [None, 'M', 'M']
+
+
+def test_cli_imports_without_the_resource_module(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'resource', None)  # as on Windows
+    try:
+        module = importlib.reload(score_csv)
+        assert module.peak_rss_mb() is None
+    finally:
+        monkeypatch.undo()
+        importlib.reload(score_csv)
@@ -0,0 +1,111 @@
+import time
+
+import pytest
+from flask import Flask, session
+
+import db_functions
+from session_store import MemorySessionStore, ServerSideSessionInterface, SqliteSessionStore
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_store(request, tmp_path):
+    def make(ttl_seconds):
+        if request.param == 'memory':
+            return MemorySessionStore(ttl_seconds=ttl_seconds)
+        return SqliteSessionStore(str(tmp_path / 'sessions.db'), ttl_seconds=ttl_seconds)
+    return make
+
+
+def test_sessions_expire_after_the_ttl(make_store):
+    store = make_store(0.05)
+    store.save('sid', '{"a": 1}')
+    assert store.load('sid')[0] == '{"a": 1}'
+    time.sleep(0.1)
+    assert store.load('sid') is None
+
+
+def test_expired_rows_are_purged_on_write(make_store):
+    store = make_store(0.05)
+    store.save('old', '{}')
+    time.sleep(0.1)
+    store._next_purge = 0.0
+    store.save('new', '{}')
+    if isinstance(store, MemorySessionStore):
+        assert list(store._entries) == ['new']
+    else:
+        with db_functions.connection(store.path) as conn:
+            assert [row['id'] for row in conn.execute("SELECT id FROM sessions")] == ['new']
+
+
+def test_memory_store_evicts_least_recently_written():
+    store = MemorySessionStore(max_entries=2)
+    for sid in ('a', 'b', 'a', 'c'):
+        store.save(sid, '{}')
+    assert store.load('b') is None
+    assert store.load('a') and store.load('c')
+
+
+@pytest.fixture
+def session_app():
+    store = MemorySessionStore(ttl_seconds=60)
+    app = Flask(__name__, static_folder=None)
+    app.session_interface = ServerSideSessionInterface(store)
+    app.static_url_path = '/static'
+
+    @app.route('/set')
+    def set_value():
+        session['value'] = 1
+        return 'ok'
+
+    @app.route('/get')
+    def get_value():
+        return str(session.get('value'))
+
+    @app.route('/static/<path:name>')
+    def static_file(name):
+        return 'static'
+
+    app.store = store
+    return app
+
+
+def test_cookie_holds_only_the_session_id(session_app):
+    client = session_app.test_client()
+    client.get('/set')
+    sid = client.get_cookie('session').value
+    assert len(sid) >= 43 and 'value' not in sid
+    assert client.get('/get').get_data(as_text=True) == '1'
+    assert session_app.store.load(sid) is not None
+
+
+def test_forged_session_id_is_never_adopted(session_app):
+    client = session_app.test_client()
+    client.set_cookie('session', 'forged')
+    assert client.get('/get').get_data(as_text=True) == 'None'
+    client.get('/set')
+    assert client.get_cookie('session').value != 'forged'
+    assert session_app.store.load('forged') is None
+
+
+def test_reads_extend_the_session_once_half_the_ttl_has_passed(session_app, monkeypatch):
+    client = session_app.test_client()
+    client.get('/set')
+    sid = client.get_cookie('session').value
+    expires_at = session_app.store.load(sid)[1]
+
+    assert 'Set-Cookie' not in client.get('/get').headers  # fresh: no rewrite
+    monkeypatch.setattr(time, 'time', lambda real=time.time: real() + 45)
+    assert 'Set-Cookie' in client.get('/get').headers
+    assert session_app.store.load(sid)[1] > expires_at
+
+
+def test_static_paths_skip_the_store(session_app, monkeypatch):
+    client = session_app.test_client()
+    client.get('/set')
+    loads = []
+    original = session_app.store.load
+    monkeypatch.setattr(session_app.store, 'load', lambda sid: loads.append(sid) or original(sid))
+    client.get('/static/app.js')
+    assert loads == []
+    client.get('/get')
+    assert len(loads) == 1
@@ -0,0 +1,30 @@
+import pytest
+
+
+@pytest.mark.parametrize('value', ['nan', 'inf', '-inf', 'Infinity', float('nan')])
+def test_non_finite_features_are_rejected(flask_app, case, value):
+    case['area_mean'] = value
+    clinical_data, missing, invalid = flask_app.validate_clinical_data(case)
+    assert invalid == ['area_mean']
+    assert 'area_mean' not in clinical_data
+
+
+@pytest.mark.parametrize('value', ['nan', 'inf', '-inf'])
+def test_predict_answers_non_finite_features_with_a_400(client, case, value):
+    case['radius_worst'] = value
+    response = client.post('/predict', json=case)
+    assert response.status_code == 400
+    assert response.get_json()['fields'] == ['radius_worst']
+
+
+def test_batch_predict_marks_non_finite_cases_invalid(client, case):
+    response = client.post('/predict/batch', json=[case, {**case, 'area_mean': 'inf'}])
+    assert response.status_code == 200
+    assert [result['status'] for result in response.get_json()['results']] == ['success', 'error']
+
+
+def test_numeric_strings_are_accepted(flask_app, case):
+    case['area_mean'] = '1001.0'
+    clinical_data, missing, invalid = flask_app.validate_clinical_data(case)
+    assert (missing, invalid) == ([], [])
+    assert clinical_data['area_mean'] == 1001.0
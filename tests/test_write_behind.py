@@ -0,0 +1,109 @@
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+import db_functions
+from write_behind import WriteBehindWriter, replay_dead_letters
+
+
+def make_row(name):
+    values = {column: 0.1 for column in db_functions.FEATURE_COLUMNS}
+    values.update(name=name, age=50, gender='Female', family_history='No', symptoms='', previous_cancer='No',
+                  prediction_result='Benign', confidence=0.9, timestamp=datetime.now(), model_version='test')
+    return tuple(values[column] for column in db_functions.PATIENT_COLUMNS)
+
+
+class FlakyConnection:
+    """Wraps the writer's connection: the first `transient` flushes hit a locked database, and rows named 'bad' never insert."""
+
+    def __init__(self, conn, transient=0):
+        self.conn = conn
+        self.transient = transient
+
+    def __enter__(self):
+        return self.conn.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self.conn.__exit__(*exc_info)
+
+    def executemany(self, sql, rows):
+        rows = list(rows)
+        if self.transient:
+            self.transient -= 1
+            raise sqlite3.OperationalError('database is locked')
+        if any('bad' in row for row in rows):
+            raise sqlite3.IntegrityError('constraint failed')
+        return self.conn.executemany(sql, rows)
+
+    def execute(self, sql, row=()):
+        if 'bad' in row:
+            raise sqlite3.IntegrityError('constraint failed')
+        return self.conn.execute(sql, row)
+
+    def close(self):
+        self.conn.close()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'patients.db')
+    db_functions.init_db(path)
+    return path
+
+
+def stored_names(path):
+    with db_functions.connection(path) as conn:
+        return {row['id']: row['name'] for row in conn.execute("SELECT id, name FROM patients")}
+
+
+def test_rows_are_written_with_the_returned_ids(db_path):
+    writer = WriteBehindWriter(db_path)
+    ids = writer.submit([make_row('a'), make_row('b')])
+    writer.close()
+    assert stored_names(db_path) == {ids[0]: 'a', ids[1]: 'b'}
+
+
+def test_transient_failures_are_retried(db_path):
+    writer = WriteBehindWriter(db_path, retry_backoff_ms=1)
+    writer._conn = FlakyConnection(writer._conn, transient=2)
+    ids = writer.submit([make_row('a')])
+    writer.close()
+    assert stored_names(db_path) == {ids[0]: 'a'}
+    metrics = writer.metrics()
+    assert metrics['flush_retries'] == 2
+    assert metrics['rows_failed'] == 0
+    assert not os.path.exists(writer.dead_letter_path)
+
+
+def test_rows_that_keep_failing_are_dead_lettered_and_replayable(db_path):
+    writer = WriteBehindWriter(db_path, retry_backoff_ms=1)
+    writer._conn = FlakyConnection(writer._conn)
+    good_id, bad_id = writer.submit([make_row('good'), make_row('bad')])
+    writer.close()
+
+    # The rest of the flush still lands; only the bad row is set aside
+    assert stored_names(db_path) == {good_id: 'good'}
+    assert writer.metrics()['rows_failed'] == 1
+    with open(writer.dead_letter_path) as f:
+        entries = [json.loads(line) for line in f]
+    assert [(entry['row']['id'], entry['row']['name']) for entry in entries] == [(bad_id, 'bad')]
+    assert 'constraint failed' in entries[0]['error']
+
+    assert replay_dead_letters(writer.dead_letter_path, db_path) == (1, 0)
+    assert stored_names(db_path) == {good_id: 'good', bad_id: 'bad'}
+    assert not os.path.exists(writer.dead_letter_path)
+
+
+def test_replay_keeps_rows_that_fail_again(db_path, tmp_path):
+    dead_letters = tmp_path / 'dead.jsonl'
+    writer = WriteBehindWriter(db_path, dead_letter_path=str(dead_letters))
+    patient_id = writer.submit([make_row('a')])[0]
+    writer.close()
+
+    row = dict(zip(('id', *db_functions.PATIENT_COLUMNS), (patient_id, *make_row('a'))))
+    dead_letters.write_text(json.dumps({'row': row, 'error': 'x'}, default=str) + '\n')
+    assert replay_dead_letters(str(dead_letters), db_path) == (0, 1)  # the id is already taken
+    assert 'UNIQUE' in json.loads(dead_letters.read_text())['error']
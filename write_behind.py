@@ -0,0 +1,309 @@
+"""
+Write-behind persistence for prediction records.
+
+Callers hand rows to a bounded in-memory queue and get their patient ids back
+immediately; a background thread drains the queue with executemany inside
+grouped transactions. Ids are reserved in blocks by advancing the table's
+AUTOINCREMENT counter in sqlite_sequence, so they stay unique across worker
+processes sharing the same database file.
+
+Those ids have already been returned to clients, so a failed flush is not
+dropped: the transaction is retried with exponential backoff (max_retries
+times), then rows are written one at a time, so a single bad row cannot
+sink the rest of its flush. Rows that still fail are appended to a JSON-lines
+dead-letter file and can be re-inserted once the cause is fixed:
+
+    python write_behind.py replay [patient_metadata.db.dead-letter.jsonl]
+"""
+import argparse
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+
+import db_functions
+from metrics import observe_write_behind, span
+
+logger = logging.getLogger(__name__)
+
+# Map of durability level -> PRAGMA synchronous for the writer connection
+DURABILITY_LEVELS = {
+    'fast': 'OFF',       # survives process crashes, not OS crashes / power loss
+    'normal': 'NORMAL',  # WAL default: last transactions may roll back on power loss
+    'full': 'FULL',      # fsync on every grouped commit
+}
+
+INSERT_PATIENT_WITH_ID_SQL = "INSERT INTO patients (id, {}) VALUES ({})".format(
+    ', '.join(db_functions.PATIENT_COLUMNS), ', '.join('?' * (len(db_functions.PATIENT_COLUMNS) + 1))
+)
+ROW_COLUMNS = ('id', *db_functions.PATIENT_COLUMNS)  # INSERT_PATIENT_WITH_ID_SQL parameter order
+
+_STOP = object()
+
+
+class WriteBehindWriter:
+    """Queue patient rows and persist them in grouped transactions on a background thread."""
+
+    def __init__(self, path=None, max_queue_size=1000, flush_interval_ms=50, max_rows_per_flush=500,
+                 durability='normal', id_block_size=100, enqueue_timeout_ms=50, max_retries=5,
+                 retry_backoff_ms=50, dead_letter_path=None):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"durability must be one of {sorted(DURABILITY_LEVELS)}")
+
+        self.path = path or db_functions.DB_PATH
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_rows_per_flush = max_rows_per_flush
+        self.durability = durability
+        self.id_block_size = id_block_size
+        self.enqueue_timeout = enqueue_timeout_ms / 1000.0
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff_ms / 1000.0
+        self.dead_letter_path = dead_letter_path or f"{self.path}.dead-letter.jsonl"
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._id_lock = threading.Lock()
+        self._next_id = 0
+        self._id_limit = -1
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            'pending_rows': 0,
+            'rows_written': 0,
+            'rows_failed': 0,  # dead-lettered after every retry
+            'flush_retries': 0,
+            'flushes': 0,
+            'flush_latency_total_ms': 0.0,
+            'flush_latency_max_ms': 0.0,
+            'last_flush_latency_ms': 0.0,
+        }
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        for pragma in db_functions.PRAGMAS:
+            self._conn.execute(pragma)
+        self._conn.execute(f"PRAGMA synchronous={DURABILITY_LEVELS[durability]}")
+
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def reserve_ids(self, count):
+        """Hand out `count` patient ids, reserving a new block from SQLite when needed."""
+        ids = []
+        with self._id_lock:
+            while len(ids) < count:
+                if self._next_id > self._id_limit:
+                    self._reserve_block(max(self.id_block_size, count - len(ids)))
+                take = min(count - len(ids), self._id_limit - self._next_id + 1)
+                ids.extend(range(self._next_id, self._next_id + take))
+                self._next_id += take
+        return ids
+
+    def _reserve_block(self, size):
+        # BEGIN IMMEDIATE serialises reservations across processes
+        with db_functions.connection(self.path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'patients'").fetchone()
+                if row is None:
+                    start = (conn.execute("SELECT COALESCE(MAX(id), 0) FROM patients").fetchone()[0]) + 1
+                    conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('patients', ?)", (start + size - 1,))
+                else:
+                    start = row[0] + 1
+                    conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'patients'", (start + size - 1,))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        self._next_id = start
+        self._id_limit = start + size - 1
+
+    def submit(self, rows):
+        """
+        Queue db_functions.INSERT_PATIENT_SQL parameter tuples and return their ids.
+        Raises queue.Full if the writer cannot keep up; callers should then insert synchronously.
+        """
+        if self._closed:
+            raise queue.Full('Write-behind writer is closed')
+
+        ids = self.reserve_ids(len(rows))
+        # The whole group is one queue item, so it is either fully queued or not at all
+        self._queue.put([(patient_id, *row) for patient_id, row in zip(ids, rows)], timeout=self.enqueue_timeout)
+        with self._metrics_lock:
+            self._metrics['pending_rows'] += len(rows)
+        db_functions.remember_latest(rows, ids, self.path)
+        return ids
+
+    def metrics(self):
+        """Queue depth and flush latency metrics."""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        flushes = metrics['flushes'] or 1
+        metrics['avg_flush_latency_ms'] = metrics['flush_latency_total_ms'] / flushes
+        metrics['queue_depth'] = self._queue.qsize()
+        metrics['durability'] = self.durability
+        metrics['dead_letter_path'] = self.dead_letter_path
+        return metrics
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been written."""
+        done = threading.Event()
+        self._queue.put(done, timeout=timeout)
+        done.wait(timeout)
+
+    def close(self):
+        """Flush outstanding rows and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._worker.join()
+        self._conn.close()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            rows, markers = [], []
+            stop = self._take(item, rows, markers)
+
+            # Group whatever else is already waiting, up to the flush size or interval
+            deadline = time.perf_counter() + self.flush_interval
+            while not stop and len(rows) < self.max_rows_per_flush:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    stop = self._take(self._queue.get(timeout=remaining), rows, markers)
+                except queue.Empty:
+                    break
+
+            if rows:
+                self._write(rows)
+            for marker in markers:
+                marker.set()
+            if stop:
+                return
+
+    def _take(self, item, rows, markers):
+        if item is _STOP:
+            # Drain anything still queued behind the stop marker
+            while True:
+                try:
+                    self._take(self._queue.get_nowait(), rows, markers)
+                except queue.Empty:
+                    return True
+        if isinstance(item, threading.Event):
+            markers.append(item)
+        else:
+            rows.extend(item)
+        return False
+
+    def _write(self, rows):
+        start = time.perf_counter()
+        written, failed = self._insert(rows)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        with self._metrics_lock:
+            self._metrics['pending_rows'] -= len(rows)
+            self._metrics['rows_written'] += written
+            self._metrics['rows_failed'] += failed
+            self._metrics['flushes'] += 1
+            self._metrics['flush_latency_total_ms'] += elapsed
+            self._metrics['flush_latency_max_ms'] = max(self._metrics['flush_latency_max_ms'], elapsed)
+            self._metrics['last_flush_latency_ms'] = elapsed
+        observe_write_behind('written', written)
+
+    def _insert(self, rows):
+        """Write one flush, retrying with backoff; returns (rows written, rows dead-lettered)."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                with span('db.write_behind_flush'), self._conn:
+                    self._conn.executemany(INSERT_PATIENT_WITH_ID_SQL, rows)
+                return len(rows), 0
+            except sqlite3.IntegrityError:
+                break  # a bad row fails the same way every time; isolate it below
+            except sqlite3.Error as e:
+                if attempt == self.max_retries:
+                    break
+                delay = self.retry_backoff * 2 ** attempt
+                logger.warning("Write-behind flush of %d rows failed (%s); retry %d/%d in %.0f ms",
+                               len(rows), e, attempt + 1, self.max_retries, delay * 1000)
+                with self._metrics_lock:
+                    self._metrics['flush_retries'] += 1
+                observe_write_behind('retried', len(rows))
+                time.sleep(delay)
+
+        # Row by row, so one bad row doesn't take the rest of the flush with it
+        failed = []
+        for row in rows:
+            try:
+                with self._conn:
+                    self._conn.execute(INSERT_PATIENT_WITH_ID_SQL, row)
+            except sqlite3.Error as e:
+                failed.append((row, e))
+        if failed:
+            self._dead_letter(failed, len(rows))
+        return len(rows) - len(failed), len(failed)
+
+    def _dead_letter(self, failed, flushed):
+        logger.error("Write-behind could not store %d of %d rows (%s); appending them to %s",
+                     len(failed), flushed, failed[0][1], self.dead_letter_path)
+        observe_write_behind('dead_lettered', len(failed))
+        try:
+            with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+                for row, error in failed:
+                    entry = {'row': dict(zip(ROW_COLUMNS, row)), 'error': str(error),
+                             'failed_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+                    f.write(json.dumps(entry, default=str) + '\n')
+        except OSError:
+            logger.exception("Could not write the dead-letter file; ids %s are lost",
+                             [row[0] for row, _ in failed])
+
+
+def replay_dead_letters(dead_letter_path, path=None):
+    """
+    Insert dead-lettered rows into the patients table. Rows that fail again stay
+    in the file; returns (rows replayed, rows remaining).
+    """
+    with open(dead_letter_path, encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+
+    remaining = []
+    with db_functions.transaction(path) as conn:
+        for entry in entries:
+            try:
+                conn.execute(INSERT_PATIENT_WITH_ID_SQL, [entry['row'][column] for column in ROW_COLUMNS])
+            except sqlite3.Error as e:
+                remaining.append({**entry, 'error': str(e)})
+    db_functions.invalidate_latest(path)
+
+    # Rewritten atomically, so an interrupted replay never loses the rows still owed
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(dead_letter_path)), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.writelines(json.dumps(entry) + '\n' for entry in remaining)
+    if remaining:
+        os.replace(tmp_path, dead_letter_path)
+    else:
+        os.remove(tmp_path)
+        os.remove(dead_letter_path)
+    return len(entries) - len(remaining), len(remaining)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write-behind maintenance')
+    commands = parser.add_subparsers(dest='command', required=True)
+    replay_parser = commands.add_parser('replay', help='re-insert rows from a dead-letter file')
+    replay_parser.add_argument('file', nargs='?', default=f"{db_functions.DB_PATH}.dead-letter.jsonl")
+    replay_parser.add_argument('--db', default=db_functions.DB_PATH, help='patients database')
+    args = parser.parse_args()
+
+    try:
+        replayed, remaining = replay_dead_letters(args.file, args.db)
+    except OSError as e:
+        print(f"❌ {str(e)}")
+        raise SystemExit(1)
+    print(f"✅ Replayed {replayed} rows" + (f"; {remaining} still failing, kept in {args.file}" if remaining else ""))